@@ -3,17 +3,28 @@
 """
 import logging
 import os
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import MetaTrader5 as mt5
+import numpy as np
 import pandas as pd
 from config.settings import LOG_DIR
+from trading.rates_cache import RatesCache
 from strategies.ma_strategy import MAStrategy
 from strategies.dkll_strategy import DKLLStrategy
 from strategies.rsi_strategy import RSIStrategy
+from strategies.kernels import simulate_trades
+
+# 报告/日志分隔线（模块级常量，避免每次重复构造）
+_SEP_EQ = "=" * 80
+_SEP_DASH = "-" * 80
+_SEP_SHORT = "-" * 40
+_SEP_LOG = "=" * 60
 
 class ParameterOptimizer:
     """策略参数优化器"""
     
+    _log_dir_ready = False  # 报告目录已确认存在，之后保存报告不再检查
+    
     def __init__(self):
         self.logger = logging.getLogger('ParameterOptimizer')
         
@@ -35,8 +46,20 @@ class ParameterOptimizer:
                 'overbought': (65, 80)     # 超买线
             }
         }
+        
+        # M5 K线本地缓存，按需增量更新
+        self._rates_cache = RatesCache()
+    
+    def get_recent_rates(self, symbol: str, count: int):
+        """获取最近count根M5 K线（增量更新的缓存视图，见RatesCache.get）"""
+        return self._rates_cache.get(symbol, count)
     
-    def optimize_strategy(self, strategy_name: str, symbol: str, optimization_hours: int = 24, test_combinations: int = 20):
+    def get_recent_times(self, count: int):
+        """最近一次get_recent_rates对应的最后count根K线的datetime64时间列"""
+        return self._rates_cache.times(count)
+    
+    def optimize_strategy(self, strategy_name: str, symbol: str, optimization_hours: int = 24, test_combinations: int = 20,
+                          n_jobs: int = 1):
         """优化策略参数
         
         Args:
@@ -44,104 +67,149 @@ class ParameterOptimizer:
             symbol: 交易品种
             optimization_hours: 用于优化的历史数据小时数
             test_combinations: 测试的参数组合数量
+            n_jobs: 并行回测的进程数，1为在当前进程中顺序回测，0或负数表示使用全部CPU核心
         """
-        self.logger.info(f"开始优化策略: {strategy_name}")
+        self.logger.info("开始优化策略: %s", strategy_name)
         
         if strategy_name not in self.parameter_ranges:
-            self.logger.error(f"策略 {strategy_name} 没有定义参数范围")
+            self.logger.error("策略 %s 没有定义参数范围", strategy_name)
             return None
         
         # 获取历史数据
-        rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, optimization_hours * 12)  # 5分钟K线，12根/小时
+        rates = self.get_recent_rates(symbol, optimization_hours * 12)  # 5分钟K线，12根/小时
         if rates is None:
             self.logger.error("无法获取历史数据进行优化")
             return None
         
-        df = pd.DataFrame(rates)
-        df['time'] = pd.to_datetime(df['time'], unit='s')
-        
-        self.logger.info(f"获取到 {len(df)} 根K线数据用于优化")
+        # 回测不需要时间列，直接使用结构化数组，不构造完整的K线DataFrame
+        self.logger.info("获取到 %d 根K线数据用于优化", len(rates))
         
         # 生成测试参数组合
         param_combinations = self._generate_parameter_combinations(strategy_name, test_combinations)
         
-        best_params = None
-        best_score = float('-inf')
-        best_stats = None
+        self.logger.info("开始测试 %d 个参数组合...", len(param_combinations))
         
-        results = []
+        if n_jobs <= 0:
+            n_jobs = os.cpu_count() or 1
+        if n_jobs > 1 and len(param_combinations) > 1:
+            tested_params, tested_stats = self._backtest_parallel(strategy_name, rates, param_combinations, n_jobs)
+        else:
+            tested_params = []
+            tested_stats = []
+            for params in param_combinations:
+                try:
+                    # 创建临时策略实例进行测试
+                    temp_strategy = self._create_strategy_instance(strategy_name, params)
+                    if temp_strategy is None:
+                        continue
+                    
+                    # 回测参数组合
+                    stats = self._backtest_parameters(temp_strategy, rates)
+                    tested_params.append(params)
+                    tested_stats.append(stats)
+                    
+                except Exception as e:
+                    self.logger.error("测试参数组合 %r 时发生错误: %s", params, e)
+                    continue
         
-        self.logger.info(f"开始测试 {len(param_combinations)} 个参数组合...")
+        # 所有组合回测完成后统一打分并排序
+        scores = self._score_stats(tested_stats)
+        order = np.argsort(-scores, kind='stable')
+        results = [{
+            'params': tested_params[j],
+            'score': float(scores[j]),
+            'stats': tested_stats[j]
+        } for j in order]
         
-        for i, params in enumerate(param_combinations, 1):
-            try:
-                # 创建临时策略实例进行测试
-                temp_strategy = self._create_strategy_instance(strategy_name, params)
-                if temp_strategy is None:
-                    continue
-                
-                # 回测参数组合
-                score, stats = self._backtest_parameters(temp_strategy, df.copy())
-                
-                results.append({
-                    'params': params,
-                    'score': score,
-                    'stats': stats
-                })
-                
-                self.logger.debug(f"参数组合 {i}/{len(param_combinations)}: {params} -> 得分: {score:.4f}")
-                
-                # 更新最佳参数
-                if score > best_score:
-                    best_score = score
-                    best_params = params.copy()
-                    best_stats = stats.copy()
-                    self.logger.info(f"发现更好的参数组合: {params} (得分: {score:.4f})")
-                
-            except Exception as e:
-                self.logger.error(f"测试参数组合 {params} 时发生错误: {e}")
-                continue
+        if self.logger.isEnabledFor(logging.DEBUG):
+            for i, (params, score) in enumerate(zip(tested_params, scores), 1):
+                self.logger.debug("参数组合 %d/%d: %r -> 得分: %.4f", i, len(param_combinations), params, score)
+        
+        if results:
+            # 参数组合和回测统计都是每个组合新建的字典，之后不再修改，直接引用即可
+            best_params = results[0]['params']
+            best_score = results[0]['score']
+            best_stats = results[0]['stats']
+        else:
+            best_params = None
+            best_score = float('-inf')
+            best_stats = None
         
         # 记录优化结果
-        self.logger.info("="*60)
+        self.logger.info(_SEP_LOG)
         self.logger.info("参数优化完成")
-        self.logger.info(f"最佳参数: {best_params}")
-        self.logger.info(f"最佳得分: {best_score:.4f}")
+        self.logger.info("最佳参数: %r", best_params)
+        self.logger.info("最佳得分: %.4f", best_score)
         if best_stats:
-            self.logger.info(f"最佳参数统计: 总交易{best_stats['total_trades']}笔, 胜率{best_stats['win_rate']:.2f}%, 盈亏比{best_stats['profit_factor']:.2f}")
-        self.logger.info("="*60)
+            self.logger.info("最佳参数统计: 总交易%d笔, 胜率%.2f%%, 盈亏比%.2f",
+                             best_stats['total_trades'], best_stats['win_rate'], best_stats['profit_factor'])
+        self.logger.info(_SEP_LOG)
         
         # 保存优化报告
         self._save_optimization_report(strategy_name, results, best_params, best_stats, symbol)
         
         return best_params
     
+    def _backtest_parallel(self, strategy_name: str, rates, param_combinations: list, n_jobs: int):
+        """在进程池中并行回测参数组合
+        
+        K线数据在工作进程启动时传入一次，之后每个任务只传参数；
+        结果按param_combinations的顺序收集，与顺序回测一致
+        """
+        tested_params = []
+        tested_stats = []
+        workers = min(n_jobs, len(param_combinations))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_backtest_worker, initargs=(rates,)) as pool:
+            futures = [pool.submit(_backtest_in_worker, strategy_name, params) for params in param_combinations]
+            for params, future in zip(param_combinations, futures):
+                try:
+                    stats = future.result()
+                except Exception as e:
+                    self.logger.error("测试参数组合 %r 时发生错误: %s", params, e)
+                    continue
+                if stats is not None:
+                    tested_params.append(params)
+                    tested_stats.append(stats)
+        return tested_params, tested_stats
+    
     def _generate_parameter_combinations(self, strategy_name: str, count: int):
-        """生成参数组合"""
+        """生成参数组合
+        
+        拉丁超立方采样：每个参数的取值区间分成count段、每段各取一次，
+        同样的组合数量比独立随机抽样覆盖得更均匀；重复的组合只保留一个
+        """
         import random
         
         param_ranges = self.parameter_ranges[strategy_name]
-        combinations = []
         
-        for _ in range(count):
+        # 每个参数一列分层的[0, 1)样本，各列独立打乱
+        strata = {}
+        for param_name in param_ranges:
+            column = [(j + random.random()) / count for j in range(count)]
+            random.shuffle(column)
+            strata[param_name] = column
+        
+        def pick(low, high, u):
+            return low + min(int(u * (high - low + 1)), high - low)
+        
+        combinations = []
+        seen = set()
+        for j in range(count):
             params = {}
             for param_name, (min_val, max_val) in param_ranges.items():
-                if param_name in ['oversold', 'overbought']:
-                    # 对于RSI的超买超卖线，确保oversold < overbought
-                    if param_name == 'oversold':
-                        params[param_name] = random.randint(min_val, max_val)
-                    else:  # overbought
-                        # 确保超买线大于超卖线至少10
-                        min_overbought = max(min_val, params.get('oversold', 30) + 10)
-                        params[param_name] = random.randint(min_overbought, max_val)
+                u = strata[param_name][j]
+                if param_name == 'overbought':
+                    # 确保超买线大于超卖线至少10
+                    min_val = max(min_val, params.get('oversold', 30) + 10)
                 elif param_name == 'ma_long':
                     # 确保长周期大于短周期
-                    min_long = max(min_val, params.get('ma_short', 10) + 1)
-                    params[param_name] = random.randint(min_long, max_val)
-                else:
-                    params[param_name] = random.randint(min_val, max_val)
+                    min_val = max(min_val, params.get('ma_short', 10) + 1)
+                params[param_name] = pick(min_val, max_val, u)
             
-            combinations.append(params)
+            key = tuple(params.values())
+            if key not in seen:
+                seen.add(key)
+                combinations.append(params)
         
         return combinations
     
@@ -156,76 +224,54 @@ class ParameterOptimizer:
         else:
             return None
     
-    def _backtest_parameters(self, strategy, df):
-        """回测参数组合"""
+    def _simulate_trades(self, strategy, df_with_indicators):
+        """模拟交易，返回列式（SoA）交易记录
+        
+        Returns:
+            (entry_idx, exit_idx, types, profits) 四个等长数组，
+            types 中 1 表示多单、-1 表示空单
+        """
+        close = df_with_indicators['close'].to_numpy(dtype=np.float64)
+        # 一次算出全部K线的信号，逐根的开平仓模拟由strategies.kernels完成
+        signals = strategy.generate_signals(df_with_indicators)
+        return simulate_trades(signals, close)
+    
+    def _indicator_frame(self, strategy, rates):
+        """由MT5结构化数组计算指标，只用收盘价和指标列构造回测用的DataFrame
+        
+        未提供NumPy实现的策略退回calculate_indicators（时间列为原始秒级时间戳）
+        """
+        indicators = strategy.calculate_indicators_np(rates)
+        if indicators is None:
+            return strategy.calculate_indicators(pd.DataFrame(rates))
+        columns = {'close': rates['close']}
+        columns.update(indicators)
+        return pd.DataFrame(columns)
+    
+    def _backtest_parameters(self, strategy, rates):
+        """回测参数组合（rates为MT5结构化数组）"""
         try:
             # 计算指标
-            df_with_indicators = strategy.calculate_indicators(df)
+            df_with_indicators = self._indicator_frame(strategy, rates)
             
             # 模拟交易
-            trades = []
-            position = None  # None, 'BUY', 'SELL'
-            entry_price = 0
-            entry_time = None
-            
-            for i in range(1, len(df_with_indicators)):
-                current_row = df_with_indicators.iloc[i]
-                signal = strategy.generate_signal(df_with_indicators.iloc[:i+1])
-                
-                # 处理开仓
-                if signal and position is None:
-                    position = signal
-                    entry_price = current_row['close']
-                    entry_time = current_row['time']
-                
-                # 处理平仓（简单的反向信号平仓）
-                elif signal and position and signal != position:
-                    exit_price = current_row['close']
-                    exit_time = current_row['time']
-                    
-                    # 计算盈亏
-                    if position == 'BUY':
-                        profit = exit_price - entry_price
-                    else:  # SELL
-                        profit = entry_price - exit_price
-                    
-                    trades.append({
-                        'entry_time': entry_time,
-                        'exit_time': exit_time,
-                        'type': position,
-                        'entry_price': entry_price,
-                        'exit_price': exit_price,
-                        'profit': profit,
-                        'duration': (exit_time - entry_time).total_seconds() / 3600  # 小时
-                    })
-                    
-                    # 开新仓
-                    position = signal
-                    entry_price = current_row['close']
-                    entry_time = current_row['time']
+            _, _, _, profits = self._simulate_trades(strategy, df_with_indicators)
             
             # 计算统计指标
-            if not trades:
-                return -999, {'total_trades': 0, 'win_rate': 0, 'profit_factor': 0}
-            
-            total_trades = len(trades)
-            winning_trades = [t for t in trades if t['profit'] > 0]
-            losing_trades = [t for t in trades if t['profit'] < 0]
+            if profits.size == 0:
+                return {'total_trades': 0, 'win_rate': 0, 'profit_factor': 0}
             
-            win_rate = len(winning_trades) / total_trades * 100 if total_trades > 0 else 0
-            total_profit = sum(t['profit'] for t in trades)
-            gross_profit = sum(t['profit'] for t in winning_trades)
-            gross_loss = abs(sum(t['profit'] for t in losing_trades))
-            profit_factor = gross_profit / gross_loss if gross_loss > 0 else float('inf') if gross_profit > 0 else 0
+            total_trades = int(profits.size)
+            wins = profits[profits > 0]
+            losses = profits[profits < 0]
             
-            # 计算综合得分（可以根据需要调整权重）
-            if total_trades < 10:  # 交易次数太少，降低得分
-                score = -999
-            else:
-                # 综合得分：考虑胜率、盈亏比和总盈亏
-                score = (win_rate / 100) * 0.3 + min(profit_factor, 3) * 0.4 + (total_profit / abs(total_profit + 0.001)) * 0.3
+            win_rate = 100.0 * wins.size / total_trades
+            total_profit = float(profits.sum())
+            gross_profit = float(wins.sum())
+            gross_loss = float(-losses.sum())
+            profit_factor = gross_profit / gross_loss if gross_loss > 0 else (np.inf if gross_profit > 0 else 0.0)
             
-            stats = {
+            return {
                 'total_trades': total_trades,
                 'win_rate': win_rate,
                 'total_profit': total_profit,
@@ -234,62 +280,91 @@ class ParameterOptimizer:
                 'gross_loss': gross_loss
             }
             
-            return score, stats
-            
         except Exception as e:
-            self.logger.error(f"回测过程中发生错误: {e}")
-            return -999, {'total_trades': 0, 'win_rate': 0, 'profit_factor': 0}
+            self.logger.error("回测过程中发生错误: %s", e)
+            return {'total_trades': 0, 'win_rate': 0, 'profit_factor': 0}
+    
+    @staticmethod
+    def _score_stats(stats_list):
+        """批量计算综合得分（可以根据需要调整权重）
+        
+        得分 = 胜率*0.3 + min(盈亏比, 3)*0.4 + sign(总盈亏)*0.3，
+        交易次数少于10笔的组合得分为-999。
+        """
+        total_trades = np.fromiter((s['total_trades'] for s in stats_list), dtype=np.int64, count=len(stats_list))
+        win_rates = np.fromiter((s['win_rate'] for s in stats_list), dtype=np.float64, count=len(stats_list))
+        profit_factors = np.fromiter((s['profit_factor'] for s in stats_list), dtype=np.float64, count=len(stats_list))
+        total_profits = np.fromiter((s.get('total_profit', 0.0) for s in stats_list), dtype=np.float64, count=len(stats_list))
+        
+        scores = 0.003 * win_rates + 0.4 * np.minimum(profit_factors, 3) + 0.3 * np.sign(total_profits)
+        # 交易次数太少，降低得分
+        return np.where(total_trades < 10, -999.0, scores)
     
     def _save_optimization_report(self, strategy_name: str, results: list, best_params: dict, best_stats: dict, symbol: str):
-        """保存优化报告"""
+        """保存优化报告（results 已按得分降序排列）"""
         try:
             log_dir = LOG_DIR
-            if not os.path.exists(log_dir):
-                os.makedirs(log_dir)
+            if not ParameterOptimizer._log_dir_ready:
+                os.makedirs(log_dir, exist_ok=True)
+                ParameterOptimizer._log_dir_ready = True
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{log_dir}/parameter_optimization_{strategy_name.replace('策略', '')}_{timestamp}.txt"
             
             with open(filename, 'w', encoding='utf-8') as f:
-                f.write("="*80 + "\n")
+                f.write(_SEP_EQ + "\n")
                 f.write(f"{strategy_name} 参数优化报告\n")
-                f.write("="*80 + "\n")
+                f.write(_SEP_EQ + "\n")
                 f.write(f"优化时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
                 f.write(f"测试组合数量: {len(results)}\n")
                 f.write(f"交易品种: {symbol}\n\n")
                 
                 if best_params:
                     f.write("🏆 最佳参数组合:\n")
-                    f.write("-"*40 + "\n")
+                    f.write(_SEP_SHORT + "\n")
                     for param, value in best_params.items():
                         f.write(f"{param}: {value}\n")
                     f.write("\n")
                     
                     if best_stats:
                         f.write("📊 最佳参数表现:\n")
-                        f.write("-"*40 + "\n")
+                        f.write(_SEP_SHORT + "\n")
                         f.write(f"总交易次数: {best_stats['total_trades']}\n")
                         f.write(f"胜率: {best_stats['win_rate']:.2f}%\n")
                         f.write(f"总盈亏: {best_stats['total_profit']:.4f}\n")
                         f.write(f"盈亏比: {best_stats['profit_factor']:.2f}\n")
                         f.write("\n")
                 
-                # 排序结果（按得分降序）
-                sorted_results = sorted(results, key=lambda x: x['score'], reverse=True)
-                
                 f.write("📋 所有测试结果 (前20名):\n")
-                f.write("-"*80 + "\n")
+                f.write(_SEP_DASH + "\n")
                 f.write(f"{'排名':<4} {'得分':<8} {'交易数':<6} {'胜率':<8} {'盈亏比':<8} {'参数'}\n")
-                f.write("-"*80 + "\n")
+                f.write(_SEP_DASH + "\n")
                 
-                for i, result in enumerate(sorted_results[:20], 1):
+                for i, result in enumerate(results[:20], 1):
                     params_str = str(result['params'])
                     f.write(f"{i:<4} {result['score']:<8.4f} {result['stats']['total_trades']:<6} "
                            f"{result['stats']['win_rate']:<8.2f} {result['stats']['profit_factor']:<8.2f} {params_str}\n")
                 
-                f.write("="*80 + "\n")
+                f.write(_SEP_EQ + "\n")
             
-            self.logger.info(f"优化报告已保存到: {filename}")
+            self.logger.info("优化报告已保存到: %s", filename)
             
         except Exception as e:
-            self.logger.error(f"保存优化报告失败: {e}")
\ No newline at end of file
+            self.logger.error("保存优化报告失败: %s", e)
+
+# 并行回测工作进程的状态，由进程池的initializer设置
+_worker_rates = None
+_worker_optimizer = None
+
+def _init_backtest_worker(rates):
+    """工作进程初始化：保存回测用的K线数据（MT5结构化数组）"""
+    global _worker_rates, _worker_optimizer
+    _worker_rates = rates
+    _worker_optimizer = ParameterOptimizer()
+
+def _backtest_in_worker(strategy_name: str, params: dict):
+    """在工作进程中回测一个参数组合，策略名称无效时返回None"""
+    strategy = _worker_optimizer._create_strategy_instance(strategy_name, params)
+    if strategy is None:
+        return None
+    return _worker_optimizer._backtest_parameters(strategy, _worker_rates)
@@ -1,20 +1,96 @@
 """
 交易表现统计跟踪器
 """
+import functools
 import logging
 import os
+import threading
+import time
 from datetime import datetime, timedelta
+import numpy as np
 import MetaTrader5 as mt5
+from config.settings import PERFORMANCE_UPDATE_INTERVAL
+
+# MT5当前持仓票据集合的缓存时间（秒），相邻的几次刷新共用一次positions_get
+POSITION_TICKETS_TTL = 0.3
+
+def _synchronized(method):
+    """在跟踪器的锁内执行方法（后台更新线程与主线程共享交易记录）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+# 报告中固定格式的部分（会话信息到时间统计），按统计结果字段填充
+_REPORT_TMPL = "\n".join([
+    "=" * 80,
+    "交易表现统计报告",
+    "=" * 80,
+    "会话开始时间: {session_start}",
+    "会话结束时间: {session_end}",
+    "会话持续时间: {session_duration}",
+    "",
+    # 基础统计
+    "📊 基础统计",
+    "-" * 40,
+    "总交易次数: {total_trades}",
+    "盈利交易: {winning_trades}",
+    "亏损交易: {losing_trades}",
+    "平手交易: {breakeven_trades}",
+    "胜率: {win_rate:.2f}%",
+    "",
+    # 盈亏统计
+    "💰 盈亏统计",
+    "-" * 40,
+    "总盈亏: {total_profit:.2f}",
+    "总盈利: {gross_profit:.2f}",
+    "总亏损: -{gross_loss:.2f}",
+    "平均盈利: {avg_profit:.2f}",
+    "平均亏损: -{avg_loss:.2f}",
+    "盈亏比: {profit_factor:.2f}",
+    "最大单笔盈利: {max_profit:.2f}",
+    "最大单笔亏损: {max_loss:.2f}",
+    "",
+    # 账户统计
+    "🏦 账户统计",
+    "-" * 40,
+    "初始余额: {session_start_balance:.2f}",
+    "当前余额: {current_balance:.2f}",
+    "余额变化: {balance_change:+.2f} ({balance_change_percent:+.2f}%)",
+    "",
+    # 时间统计
+    "⏱️ 时间统计",
+    "-" * 40,
+    "平均持仓时间: {avg_duration_str}",
+    "最大连续盈利: {max_consecutive_wins} 次",
+    "最大连续亏损: {max_consecutive_losses} 次",
+    "",
+])
 
 class TradingPerformanceTracker:
     """交易表现统计跟踪器"""
     
+    _log_dir_ready = False  # 报告目录已确认存在，之后保存报告不再检查
+    
     def __init__(self):
         self.trades = []  # 所有交易记录
+        # 已平仓交易的统计列（列存储，与trades一一对应）：盈亏、持仓时长（微秒）、策略编号
+        self._profit = np.empty(1024, dtype=np.float64)
+        self._duration_us = np.empty(1024, dtype=np.int64)
+        self._strategy_code = np.empty(1024, dtype=np.int32)
+        self._strategy_names = {}  # 策略名称 -> 编号（按首次出现顺序）
+        self._n = 0
         self.open_positions = {}  # 当前开仓记录
         self.session_start_time = datetime.now()
         self.session_start_balance = 0
         self.logger = logging.getLogger('PerformanceTracker')
+        self._lock = threading.RLock()
+        # 由已平仓交易计算的统计结果缓存：(计算时的已平仓笔数, 结果)
+        self._stats_cache = (-1, None)
+        self._strategy_stats_cache = (-1, None)
+        # MT5当前持仓票据缓存：(获取时间, 票据集合)，记录新开仓时失效
+        self._tickets_cache = (0.0, None)
         
         # 初始化账户余额
         self._update_initial_balance()
@@ -30,8 +106,9 @@ class TradingPerformanceTracker:
             self.logger.error(f"获取初始余额失败: {e}")
             self.session_start_balance = 0
     
+    @_synchronized
     def record_order_open(self, ticket, symbol, order_type, volume, open_price, strategy_name, open_time=None):
-        """记录开仓"""
+        """记录开仓（open_time为datetime，默认当前时间）"""
         if open_time is None:
             open_time = datetime.now()
             
@@ -47,10 +124,13 @@ class TradingPerformanceTracker:
         }
         
         self.open_positions[ticket] = trade_record
+        # 缓存的票据集合里没有这笔新仓，不失效会被误判为已平仓
+        self._tickets_cache = (0.0, None)
         self.logger.info(f"记录开仓: 票据{ticket}, {trade_record['type']}, 数量{volume}, 价格{open_price}")
     
+    @_synchronized
     def record_order_close(self, ticket, close_price, close_time=None, profit=None):
-        """记录平仓"""
+        """记录平仓（close_time为datetime，默认当前时间）"""
         if close_time is None:
             close_time = datetime.now()
             
@@ -60,11 +140,8 @@ class TradingPerformanceTracker:
             trade_record['close_time'] = close_time
             trade_record['status'] = 'CLOSED'
             
-            # 计算持续时间
-            if isinstance(trade_record['open_time'], datetime) and isinstance(close_time, datetime):
-                trade_record['duration'] = close_time - trade_record['open_time']
-            else:
-                trade_record['duration'] = timedelta(0)
+            # 计算持续时间（开平仓时间均为datetime）
+            trade_record['duration'] = close_time - trade_record['open_time']
             
             # 计算盈亏
             if profit is not None:
@@ -78,29 +155,53 @@ class TradingPerformanceTracker:
             
             # 移动到已完成交易
             self.trades.append(trade_record)
+            self._append_closed(trade_record)
             del self.open_positions[ticket]
             
             self.logger.info(f"记录平仓: 票据{ticket}, 平仓价{close_price}, 盈亏{trade_record['profit']:.2f}")
         else:
             self.logger.warning(f"未找到开仓记录: 票据{ticket}")
     
+    def _append_closed(self, trade_record):
+        """把一笔已平仓交易追加到统计列，容量不足时倍增"""
+        if self._n == self._profit.size:
+            for name in ('_profit', '_duration_us', '_strategy_code'):
+                column = getattr(self, name)
+                grown = np.empty(column.size * 2, dtype=column.dtype)
+                grown[:self._n] = column[:self._n]
+                setattr(self, name, grown)
+        
+        strategy = trade_record.get('strategy', 'Unknown')
+        code = self._strategy_names.setdefault(strategy, len(self._strategy_names))
+        self._profit[self._n] = trade_record['profit']
+        self._duration_us[self._n] = trade_record['duration'] // timedelta(microseconds=1)
+        self._strategy_code[self._n] = code
+        self._n += 1
+    
+    @_synchronized
     def update_positions_from_mt5(self):
         """从MT5更新持仓状态"""
         try:
-            # 获取当前MT5持仓
-            current_positions = mt5.positions_get()
-            current_tickets = {pos.ticket for pos in current_positions} if current_positions else set()
+            # 获取当前MT5持仓票据（短时缓存）
+            current_tickets = self._current_tickets()
             
             # 检查已平仓的订单
-            closed_tickets = []
-            for ticket in self.open_positions.keys():
-                if ticket not in current_tickets:
-                    closed_tickets.append(ticket)
+            # 常见情况下没有平仓，用集合差快速判断；有平仓时按开仓顺序列出（平仓记录的顺序影响连续盈亏统计）
+            closed = self.open_positions.keys() - current_tickets
+            closed_tickets = [ticket for ticket in self.open_positions if ticket in closed] if closed else []
+            
+            # 一次取回会话期间的成交历史，按持仓编号分组（前后各放宽一天，覆盖服务器与本地的时区差）
+            deals_by_position = {}
+            if closed_tickets:
+                history = mt5.history_deals_get(self.session_start_time - timedelta(days=1),
+                                                datetime.now() + timedelta(days=1))
+                for deal in history or ():
+                    deals_by_position.setdefault(deal.position_id, []).append(deal)
             
             # 处理已平仓的订单
             for ticket in closed_tickets:
                 # 尝试从历史中获取平仓信息
-                history_deals = mt5.history_deals_get(ticket=ticket)
+                history_deals = deals_by_position.get(ticket)
                 if history_deals:
                     for deal in history_deals:
                         if deal.entry == mt5.DEAL_ENTRY_OUT:  # 平仓交易
@@ -124,6 +225,18 @@ class TradingPerformanceTracker:
         except Exception as e:
             self.logger.error(f"更新持仓状态失败: {e}")
     
+    def _current_tickets(self):
+        """MT5当前持仓的票据集合，POSITION_TICKETS_TTL秒内复用上次结果"""
+        cached_at, tickets = self._tickets_cache
+        now = time.monotonic()
+        if tickets is not None and now - cached_at < POSITION_TICKETS_TTL:
+            return tickets
+        
+        current_positions = mt5.positions_get()
+        tickets = {pos.ticket for pos in current_positions} if current_positions else set()
+        self._tickets_cache = (now, tickets)
+        return tickets
+    
     def _get_current_price(self, symbol):
         """获取当前价格"""
         try:
@@ -132,8 +245,12 @@ class TradingPerformanceTracker:
         except:
             return None
     
+    @_synchronized
     def get_statistics(self):
-        """计算交易统计"""
+        """计算交易统计
+        
+        成交记录部分按已平仓笔数缓存，没有新的平仓时直接复用；余额每次实时获取
+        """
         if not self.trades:
             return {
                 'total_trades': 0,
@@ -151,48 +268,66 @@ class TradingPerformanceTracker:
                 'balance_change': 0
             }
         
+        n, trade_stats = self._stats_cache
+        if n != self._n:
+            trade_stats = self._trade_statistics()
+            self._stats_cache = (self._n, trade_stats)
+        
+        # 当前余额
+        try:
+            account_info = mt5.account_info()
+            current_balance = account_info.balance if account_info else self.session_start_balance
+        except:
+            current_balance = self.session_start_balance
+        
+        balance_change = current_balance - self.session_start_balance
+        
+        stats = dict(trade_stats)
+        stats.update({
+            'session_start_balance': self.session_start_balance,
+            'current_balance': current_balance,
+            'balance_change': balance_change,
+            'balance_change_percent': (balance_change / self.session_start_balance * 100) if self.session_start_balance > 0 else 0
+        })
+        return stats
+    
+    def _trade_statistics(self):
+        """由已平仓交易计算的统计（不含账户余额）"""
         # 基础统计
-        total_trades = len(self.trades)
-        winning_trades = [t for t in self.trades if t['profit'] > 0]
-        losing_trades = [t for t in self.trades if t['profit'] < 0]
-        breakeven_trades = [t for t in self.trades if t['profit'] == 0]
+        profits = self._profit[:self._n]
+        total_trades = profits.size
+        wins = profits > 0
+        losses = profits < 0
+        winning_count = int(wins.sum())
+        losing_count = int(losses.sum())
+        breakeven_count = total_trades - winning_count - losing_count
         
         # 盈亏统计
-        total_profit = sum(t['profit'] for t in self.trades)
-        gross_profit = sum(t['profit'] for t in winning_trades)
-        gross_loss = abs(sum(t['profit'] for t in losing_trades))
+        total_profit = float(profits.sum())
+        gross_profit = float(profits[wins].sum())
+        gross_loss = abs(float(profits[losses].sum()))
         
         # 计算各种比率
-        win_rate = len(winning_trades) / total_trades * 100 if total_trades > 0 else 0
-        avg_profit = gross_profit / len(winning_trades) if winning_trades else 0
-        avg_loss = gross_loss / len(losing_trades) if losing_trades else 0
+        win_rate = winning_count / total_trades * 100 if total_trades > 0 else 0
+        avg_profit = gross_profit / winning_count if winning_count else 0
+        avg_loss = gross_loss / losing_count if losing_count else 0
         profit_factor = gross_profit / gross_loss if gross_loss > 0 else float('inf') if gross_profit > 0 else 0
         
         # 最大值统计
-        max_profit = max([t['profit'] for t in self.trades]) if self.trades else 0
-        max_loss = min([t['profit'] for t in self.trades]) if self.trades else 0
+        max_profit = float(profits.max())
+        max_loss = float(profits.min())
         
         # 时间统计
-        durations = [t['duration'] for t in self.trades if 'duration' in t]
-        avg_duration = sum(durations, timedelta(0)) / len(durations) if durations else timedelta(0)
+        avg_duration = timedelta(microseconds=int(self._duration_us[:self._n].sum())) / total_trades
         
         # 连续盈亏统计
         max_consecutive_wins, max_consecutive_losses = self._calculate_consecutive_stats()
         
-        # 当前余额
-        try:
-            account_info = mt5.account_info()
-            current_balance = account_info.balance if account_info else self.session_start_balance
-        except:
-            current_balance = self.session_start_balance
-        
-        balance_change = current_balance - self.session_start_balance
-        
         return {
             'total_trades': total_trades,
-            'winning_trades': len(winning_trades),
-            'losing_trades': len(losing_trades),
-            'breakeven_trades': len(breakeven_trades),
+            'winning_trades': winning_count,
+            'losing_trades': losing_count,
+            'breakeven_trades': breakeven_count,
             'win_rate': win_rate,
             'total_profit': total_profit,
             'gross_profit': gross_profit,
@@ -204,122 +339,78 @@ class TradingPerformanceTracker:
             'max_loss': max_loss,
             'avg_duration': avg_duration,
             'max_consecutive_wins': max_consecutive_wins,
-            'max_consecutive_losses': max_consecutive_losses,
-            'session_start_balance': self.session_start_balance,
-            'current_balance': current_balance,
-            'balance_change': balance_change,
-            'balance_change_percent': (balance_change / self.session_start_balance * 100) if self.session_start_balance > 0 else 0
+            'max_consecutive_losses': max_consecutive_losses
         }
     
     def _calculate_consecutive_stats(self):
         """计算连续盈亏统计"""
-        if not self.trades:
+        if self._n == 0:
             return 0, 0
         
-        max_consecutive_wins = 0
-        max_consecutive_losses = 0
-        current_consecutive_wins = 0
-        current_consecutive_losses = 0
+        # 按盈亏符号切分连续段，分别取盈利段和亏损段的最大长度
+        signs = np.sign(self._profit[:self._n]).astype(np.int8)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(signs)) + 1))
+        lengths = np.diff(np.append(starts, signs.size))
+        run_signs = signs[starts]
         
-        for trade in self.trades:
-            if trade['profit'] > 0:
-                current_consecutive_wins += 1
-                current_consecutive_losses = 0
-                max_consecutive_wins = max(max_consecutive_wins, current_consecutive_wins)
-            elif trade['profit'] < 0:
-                current_consecutive_losses += 1
-                current_consecutive_wins = 0
-                max_consecutive_losses = max(max_consecutive_losses, current_consecutive_losses)
-            else:  # breakeven
-                current_consecutive_wins = 0
-                current_consecutive_losses = 0
+        max_consecutive_wins = int(lengths[run_signs > 0].max(initial=0))
+        max_consecutive_losses = int(lengths[run_signs < 0].max(initial=0))
         
         return max_consecutive_wins, max_consecutive_losses
     
+    @_synchronized
     def get_strategy_statistics(self):
-        """按策略分组的统计"""
-        strategy_stats = {}
+        """按策略分组的统计（按已平仓笔数缓存，调用方不应修改返回结果）"""
+        n, strategy_stats = self._strategy_stats_cache
+        if n == self._n:
+            return strategy_stats
         
-        for trade in self.trades:
-            strategy = trade.get('strategy', 'Unknown')
-            if strategy not in strategy_stats:
-                strategy_stats[strategy] = {
-                    'trades': [],
-                    'total_profit': 0,
-                    'wins': 0,
-                    'losses': 0
-                }
-            
-            strategy_stats[strategy]['trades'].append(trade)
-            strategy_stats[strategy]['total_profit'] += trade['profit']
-            if trade['profit'] > 0:
-                strategy_stats[strategy]['wins'] += 1
-            elif trade['profit'] < 0:
-                strategy_stats[strategy]['losses'] += 1
+        # 按策略编号分组求和计数，编号按首次出现顺序分配，结果顺序与逐笔遍历一致
+        profits = self._profit[:self._n]
+        codes = self._strategy_code[:self._n]
+        n_strategies = len(self._strategy_names)
+        totals = np.bincount(codes, minlength=n_strategies)
+        profit_sums = np.bincount(codes, weights=profits, minlength=n_strategies)
+        wins = np.bincount(codes[profits > 0], minlength=n_strategies)
+        losses = np.bincount(codes[profits < 0], minlength=n_strategies)
         
-        # 计算每个策略的胜率
-        for strategy, stats in strategy_stats.items():
-            total = len(stats['trades'])
-            stats['win_rate'] = (stats['wins'] / total * 100) if total > 0 else 0
-            stats['total_trades'] = total
+        strategy_stats = {}
+        for strategy, code in self._strategy_names.items():
+            total = int(totals[code])
+            win_count = int(wins[code])
+            strategy_stats[strategy] = {
+                'trades': [self.trades[i] for i in np.flatnonzero(codes == code)],
+                'total_profit': float(profit_sums[code]),
+                'wins': win_count,
+                'losses': int(losses[code]),
+                'win_rate': (win_count / total * 100) if total > 0 else 0,
+                'total_trades': total
+            }
         
+        self._strategy_stats_cache = (self._n, strategy_stats)
         return strategy_stats
     
-    def generate_report(self):
-        """生成详细报告"""
-        self.update_positions_from_mt5()  # 更新最新状态
+    def generate_report(self, refresh: bool = True):
+        """生成详细报告
+        
+        Args:
+            refresh: 是否先从MT5更新持仓状态（调用方刚更新过时可传False）
+        """
+        if refresh:
+            self.update_positions_from_mt5()  # 更新最新状态
         
         stats = self.get_statistics()
         strategy_stats = self.get_strategy_statistics()
         
-        report = []
-        report.append("=" * 80)
-        report.append("交易表现统计报告")
-        report.append("=" * 80)
-        report.append(f"会话开始时间: {self.session_start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"会话结束时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        report.append(f"会话持续时间: {datetime.now() - self.session_start_time}")
-        report.append("")
-        
-        # 基础统计
-        report.append("📊 基础统计")
-        report.append("-" * 40)
-        report.append(f"总交易次数: {stats['total_trades']}")
-        report.append(f"盈利交易: {stats['winning_trades']}")
-        report.append(f"亏损交易: {stats['losing_trades']}")
-        report.append(f"平手交易: {stats['breakeven_trades']}")
-        report.append(f"胜率: {stats['win_rate']:.2f}%")
-        report.append("")
-        
-        # 盈亏统计
-        report.append("💰 盈亏统计")
-        report.append("-" * 40)
-        report.append(f"总盈亏: {stats['total_profit']:.2f}")
-        report.append(f"总盈利: {stats['gross_profit']:.2f}")
-        report.append(f"总亏损: -{stats['gross_loss']:.2f}")
-        report.append(f"平均盈利: {stats['avg_profit']:.2f}")
-        report.append(f"平均亏损: -{stats['avg_loss']:.2f}")
-        report.append(f"盈亏比: {stats['profit_factor']:.2f}")
-        report.append(f"最大单笔盈利: {stats['max_profit']:.2f}")
-        report.append(f"最大单笔亏损: {stats['max_loss']:.2f}")
-        report.append("")
-        
-        # 账户统计
-        report.append("🏦 账户统计")
-        report.append("-" * 40)
-        report.append(f"初始余额: {stats['session_start_balance']:.2f}")
-        report.append(f"当前余额: {stats['current_balance']:.2f}")
-        report.append(f"余额变化: {stats['balance_change']:+.2f} ({stats['balance_change_percent']:+.2f}%)")
-        report.append("")
-        
-        # 时间统计
-        report.append("⏱️ 时间统计")
-        report.append("-" * 40)
+        now = datetime.now()
         avg_duration_str = str(stats['avg_duration']).split('.')[0] if stats['avg_duration'] else "0:00:00"
-        report.append(f"平均持仓时间: {avg_duration_str}")
-        report.append(f"最大连续盈利: {stats['max_consecutive_wins']} 次")
-        report.append(f"最大连续亏损: {stats['max_consecutive_losses']} 次")
-        report.append("")
+        report = [_REPORT_TMPL.format(
+            session_start=self.session_start_time.strftime('%Y-%m-%d %H:%M:%S'),
+            session_end=now.strftime('%Y-%m-%d %H:%M:%S'),
+            session_duration=now - self.session_start_time,
+            avg_duration_str=avg_duration_str,
+            **stats
+        )]
         
         # 策略统计
         if strategy_stats:
@@ -353,18 +444,19 @@ class TradingPerformanceTracker:
         
         return "\n".join(report)
     
-    def save_report_to_file(self):
-        """保存报告到文件"""
+    def save_report_to_file(self, refresh: bool = True):
+        """保存报告到文件（refresh含义同generate_report）"""
         try:
             from config.settings import LOG_DIR
             log_dir = LOG_DIR
-            if not os.path.exists(log_dir):
-                os.makedirs(log_dir)
+            if not TradingPerformanceTracker._log_dir_ready:
+                os.makedirs(log_dir, exist_ok=True)
+                TradingPerformanceTracker._log_dir_ready = True
             
             timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
             filename = f"{log_dir}/trading_performance_{timestamp}.txt"
             
-            report = self.generate_report()
+            report = self.generate_report(refresh)
             with open(filename, 'w', encoding='utf-8') as f:
                 f.write(report)
             
@@ -379,4 +471,25 @@ class TradingPerformanceTracker:
         stats = self.get_statistics()
         print(f"\n📊 当前会话统计:")
         print(f"交易次数: {stats['total_trades']} | 胜率: {stats['win_rate']:.1f}% | "
-              f"总盈亏: {stats['total_profit']:+.2f} | 余额变化: {stats['balance_change']:+.2f}")
\ No newline at end of file
+              f"总盈亏: {stats['total_profit']:+.2f} | 余额变化: {stats['balance_change']:+.2f}")
+
+class PerfUpdater(threading.Thread):
+    """后台交易统计更新线程
+    
+    按固定间隔调用update_positions_from_mt5，避免MT5历史查询阻塞监控主循环
+    """
+    
+    def __init__(self, performance_tracker, interval: float = PERFORMANCE_UPDATE_INTERVAL):
+        super().__init__(name='PerfUpdater', daemon=True)
+        self.performance_tracker = performance_tracker
+        self.interval = interval
+        self.stop_event = threading.Event()
+    
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.performance_tracker.update_positions_from_mt5()
+    
+    def stop(self):
+        """通知线程退出并等待结束"""
+        self.stop_event.set()
+        self.join(timeout=5)
@@ -1,11 +1,55 @@
 """
 日志系统配置
 """
+import atexit
 import logging
+import logging.handlers
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from config.settings import LOG_DIR
 
+# 文件日志缓冲参数：攒满多少条或间隔多久写一次盘
+LOG_BUFFER_CAPACITY = 256
+LOG_FLUSH_INTERVAL = 1.0
+
+def _buffered(file_handler):
+    """用MemoryHandler包装文件处理器，批量写盘；WARNING及以上立即刷新"""
+    memory_handler = logging.handlers.MemoryHandler(
+        capacity=LOG_BUFFER_CAPACITY,
+        flushLevel=logging.WARNING,
+        target=file_handler,
+        flushOnClose=True
+    )
+    memory_handler.setLevel(file_handler.level)
+    atexit.register(memory_handler.flush)
+    return memory_handler
+
+def _start_periodic_flush(handlers, interval=LOG_FLUSH_INTERVAL):
+    """后台线程定期刷新缓冲，保证日志文件接近实时"""
+    def _flush_loop():
+        while True:
+            time.sleep(interval)
+            for handler in handlers:
+                handler.flush()
+    
+    thread = threading.Thread(target=_flush_loop, name='LogFlusher', daemon=True)
+    thread.start()
+    return thread
+
+def _enqueue(*handlers):
+    """创建QueueHandler，由后台QueueListener线程负责实际输出"""
+    log_queue = queue.Queue(-1)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # 入队前只合并消息文本，完整格式由下游处理器负责
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return queue_handler
+
 def setup_logging():
     """设置日志系统"""
     # 创建logs目录
@@ -19,14 +63,21 @@ def setup_logging():
     log_format = '%(asctime)s | %(levelname)s | %(message)s'
     date_format = '%Y-%m-%d %H:%M:%S'
     
-    # 配置根日志记录器
+    # 文件输出经缓冲批量写入，控制台输出保持即时
+    file_handler = logging.FileHandler(log_filename, encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+    buffered_file_handler = _buffered(file_handler)
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(log_format, datefmt=date_format))
+    
+    # 配置根日志记录器：交易线程只负责入队，文件和控制台输出在监听线程中完成
     logging.basicConfig(
         level=logging.INFO,
-        format=log_format,
-        datefmt=date_format,
         handlers=[
-            logging.FileHandler(log_filename, encoding='utf-8'),  # 输出到文件
-            logging.StreamHandler()  # 同时输出到控制台
+            _enqueue(
+                buffered_file_handler,  # 输出到文件（缓冲）
+                console_handler  # 同时输出到控制台
+            )
         ]
     )
     
@@ -42,10 +93,12 @@ def setup_logging():
     
     # 创建交易专用日志记录器
     trade_logger = logging.getLogger('MT5_Trades')
-    trade_logger.addHandler(trade_handler)
-    trade_logger.addHandler(logging.StreamHandler())
+    buffered_trade_handler = _buffered(trade_handler)
+    trade_logger.addHandler(_enqueue(buffered_trade_handler, logging.StreamHandler()))
     trade_logger.setLevel(logging.INFO)
     
+    _start_periodic_flush([buffered_file_handler, buffered_trade_handler])
+    
     logger.info("="*60)
     logger.info("MT5自动交易程序启动")
     logger.info(f"日志文件: {log_filename}")
@@ -13,9 +13,11 @@ from config.logging_config import setup_logging
 # 导入核心模块
 from trading.mt5_connector import initialize_mt5, check_auto_trading, shutdown_mt5
 from strategies.manager import StrategyManager
+from strategies.kernels import warmup as warmup_kernels
 from analysis.performance_tracker import TradingPerformanceTracker
 from analysis.optimizer import ParameterOptimizer
 from ui.menu import main_menu
+from ui.prompt import input_with_keepalive
 
 # 全局日志记录器
 logger = None
@@ -48,22 +50,24 @@ def cleanup_and_generate_final_report(performance_tracker):
             print(f"   盈亏比: {stats['profit_factor']:.2f}")
             
             # 自动保存详细报告
-            filename = performance_tracker.save_report_to_file()
+            filename = performance_tracker.save_report_to_file(refresh=False)
             if filename:
                 print(f"\n✅ 详细交易报告已自动保存到: {filename}")
                 logger.info(f"最终交易报告已保存: {filename}")
             else:
                 print("\n❌ 报告保存失败")
                 
-            # 记录到交易日志
-            trade_logger.info("="*50)
-            trade_logger.info("交易会话结束")
-            trade_logger.info(f"会话时长: {str(session_duration).split('.')[0]}")
-            trade_logger.info(f"总交易: {stats['total_trades']} 笔")
-            trade_logger.info(f"胜率: {stats['win_rate']:.2f}%")
-            trade_logger.info(f"总盈亏: {stats['total_profit']:+.2f}")
-            trade_logger.info(f"余额变化: {stats['balance_change']:+.2f}")
-            trade_logger.info("="*50)
+            # 记录到交易日志（合并为一条多行记录）
+            trade_logger.info("\n".join((
+                "="*50,
+                "交易会话结束",
+                f"会话时长: {str(session_duration).split('.')[0]}",
+                f"总交易: {stats['total_trades']} 笔",
+                f"胜率: {stats['win_rate']:.2f}%",
+                f"总盈亏: {stats['total_profit']:+.2f}",
+                f"余额变化: {stats['balance_change']:+.2f}",
+                "="*50
+            )))
             
         else:
             print("\n📝 本次会话没有进行任何交易")
@@ -110,6 +114,7 @@ def main():
         
         # 创建核心组件
         strategy_manager = StrategyManager()
+        warmup_kernels()  # 预编译指标内核，避免首次信号检查时卡顿
         performance_tracker = TradingPerformanceTracker()
         parameter_optimizer = ParameterOptimizer()
         
@@ -155,7 +160,7 @@ def main():
                 break
             
             # 询问是否继续
-            continue_choice = input("\n是否继续使用程序? (y/N): ").strip().lower()
+            continue_choice = input_with_keepalive("\n是否继续使用程序? (y/N): ", performance_tracker).strip().lower()
             if continue_choice != 'y':
                 break
                 
@@ -8,15 +8,20 @@ import pandas as pd
 import MetaTrader5 as mt5
 from config.settings import (
     SYMBOL, SIGNAL_CHECK_INTERVAL, PRICE_UPDATE_INTERVAL,
-    PERFORMANCE_UPDATE_INTERVAL, DEFAULT_VOLUME
+    DEFAULT_VOLUME
 )
+from analysis.performance_tracker import PerfUpdater
+from monitoring.throttled_printer import ThrottledPrinter
 from trading.mt5_connector import get_real_time_price, check_connection_status
-from trading.order_manager import place_order, close_position
+from trading.order_manager import place_order, close_positions_bulk
 from trading.position_manager import get_positions, check_signal_with_positions, log_market_status
 
 logger = logging.getLogger('MT5_Trading')
 trade_logger = logging.getLogger('MT5_Trades')
 
+# 状态行输出：丢弃重复行，最多每0.2秒写一次终端
+_status_printer = ThrottledPrinter(min_interval=0.2)
+
 def run_automated_trading(strategy_manager, performance_tracker, parameter_optimizer,
                          optimization_interval_hours: int = 24, 
                          optimization_lookback_hours: int = 168):
@@ -44,8 +49,7 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
     # 初始化时间戳
     last_optimization_time = datetime.now()
     last_signal_check = datetime.now()
-    last_status_log = datetime.now()
-    last_performance_update = datetime.now()
+    last_logged_bar = None  # 上次记录详细状态时的最新K线时间
     
     # 缓存数据以提升性能
     cached_df = None
@@ -56,6 +60,13 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
     initial_params = current_strategy.get_params().copy()
     logger.info(f"初始策略参数: {initial_params}")
     
+    # 按最大回望长度预热K线缓存，之后信号检查和参数优化都只做增量拉取
+    parameter_optimizer.get_recent_rates(SYMBOL, max(optimization_lookback_hours * 12, 100))
+    
+    # 交易统计在后台线程中每30秒更新一次
+    perf_updater = PerfUpdater(performance_tracker)
+    perf_updater.start()
+    
     try:
         cycle_count = 0
         while True:
@@ -150,23 +161,18 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
             current_price = tick.bid
             current_positions = get_positions()
             
-            # 每30秒更新一次交易统计
-            if (now - last_performance_update).total_seconds() >= PERFORMANCE_UPDATE_INTERVAL:
-                performance_tracker.update_positions_from_mt5()
-                last_performance_update = now
-            
             # 每10秒获取K线数据并检查信号
             if (now - last_signal_check).total_seconds() >= SIGNAL_CHECK_INTERVAL:
                 logger.debug(f"执行信号检查 (第{cycle_count}次循环)")
                 
-                latest_rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 100)
+                latest_rates = parameter_optimizer.get_recent_rates(SYMBOL, 100)
                 if latest_rates is None:
                     logger.error("无法获取K线数据")
                     time.sleep(5)
                     continue
                 
                 current_df = pd.DataFrame(latest_rates)
-                current_df['time'] = pd.to_datetime(current_df['time'], unit='s')
+                current_df['time'] = parameter_optimizer.get_recent_times(len(latest_rates))
                 
                 cached_df = current_df
                 last_signal_check = now
@@ -178,10 +184,12 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
                 
                 # 处理平仓信号
                 if close_orders:
+                    positions_by_ticket = {pos.ticket: pos for pos in current_positions}
                     for close_order in close_orders:
                         logger.info(f"🔻 自动化交易执行平仓: {close_order['reason']}")
-                        if close_position(close_order['ticket'], close_order['symbol'], 
-                                        close_order['reason'], performance_tracker):
+                    results = close_positions_bulk(close_orders, performance_tracker, positions_by_ticket)
+                    for close_order, closed in zip(close_orders, results):
+                        if closed:
                             print(f"\n✅ 自动平仓成功: 票据{close_order['ticket']} ({close_order['reason']})")
                             performance_tracker.print_summary()
                         else:
@@ -212,10 +220,9 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
                     optimization_count, time_since_last_optimization, optimization_interval_hours
                 )
             
-            # 每5分钟记录详细状态
-            if (now - last_status_log).total_seconds() >= 300:
-                if cached_df is not None:
-                    log_market_status(cached_df, strategy_manager)
+            # 每根K线收盘（最新K线时间变化）记录一次详细状态
+            if cached_df is not None and cached_df['time'].iat[-1] != last_logged_bar:
+                log_market_status(cached_df, strategy_manager)
                 account_info = mt5.account_info()
                 if account_info:
                     logger.info(f"账户状态 | 余额: {account_info.balance:.2f} | 净值: {account_info.equity:.2f} | 保证金: {account_info.margin:.2f}")
@@ -225,7 +232,7 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
                 hours_to_next_optimization = optimization_interval_hours - time_since_last_optimization
                 logger.info(f"自动化交易统计 | 总交易: {stats['total_trades']} | 胜率: {stats['win_rate']:.2f}% | 总盈亏: {stats['total_profit']:+.2f} | 余额变化: {stats['balance_change']:+.2f}")
                 logger.info(f"参数优化状态 | 已优化: {optimization_count}次 | 距离下次: {hours_to_next_optimization:.1f}小时 | 当前参数: {current_strategy.get_params()}")
-                last_status_log = now
+                last_logged_bar = cached_df['time'].iat[-1]
             
             # 动态调整睡眠时间
             time.sleep(PRICE_UPDATE_INTERVAL)
@@ -251,6 +258,9 @@ def run_automated_trading(strategy_manager, performance_tracker, parameter_optim
             print("  ✅ 参数在运行过程中已优化")
         else:
             print("  ➡️ 参数未发生变化")
+    finally:
+        # 任何方式退出都停止后台统计线程，避免其继续查询MT5
+        perf_updater.stop()
 
 def display_auto_trading_status(cached_df, current_price, current_positions, current_strategy,
                                performance_tracker, cycle_count, optimization_count,
@@ -260,21 +270,8 @@ def display_auto_trading_status(cached_df, current_price, current_positions, cur
         latest_kline = cached_df.iloc[-1]
         kline_time = latest_kline['time']
         
-        # 根据策略显示不同指标
-        if current_strategy.get_name() == "双均线策略":
-            ma10 = latest_kline['MA10'] if not pd.isna(latest_kline['MA10']) else 0
-            ma20 = latest_kline['MA20'] if not pd.isna(latest_kline['MA20']) else 0
-            indicator_info = f"MA10: {ma10:.2f} | MA20: {ma20:.2f}"
-        elif current_strategy.get_name() == "DKLL策略":
-            dk = latest_kline.get('DK', 0)
-            ll = latest_kline.get('LL', 0)
-            dl = latest_kline.get('DL', 0)
-            indicator_info = f"DK: {dk} | LL: {ll} | DL: {dl}"
-        elif current_strategy.get_name() == "RSI策略":
-            rsi = latest_kline.get('RSI', 0)
-            indicator_info = f"RSI: {rsi:.2f}"
-        else:
-            indicator_info = "计算中..."
+        # 指标信息由策略自行格式化
+        indicator_info = current_strategy.format_row(latest_kline)
         
         # 添加交易统计和优化信息到显示
         stats = performance_tracker.get_statistics()
@@ -284,13 +281,13 @@ def display_auto_trading_status(cached_df, current_price, current_positions, cur
         hours_to_next_optimization = optimization_interval_hours - time_since_last_optimization
         optimization_info = f"优化: {optimization_count}次 | 下次: {hours_to_next_optimization:.1f}h"
         
-        print(f"\r🤖 {kline_time} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 周期: {cycle_count}", end="")
+        _status_printer.write(f"🤖 {kline_time} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 周期: {cycle_count}")
     else:
         stats = performance_tracker.get_statistics()
         stats_info = f"交易: {stats['total_trades']} | 胜率: {stats['win_rate']:.1f}% | 盈亏: {stats['total_profit']:+.2f}"
         hours_to_next_optimization = optimization_interval_hours - time_since_last_optimization
         optimization_info = f"优化: {optimization_count}次 | 下次: {hours_to_next_optimization:.1f}h"
-        print(f"\r🤖 实时价格: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 周期: {cycle_count}", end="")
+        _status_printer.write(f"🤖 实时价格: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 周期: {cycle_count}")
 
 def display_quick_status(current_price, current_positions, performance_tracker,
                         last_signal_check, now, cycle_count, connection_error_count,
@@ -302,4 +299,4 @@ def display_quick_status(current_price, current_positions, performance_tracker,
     stats_info = f"交易: {stats['total_trades']} | 盈亏: {stats['total_profit']:+.2f}"
     hours_to_next_optimization = optimization_interval_hours - time_since_last_optimization
     optimization_info = f"优化: {optimization_count}次 | 下次: {hours_to_next_optimization:.1f}h"
-    print(f"\r🤖 实时: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 下次检查: {time_remaining:.0f}s | 周期: {cycle_count}{error_info}", end="")
\ No newline at end of file
+    _status_printer.write(f"🤖 实时: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info} | {optimization_info} | 下次检查: {time_remaining:.0f}s | 周期: {cycle_count}{error_info}")
\ No newline at end of file
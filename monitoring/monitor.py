@@ -1,181 +1,271 @@
 """
 各种监控模式
 """
+import asyncio
 import logging
 import time
-from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import pandas as pd
 import MetaTrader5 as mt5
 from config.settings import (
     SYMBOL, SIGNAL_CHECK_INTERVAL, PRICE_UPDATE_INTERVAL,
-    DEFAULT_VOLUME, PERFORMANCE_UPDATE_INTERVAL
+    DEFAULT_VOLUME
 )
+from analysis.performance_tracker import PerfUpdater
 from trading.mt5_connector import get_real_time_price, check_connection_status
-from trading.order_manager import place_order, close_position
+from trading.rates_cache import get_recent_rates, get_recent_times
+from trading.order_manager import place_order, close_positions_bulk
 from trading.position_manager import get_positions, check_signal_with_positions, log_market_status
+from monitoring.tick_dispatcher import TickDispatcher
+from monitoring.throttled_printer import ThrottledPrinter
 
 logger = logging.getLogger('MT5_Trading')
 trade_logger = logging.getLogger('MT5_Trades')
 
+# 状态行输出：丢弃重复行，最多每0.2秒写一次终端
+_status_printer = ThrottledPrinter(min_interval=0.2)
+
+# 高速监控状态行的最小刷新间隔（秒）
+DISPLAY_THROTTLE = 0.25
+
+# 高速监控刷新持仓的间隔（秒），手动或止盈止损平仓后及时反映到状态显示
+POSITIONS_REFRESH_INTERVAL = 1.0
+
+# 高速监控每个tick都会刷新的状态行模板（%格式化比f-string略快）
+_QUICK_LINE = "💹 实时: %.2f | 持仓: %d | 下次检查: %.0fs | 周期: %d"
+_QUICK_ERROR = " | 连接错误: %d"
+
+# 监控循环使用的MT5调用线程池：价格、持仓、K线等阻塞调用在线程中并发执行
+_mt5_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='MT5Monitor')
+
+# 最近一次指标计算结果：同一根K线且价格未变化时直接复用
+_last_ind_key = None
+_last_ind_df = None
+
+def _indicator_df(symbol, rates, strategy_manager):
+    """把K线数据转换为DataFrame并计算指标
+
+    以（品种、K线数量、最新K线时间和OHLC、策略及其参数）为键，
+    输入未变化时直接返回上次的计算结果
+    """
+    global _last_ind_key, _last_ind_df
+    strategy = strategy_manager.get_current_strategy()
+    last_bar = rates[-1]
+    key = (
+        symbol, len(rates),
+        tuple(last_bar[field].item() for field in ('time', 'open', 'high', 'low', 'close')),
+        id(strategy), strategy_manager.generation,
+        tuple(sorted(strategy.get_params().items()))
+    )
+    if key == _last_ind_key:
+        return _last_ind_df
+    
+    indicators = strategy_manager.calculate_indicators_np(rates)
+    if indicators is not None:
+        # 策略提供NumPy实现：K线字段和指标列一次性构造DataFrame
+        columns = {name: rates[name] for name in rates.dtype.names}
+        columns['time'] = get_recent_times(symbol, len(rates))
+        columns.update(indicators)
+        df = pd.DataFrame(columns)
+    else:
+        df = pd.DataFrame(rates)
+        df['time'] = get_recent_times(symbol, len(rates))
+        
+        # 使用策略管理器计算指标
+        df = strategy_manager.calculate_indicators(df)
+    
+    _last_ind_key = key
+    _last_ind_df = df
+    return df
+
+async def _call_mt5(func, *args):
+    """在线程池中执行阻塞的MT5调用"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_mt5_pool, func, *args)
+
+async def _fetch_tick_and_positions():
+    """并发获取实时价格和当前持仓"""
+    return await asyncio.gather(
+        _call_mt5(get_real_time_price, SYMBOL),
+        _call_mt5(get_positions)
+    )
+
+def _bind_strategy(strategy_manager):
+    """读取当前策略、策略名称和策略管理器的切换计数（监控循环在循环外缓存）"""
+    strategy = strategy_manager.get_current_strategy()
+    return strategy, strategy.get_name(), strategy_manager.generation
+
 def run_continuous_monitoring(strategy_manager, performance_tracker):
-    """运行持续监控 - 高速版"""
-    current_strategy = strategy_manager.get_current_strategy()
-    logger.info(f"开始高速持续监控交易信号... 当前策略: {current_strategy.get_name()}")
+    """运行持续监控 - 高速版（每次轮询刷新显示，定时检查信号）"""
+    current_strategy, strategy_name, generation = _bind_strategy(strategy_manager)
+    logger.info(f"开始高速持续监控交易信号... 当前策略: {strategy_name}")
     print("按 Ctrl+C 停止监控")
-    print(f"监控模式: 高速 (每秒更新价格，每10秒检查信号) | 策略: {current_strategy.get_name()}")
+    print(f"监控模式: 高速 (实时更新，每10秒检查信号) | 策略: {strategy_name}")
     
-    last_signal_check = datetime.now()
-    last_status_log = datetime.now()
-    last_ma_calculation = datetime.now()
+    state = {
+        'strategy': (current_strategy, strategy_name, generation),
+        'cycle_count': 0,
+        'connection_error_count': 0,  # 连接错误计数
+        'cached_df': None,            # 缓存数据以提升性能
+        'current_positions': get_positions(),
+        'last_signal_check': time.monotonic(),
+        'last_display': 0.0,
+        'last_logged_bar': None,      # 上次记录详细状态时的最新K线时间
+    }
+    dispatcher = TickDispatcher(SYMBOL)
     
-    # 缓存数据以提升性能
-    cached_df = None
-    connection_error_count = 0  # 连接错误计数
-    
-    try:
-        cycle_count = 0
-        while True:
-            cycle_count += 1
-            now = datetime.now()
-            
-            # 快速获取当前价格（每秒更新）
-            tick = get_real_time_price(SYMBOL)
-            if tick is None:
-                connection_error_count += 1
-                logger.warning(f"第{connection_error_count}次无法获取实时价格")
-                
-                if connection_error_count >= 5:
-                    logger.error("连续5次无法获取价格，可能的原因：")
-                    logger.error("1. 当前时间市场休市")
-                    logger.error("2. 网络连接问题")
-                    logger.error("3. MT5服务器连接断开")
-                    
-                    # 检查是否是周末
-                    weekday = now.weekday()
-                    if weekday >= 5:  # 周六(5)或周日(6)
-                        logger.info("当前是周末，外汇市场休市")
-                        print(f"\n🔔 检测到周末市场休市，暂停监控60秒...")
-                        time.sleep(60)
-                        connection_error_count = 0
-                        continue
-                    
-                    # 尝试重新连接
-                    logger.info("尝试重新连接MT5...")
-                    if check_connection_status():
-                        logger.info("重新连接成功")
-                        connection_error_count = 0
-                    else:
-                        logger.error("重新连接失败，等待30秒后继续尝试")
-                        time.sleep(30)
-                        continue
-                
-                time.sleep(5)  # 等待5秒后重试
-                continue
-            else:
-                # 成功获取价格，重置错误计数
-                if connection_error_count > 0:
-                    logger.info("价格获取恢复正常")
-                    connection_error_count = 0
+    def handle_missing():
+        """无法获取价格时的处理，返回等待秒数"""
+        state['cycle_count'] += 1
+        state['connection_error_count'] += 1
+        connection_error_count = state['connection_error_count']
+        logger.warning(f"第{connection_error_count}次无法获取实时价格")
+        
+        if connection_error_count >= 5:
+            logger.error("连续5次无法获取价格，可能的原因：")
+            logger.error("1. 当前时间市场休市")
+            logger.error("2. 网络连接问题")
+            logger.error("3. MT5服务器连接断开")
             
-            current_price = tick.bid
-            current_positions = get_positions()
+            # 检查是否是周末
+            if datetime.now().weekday() >= 5:  # 周六(5)或周日(6)
+                logger.info("当前是周末，外汇市场休市")
+                print(f"\n🔔 检测到周末市场休市，暂停监控60秒...")
+                state['connection_error_count'] = 0
+                return 60
             
-            # 每10秒获取K线数据并检查信号
-            if (now - last_signal_check).total_seconds() >= SIGNAL_CHECK_INTERVAL:
-                logger.debug(f"执行信号检查 (第{cycle_count}次循环)")
-                
-                latest_rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 100)  # 根据策略需要调整数据量
-                if latest_rates is None:
-                    logger.error("无法获取K线数据")
-                    time.sleep(5)
-                    continue
-                
-                current_df = pd.DataFrame(latest_rates)
-                current_df['time'] = pd.to_datetime(current_df['time'], unit='s')
-                
-                # 使用策略管理器计算指标
-                current_df = strategy_manager.calculate_indicators(current_df)
-                
-                cached_df = current_df
-                last_signal_check = now
-                
-                # 详细信号检查
-                signal = strategy_manager.generate_signal(current_df, verbose=True)
-                
-                if signal and len(current_positions) == 0:
-                    logger.info(f"🚨 检测到{signal}信号，立即下单！")
-                    if place_order(SYMBOL, signal, DEFAULT_VOLUME, strategy_manager, performance_tracker):
-                        trade_logger.info(f"高速监控交易 | {current_strategy.get_name()} | {signal}信号成功执行")
-                        print(f"\n✅ {signal}订单已提交！继续监控...")
-                    else:
-                        trade_logger.error(f"高速监控失败 | {current_strategy.get_name()} | {signal}信号触发但下单失败")
-                        print(f"\n❌ {signal}下单失败！继续监控...")
-                
-                # 更新状态显示
-                display_monitoring_status(cached_df, current_price, current_positions, 
-                                        current_strategy, cycle_count)
+            # 尝试重新连接
+            logger.info("尝试重新连接MT5...")
+            if check_connection_status():
+                logger.info("重新连接成功")
+                state['connection_error_count'] = 0
             else:
-                # 快速模式：只显示价格变化
-                display_quick_monitoring_status(current_price, current_positions, 
-                                              last_signal_check, now, cycle_count, 
-                                              connection_error_count)
-            
-            # 每5分钟记录详细状态
-            if (now - last_status_log).total_seconds() >= 300:
-                if cached_df is not None:
-                    log_market_status(cached_df, strategy_manager)
-                account_info = mt5.account_info()
-                if account_info:
-                    logger.info(f"账户状态 | 余额: {account_info.balance:.2f} | 净值: {account_info.equity:.2f} | 保证金: {account_info.margin:.2f}")
-                last_status_log = now
-            
-            # 动态调整睡眠时间
-            time.sleep(PRICE_UPDATE_INTERVAL)
-            
+                logger.error("重新连接失败，等待30秒后继续尝试")
+                return 30
+        
+        return 5  # 等待5秒后重试
+    
+    def count_poll(tick):
+        """每次成功取价计一个监控周期"""
+        if state['connection_error_count'] > 0:
+            logger.info("价格获取恢复正常")
+            state['connection_error_count'] = 0
+        state['cycle_count'] += 1
+    
+    def show_quick_status(tick):
+        """刷新快速状态显示（价格不变时倒计时和持仓数也照常更新；刚显示过详细状态时跳过）"""
+        mono = time.monotonic()
+        if mono - state['last_display'] < DISPLAY_THROTTLE:
+            return
+        state['last_display'] = mono
+        display_quick_monitoring_status(tick.bid, state['current_positions'],
+                                      state['last_signal_check'], mono,
+                                      state['cycle_count'], state['connection_error_count'])
+    
+    def check_signal(tick):
+        """每10秒获取K线数据并检查信号"""
+        logger.debug(f"执行信号检查 (第{state['cycle_count']}次循环)")
+        if state['strategy'][2] != strategy_manager.generation:
+            state['strategy'] = _bind_strategy(strategy_manager)
+        current_strategy, strategy_name, _ = state['strategy']
+        current_positions = get_positions()
+        state['current_positions'] = current_positions
+        
+        latest_rates = get_recent_rates(SYMBOL, 100)  # 根据策略需要调整数据量
+        if latest_rates is None:
+            logger.error("无法获取K线数据")
+            return
+        
+        current_df = _indicator_df(SYMBOL, latest_rates, strategy_manager)
+        
+        state['cached_df'] = current_df
+        state['last_signal_check'] = time.monotonic()
+        
+        # 新K线出现（上一根收盘）时记录一次详细状态
+        bar_time = current_df['time'].iat[-1]
+        if bar_time != state['last_logged_bar']:
+            state['last_logged_bar'] = bar_time
+            log_status(current_df)
+        
+        # 详细信号检查
+        signal = strategy_manager.generate_signal(current_df, verbose=True)
+        
+        if signal and len(current_positions) == 0:
+            logger.info(f"🚨 检测到{signal}信号，立即下单！")
+            if place_order(SYMBOL, signal, DEFAULT_VOLUME, strategy_manager, performance_tracker):
+                trade_logger.info(f"高速监控交易 | {strategy_name} | {signal}信号成功执行")
+                print(f"\n✅ {signal}订单已提交！继续监控...")
+            else:
+                trade_logger.error(f"高速监控失败 | {strategy_name} | {signal}信号触发但下单失败")
+                print(f"\n❌ {signal}下单失败！继续监控...")
+        
+        # 更新状态显示
+        display_monitoring_status(current_df, tick.bid, current_positions,
+                                current_strategy, state['cycle_count'])
+        state['last_display'] = time.monotonic()
+    
+    def refresh_positions(tick):
+        """每秒刷新持仓（get_positions自带短时缓存）"""
+        state['current_positions'] = get_positions()
+    
+    def log_status(current_df):
+        """每根K线收盘记录详细状态"""
+        log_market_status(current_df, strategy_manager)
+        account_info = mt5.account_info()
+        if account_info:
+            logger.info(f"账户状态 | 余额: {account_info.balance:.2f} | 净值: {account_info.equity:.2f} | 保证金: {account_info.margin:.2f}")
+    
+    dispatcher.on_missing(handle_missing)
+    dispatcher.every(0, count_poll)
+    dispatcher.every(POSITIONS_REFRESH_INTERVAL, refresh_positions)
+    dispatcher.every(SIGNAL_CHECK_INTERVAL, check_signal)
+    dispatcher.every(PRICE_UPDATE_INTERVAL, show_quick_status)
+    # 最后注册：每轮轮询结束时写出被节流暂存的状态行（如紧跟快速状态之后的详细状态）
+    dispatcher.every(0, lambda tick: _status_printer.flush())
+    
+    try:
+        dispatcher.run_forever()
     except KeyboardInterrupt:
         logger.info("高速监控被用户停止")
-        print(f"\n监控结束，共执行 {cycle_count} 个监控周期")
+        print(f"\n监控结束，共执行 {state['cycle_count']} 个监控周期")
 
 def run_classic_monitoring(strategy_manager, performance_tracker):
     """运行经典监控模式 (原速度)"""
-    current_strategy = strategy_manager.get_current_strategy()
-    logger.info(f"开始经典模式监控... 当前策略: {current_strategy.get_name()}")
+    current_strategy, strategy_name, generation = _bind_strategy(strategy_manager)
+    logger.info(f"开始经典模式监控... 当前策略: {strategy_name}")
     print("按 Ctrl+C 停止监控")
-    print(f"监控模式: 经典 (每5秒全面更新) | 策略: {current_strategy.get_name()}")
+    print(f"监控模式: 经典 (每5秒全面更新) | 策略: {strategy_name}")
     
-    last_signal_check = datetime.now()
-    last_status_log = datetime.now()
+    last_signal_check = time.monotonic()
     
     try:
         while True:
-            latest_rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 100)
+            latest_rates = get_recent_rates(SYMBOL, 100)
             if latest_rates is None:
                 logger.error("无法获取最新数据")
                 time.sleep(30)
                 continue
             
-            current_df = pd.DataFrame(latest_rates)
-            current_df['time'] = pd.to_datetime(current_df['time'], unit='s')
+            if generation != strategy_manager.generation:
+                current_strategy, strategy_name, generation = _bind_strategy(strategy_manager)
             
-            # 使用策略管理器计算指标
-            current_df = strategy_manager.calculate_indicators(current_df)
+            current_df = _indicator_df(SYMBOL, latest_rates, strategy_manager)
             
             # 每分钟详细检查一次信号
-            now = datetime.now()
-            verbose = (now - last_signal_check).seconds >= 60
+            mono = time.monotonic()
+            verbose = mono - last_signal_check >= 60
             if verbose:
-                last_signal_check = now
+                last_signal_check = mono
             
-            # 每5分钟记录一次状态
-            if (now - last_status_log).seconds >= 300:
-                log_market_status(current_df, strategy_manager)
-                last_status_log = now
+            # 每根K线记录一次状态（最新K线时间未变化时log_market_status直接返回）
+            log_market_status(current_df, strategy_manager)
             
             signal = strategy_manager.generate_signal(current_df, verbose=verbose)
             current_positions = get_positions()
             
-            current_time = current_df.iloc[-1]['time']
-            current_price = current_df.iloc[-1]['close']
+            current_time = current_df['time'].iat[-1]
+            current_price = current_df['close'].iat[-1]
             
             # 根据策略显示不同信息
             display_classic_monitoring_status(current_df, current_time, current_price, 
@@ -184,10 +274,10 @@ def run_classic_monitoring(strategy_manager, performance_tracker):
             if signal and len(current_positions) == 0:
                 logger.info(f"检测到{signal}信号，准备下单")
                 if place_order(SYMBOL, signal, DEFAULT_VOLUME, strategy_manager, performance_tracker):
-                    trade_logger.info(f"经典监控交易 | {current_strategy.get_name()} | {signal}信号触发成功")
+                    trade_logger.info(f"经典监控交易 | {strategy_name} | {signal}信号触发成功")
                     print("\n✅ 订单已提交！继续监控...")
                 else:
-                    trade_logger.error(f"经典监控失败 | {current_strategy.get_name()} | {signal}信号触发但下单失败")
+                    trade_logger.error(f"经典监控失败 | {strategy_name} | {signal}信号触发但下单失败")
                     print("\n❌ 下单失败！继续监控...")
             
             time.sleep(5)
@@ -197,31 +287,41 @@ def run_classic_monitoring(strategy_manager, performance_tracker):
 
 def run_timed_monitoring(strategy_manager, performance_tracker, minutes):
     """运行限时监控 - 高速版"""
-    current_strategy = strategy_manager.get_current_strategy()
-    logger.info(f"开始高速限时监控 {minutes} 分钟，当前策略: {current_strategy.get_name()}")
-    end_time = datetime.now() + timedelta(minutes=minutes)
+    try:
+        asyncio.run(_run_timed_async(strategy_manager, performance_tracker, minutes))
+    except KeyboardInterrupt:
+        pass
+
+async def _run_timed_async(strategy_manager, performance_tracker, minutes):
+    """限时监控主循环（异步）"""
+    current_strategy, strategy_name, generation = _bind_strategy(strategy_manager)
+    logger.info(f"开始高速限时监控 {minutes} 分钟，当前策略: {strategy_name}")
+    end_mono = time.monotonic() + minutes * 60
     
-    if current_strategy.get_name() == "DKLL策略":
+    if strategy_name == "DKLL策略":
         print("🔔 DKLL策略：不使用止盈止损，完全依靠信号平仓")
     
     cached_df = None
-    last_signal_check = datetime.now()
-    last_performance_update = datetime.now()
+    last_signal_check = time.monotonic()
+    last_verbose_check = float('-inf')
     cycle_count = 0
     connection_error_count = 0
     
+    # 交易统计在后台线程中每30秒更新一次
+    perf_updater = PerfUpdater(performance_tracker)
+    perf_updater.start()
+    
     try:
-        while datetime.now() < end_time:
+        while (mono := time.monotonic()) < end_mono:
             cycle_count += 1
-            now = datetime.now()
-            remaining = end_time - now
+            remaining = int(end_mono - mono)
             
-            # 快速获取当前价格
-            tick = get_real_time_price(SYMBOL)
+            # 快速获取当前价格和持仓（两个请求并发）
+            tick, current_positions = await _fetch_tick_and_positions()
             if tick is None:
                 connection_error_count += 1
                 logger.warning(f"第{connection_error_count}次无法获取实时价格")
-                time.sleep(2)
+                await asyncio.sleep(2)
                 continue
             else:
                 if connection_error_count > 0:
@@ -229,47 +329,51 @@ def run_timed_monitoring(strategy_manager, performance_tracker, minutes):
                     connection_error_count = 0
                 
             current_price = tick.bid
-            current_positions = get_positions()
-            
-            # 每30秒更新一次交易统计
-            if (now - last_performance_update).total_seconds() >= PERFORMANCE_UPDATE_INTERVAL:
-                performance_tracker.update_positions_from_mt5()
-                last_performance_update = now
             
             # 每10秒检查信号
-            if (now - last_signal_check).total_seconds() >= SIGNAL_CHECK_INTERVAL:
-                latest_rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 100)
+            if mono - last_signal_check >= SIGNAL_CHECK_INTERVAL:
+                if generation != strategy_manager.generation:
+                    current_strategy, strategy_name, generation = _bind_strategy(strategy_manager)
+                
+                latest_rates = await _call_mt5(get_recent_rates, SYMBOL, 100)
                 if latest_rates is None:
                     logger.error("无法获取K线数据")
-                    time.sleep(5)
+                    await asyncio.sleep(5)
                     continue
                 
                 current_df = pd.DataFrame(latest_rates)
-                current_df['time'] = pd.to_datetime(current_df['time'], unit='s')
+                current_df['time'] = get_recent_times(SYMBOL, len(latest_rates))
                 
                 cached_df = current_df
-                last_signal_check = now
+                last_signal_check = mono
+                
+                # 每分钟详细记录一次信号检查过程
+                verbose = mono - last_verbose_check >= 60
+                if verbose:
+                    last_verbose_check = mono
                 
                 # 使用新的信号检查函数
                 signal, close_orders = check_signal_with_positions(
-                    current_df, current_positions, strategy_manager, verbose=True
+                    current_df, current_positions, strategy_manager, verbose=verbose
                 )
                 
                 # 处理平仓信号
                 if close_orders:
+                    positions_by_ticket = {pos.ticket: pos for pos in current_positions}
                     for close_order in close_orders:
                         logger.info(f"限时监控中检测到平仓信号: {close_order['reason']}")
-                        if close_position(close_order['ticket'], close_order['symbol'], 
-                                        close_order['reason'], performance_tracker):
-                            trade_logger.info(f"限时监控平仓 | {current_strategy.get_name()} | {close_order['reason']}成功")
+                    results = await _call_mt5(close_positions_bulk, close_orders, performance_tracker, positions_by_ticket)
+                    for close_order, closed in zip(close_orders, results):
+                        if closed:
+                            trade_logger.info(f"限时监控平仓 | {strategy_name} | {close_order['reason']}成功")
                             print(f"\n✅ 平仓成功: {close_order['reason']}")
                             performance_tracker.print_summary()
                 
                 # 处理开仓信号
                 elif signal and len(current_positions) == 0:
                     logger.info(f"限时监控中检测到{signal}信号")
-                    if place_order(SYMBOL, signal, DEFAULT_VOLUME, strategy_manager, performance_tracker):
-                        trade_logger.info(f"限时监控交易 | {current_strategy.get_name()} | {signal}信号成功执行")
+                    if await _call_mt5(place_order, SYMBOL, signal, DEFAULT_VOLUME, strategy_manager, performance_tracker):
+                        trade_logger.info(f"限时监控交易 | {strategy_name} | {signal}信号成功执行")
                         print(f"\n✅ {signal}订单已提交！")
                         performance_tracker.print_summary()
             
@@ -279,18 +383,19 @@ def run_timed_monitoring(strategy_manager, performance_tracker, minutes):
                 remaining, performance_tracker, connection_error_count
             )
             
-            time.sleep(1)  # 高速更新
+            await asyncio.sleep(1)  # 高速更新
             
         logger.info(f"限时监控结束，共监控了 {minutes} 分钟，执行了 {cycle_count} 个周期")
         
-        # 显示最终统计
-        performance_tracker.update_positions_from_mt5()
-        performance_tracker.print_summary()
-        
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
         logger.info("限时监控被用户中断")
-        performance_tracker.update_positions_from_mt5()
-        performance_tracker.print_summary()
+    finally:
+        # 任何方式退出都停止后台统计线程，避免其继续查询MT5
+        perf_updater.stop()
+    
+    # 显示最终统计
+    performance_tracker.update_positions_from_mt5()
+    performance_tracker.print_summary()
 
 def display_monitoring_status(cached_df, current_price, current_positions, current_strategy, cycle_count):
     """显示监控状态"""
@@ -298,80 +403,44 @@ def display_monitoring_status(cached_df, current_price, current_positions, curre
         latest_kline = cached_df.iloc[-1]
         kline_time = latest_kline['time']
         
-        # 根据策略显示不同指标
-        if current_strategy.get_name() == "双均线策略":
-            ma10 = latest_kline['MA10'] if not pd.isna(latest_kline['MA10']) else 0
-            ma20 = latest_kline['MA20'] if not pd.isna(latest_kline['MA20']) else 0
-            indicator_info = f"MA10: {ma10:.2f} | MA20: {ma20:.2f}"
-        elif current_strategy.get_name() == "DKLL策略":
-            dk = latest_kline.get('DK', 0)
-            ll = latest_kline.get('LL', 0)
-            dl = latest_kline.get('DL', 0)
-            indicator_info = f"DK: {dk} | LL: {ll} | DL: {dl}"
-        elif current_strategy.get_name() == "RSI策略":
-            rsi = latest_kline.get('RSI', 0)
-            indicator_info = f"RSI: {rsi:.2f}"
-        else:
-            indicator_info = "计算中..."
+        # 指标信息由策略自行格式化
+        indicator_info = current_strategy.format_row(latest_kline)
         
-        print(f"\r🔍 {kline_time} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | 周期: {cycle_count}", end="")
+        _status_printer.write(f"🔍 {kline_time} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | 周期: {cycle_count}")
     else:
-        print(f"\r💹 实时价格: {current_price:.2f} | 持仓: {len(current_positions)} | 周期: {cycle_count}", end="")
+        _status_printer.write(f"💹 实时价格: {current_price:.2f} | 持仓: {len(current_positions)} | 周期: {cycle_count}")
 
 def display_quick_monitoring_status(current_price, current_positions, last_signal_check, now, 
                                    cycle_count, connection_error_count):
-    """显示快速监控状态"""
-    time_remaining = SIGNAL_CHECK_INTERVAL - (now - last_signal_check).total_seconds()
-    error_info = f" | 连接错误: {connection_error_count}" if connection_error_count > 0 else ""
-    print(f"\r💹 实时: {current_price:.2f} | 持仓: {len(current_positions)} | 下次检查: {time_remaining:.0f}s | 周期: {cycle_count}{error_info}", end="")
+    """显示快速监控状态（last_signal_check和now为time.monotonic()时间）"""
+    time_remaining = SIGNAL_CHECK_INTERVAL - (now - last_signal_check)
+    line = _QUICK_LINE % (current_price, len(current_positions), time_remaining, cycle_count)
+    if connection_error_count > 0:
+        line += _QUICK_ERROR % connection_error_count
+    _status_printer.write(line)
 
 def display_classic_monitoring_status(current_df, current_time, current_price, current_positions, current_strategy):
     """显示经典监控状态"""
-    if current_strategy.get_name() == "双均线策略":
-        ma10 = current_df.iloc[-1]['MA10']
-        ma20 = current_df.iloc[-1]['MA20']
-        print(f"\r📊 {current_time} | 价格: {current_price:.2f} | MA10: {ma10:.2f} | MA20: {ma20:.2f} | 持仓: {len(current_positions)}", end="")
-    elif current_strategy.get_name() == "DKLL策略":
-        dk = current_df.iloc[-1].get('DK', 0)
-        ll = current_df.iloc[-1].get('LL', 0)
-        dl = current_df.iloc[-1].get('DL', 0)
-        print(f"\r📊 {current_time} | 价格: {current_price:.2f} | DK: {dk} | LL: {ll} | DL: {dl} | 持仓: {len(current_positions)}", end="")
-    elif current_strategy.get_name() == "RSI策略":
-        rsi = current_df.iloc[-1].get('RSI', 0)
-        print(f"\r📊 {current_time} | 价格: {current_price:.2f} | RSI: {rsi:.2f} | 持仓: {len(current_positions)}", end="")
-    else:
-        print(f"\r📊 {current_time} | 价格: {current_price:.2f} | 持仓: {len(current_positions)}", end="")
+    indicator_info = current_strategy.format_row(current_df.iloc[-1])
+    _status_printer.write(f"📊 {current_time} | 价格: {current_price:.2f} | {indicator_info} | 持仓: {len(current_positions)}")
 
 def display_timed_monitoring_status(cached_df, current_price, current_positions, current_strategy,
                                    remaining, performance_tracker, connection_error_count):
-    """显示限时监控状态"""
+    """显示限时监控状态（remaining为剩余秒数）"""
     if cached_df is not None and len(cached_df) > 0:
         latest_kline = cached_df.iloc[-1]
         
-        # 根据策略显示不同指标
-        if current_strategy.get_name() == "双均线策略":
-            ma10 = latest_kline['MA10'] if not pd.isna(latest_kline['MA10']) else 0
-            ma20 = latest_kline['MA20'] if not pd.isna(latest_kline['MA20']) else 0
-            indicator_info = f"MA10: {ma10:.2f} | MA20: {ma20:.2f}"
-        elif current_strategy.get_name() == "DKLL策略":
-            dk = latest_kline.get('DK', 0)
-            ll = latest_kline.get('LL', 0)
-            dl = latest_kline.get('DL', 0)
-            indicator_info = f"DK: {dk} | LL: {ll} | DL: {dl}"
-        elif current_strategy.get_name() == "RSI策略":
-            rsi = latest_kline.get('RSI', 0)
-            indicator_info = f"RSI: {rsi:.2f}"
-        else:
-            indicator_info = "计算中..."
+        # 指标信息由策略自行格式化
+        indicator_info = current_strategy.format_row(latest_kline)
             
         # 添加交易统计
         stats = performance_tracker.get_statistics()
         stats_info = f"交易: {stats['total_trades']} | 胜率: {stats['win_rate']:.1f}% | 盈亏: {stats['total_profit']:+.2f}"
         error_info = f" | 错误: {connection_error_count}" if connection_error_count > 0 else ""
         
-        print(f"\r⏱️ {remaining.seconds//60}:{remaining.seconds%60:02d} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | {stats_info}{error_info}", end="")
+        _status_printer.write(f"⏱️ {remaining//60}:{remaining%60:02d} | 实时: {current_price:.2f} | K线: {latest_kline['close']:.2f} | {indicator_info} | 持仓: {len(current_positions)} | {stats_info}{error_info}")
     else:
         stats = performance_tracker.get_statistics()
         stats_info = f"交易: {stats['total_trades']} | 盈亏: {stats['total_profit']:+.2f}"
         error_info = f" | 错误: {connection_error_count}" if connection_error_count > 0 else ""
-        print(f"\r⏱️ {remaining.seconds//60}:{remaining.seconds%60:02d} | 实时: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info}{error_info}", end="")
\ No newline at end of file
+        _status_printer.write(f"⏱️ {remaining//60}:{remaining%60:02d} | 实时: {current_price:.2f} | 持仓: {len(current_positions)} | {stats_info}{error_info}")
\ No newline at end of file
@@ -10,25 +10,31 @@ import MetaTrader5 as mt5
 from config.settings import SIGNAL_CHECK_INTERVAL, PRICE_UPDATE_INTERVAL
 from trading.mt5_connector import get_real_time_price, check_connection_status
 from trading.order_manager import place_order, close_position
+from trading.rates_cache import get_recent_rates, get_recent_times
 from trading.position_manager import get_positions, check_signal_with_positions
-from trading.money_manager import MoneyManager
+from trading.money_manager import get_money_manager
 from notifications.dingtalk import DingTalkNotifier
+from monitoring.throttled_printer import ThrottledPrinter
 
 logger = logging.getLogger('MultiSymbolMonitor')
 
+# 状态行输出：丢弃重复行，最多每0.2秒写一次终端
+_status_printer = ThrottledPrinter(min_interval=0.2)
+
 class MultiSymbolMonitor:
     """多币种监控器"""
     
     def __init__(self, strategy_manager, performance_tracker, notifier: Optional[DingTalkNotifier] = None):
         self.strategy_manager = strategy_manager
         self.performance_tracker = performance_tracker
-        self.money_manager = MoneyManager()
+        self.money_manager = get_money_manager()
         self.notifier = notifier
         self.logger = logging.getLogger('MultiSymbolMonitor')
         
         # 为每个币种存储状态
         self.symbol_states = {}
         self.last_signal_check = {}
+        self.last_verbose_check = {}  # 各币种上次详细记录信号检查的时间（monotonic）
         self.cached_data = {}
         
         # 初始化每个币种的状态
@@ -124,13 +130,13 @@ class MultiSymbolMonitor:
         
         try:
             # 获取K线数据
-            rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, 100)
+            rates = get_recent_rates(symbol, 100)
             if rates is None:
                 self.logger.error(f"无法获取 {symbol} 的K线数据")
                 return
             
             df = pd.DataFrame(rates)
-            df['time'] = pd.to_datetime(df['time'], unit='s')
+            df['time'] = get_recent_times(symbol, len(rates))
             
             # 缓存数据
             self.cached_data[symbol] = df
@@ -138,15 +144,20 @@ class MultiSymbolMonitor:
             # 获取当前持仓
             current_positions = get_positions(symbol)
             
-            # 检查信号
+            # 检查信号（每个币种每分钟详细记录一次检查过程）
+            mono = time.monotonic()
+            verbose = mono - self.last_verbose_check.get(symbol, float('-inf')) >= 60
+            if verbose:
+                self.last_verbose_check[symbol] = mono
             signal, close_orders = check_signal_with_positions(
-                df, current_positions, self.strategy_manager, verbose=True
+                df, current_positions, self.strategy_manager, verbose=verbose
             )
             
             # 处理平仓信号
             if close_orders:
+                positions_by_ticket = {pos.ticket: pos for pos in current_positions}
                 for close_order in close_orders:
-                    self._handle_close_order(symbol, close_order)
+                    self._handle_close_order(symbol, close_order, positions_by_ticket)
             
             # 处理开仓信号
             elif signal and len(current_positions) == 0:
@@ -211,17 +222,15 @@ class MultiSymbolMonitor:
                     'suggestion': '请检查账户余额和交易权限'
                 })
     
-    def _handle_close_order(self, symbol: str, close_order: Dict):
+    def _handle_close_order(self, symbol: str, close_order: Dict, positions_by_ticket: Dict):
         """处理平仓订单"""
         self.logger.info(f"🔻 {symbol} 执行平仓: {close_order['reason']}")
         
-        # 获取持仓信息用于通知
-        position = None
-        positions = mt5.positions_get(ticket=close_order['ticket'])
-        if positions and len(positions) > 0:
-            position = positions[0]
+        # 持仓信息用于通知（复用本轮持仓快照）
+        position = positions_by_ticket.get(close_order['ticket'])
         
-        if close_position(close_order['ticket'], symbol, close_order['reason'], self.performance_tracker):
+        if close_position(close_order['ticket'], symbol, close_order['reason'],
+                          self.performance_tracker, positions_by_ticket):
             self.logger.info(f"✅ {symbol} 平仓成功: 票据{close_order['ticket']}")
             
             # 发送钉钉通知
@@ -259,11 +268,13 @@ class MultiSymbolMonitor:
         # 检查每个持仓是否需要风控平仓
         all_positions = mt5.positions_get()
         if all_positions:
+            positions_by_ticket = {position.ticket: position for position in all_positions}
             for position in all_positions:
                 should_close, reason = self.money_manager.should_close_position(position)
                 if should_close:
                     self.logger.warning(f"风控平仓: {position.symbol} - {reason}")
-                    close_position(position.ticket, position.symbol, f"风控: {reason}", self.performance_tracker)
+                    close_position(position.ticket, position.symbol, f"风控: {reason}",
+                                   self.performance_tracker, positions_by_ticket)
     
     def _display_multi_symbol_status(self, cycle_count: int):
         """显示多币种状态"""
@@ -296,7 +307,7 @@ class MultiSymbolMonitor:
                 status_parts.append(f"{symbol}:--")
         
         # 显示状态
-        print(f"\r{' | '.join(status_parts)}", end="")
+        _status_printer.write(' | '.join(status_parts))
     
     def _log_detailed_status(self):
         """记录详细状态"""
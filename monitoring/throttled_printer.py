@@ -0,0 +1,46 @@
+"""
+状态行输出 - 合并高频的终端刷新
+"""
+import sys
+import time
+
+class ThrottledPrinter:
+    """单行状态输出器
+
+    监控循环每个周期都会刷新状态行；内容未变化的行直接丢弃，
+    距上次输出不足min_interval秒的行只记为待输出，在下次允许输出或flush()时写出最新一行，
+    因此调用方需在每轮循环结束时调用flush()，避免同一轮中后写的行被丢失。
+    """
+
+    def __init__(self, min_interval: float = 0.2, stream=None):
+        self.min_interval = min_interval
+        self.stream = stream
+        self.last_emit_time = 0.0
+        self.last_line = None
+        self._pending = None
+
+    def write(self, line: str):
+        """提交一行状态（不含前导回车），必要时写出"""
+        if line == self.last_line:
+            self._pending = None
+            return
+
+        now = time.monotonic()
+        if now - self.last_emit_time < self.min_interval:
+            self._pending = line
+            return
+
+        self._emit(line, now)
+
+    def flush(self):
+        """写出被节流暂存的最新一行"""
+        if self._pending is not None:
+            self._emit(self._pending, time.monotonic())
+
+    def _emit(self, line, now):
+        stream = self.stream or sys.stdout
+        stream.write(f"\r{line}")
+        stream.flush()
+        self.last_emit_time = now
+        self.last_line = line
+        self._pending = None
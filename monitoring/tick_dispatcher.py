@@ -0,0 +1,76 @@
+"""
+行情分发器 - 价格变化时才触发处理逻辑
+"""
+import logging
+import time
+from typing import Callable, List, Optional
+from config.settings import PRICE_UPDATE_INTERVAL
+from trading.mt5_connector import get_real_time_price
+
+logger = logging.getLogger('MT5_Trading')
+
+class TickDispatcher:
+    """行情分发器
+
+    轮询品种tick，只有bid变化时才调用on_tick回调；
+    另外支持按固定间隔执行的定时回调（如信号检查、状态记录），
+    以及取价失败时的on_missing回调（返回值为下次轮询前的等待秒数）。
+    """
+
+    def __init__(self, symbol: str, poll_interval: float = PRICE_UPDATE_INTERVAL):
+        self.symbol = symbol
+        self.poll_interval = poll_interval
+        self.last_bid = None
+        self.last_tick = None
+        self._tick_callbacks: List[Callable] = []
+        self._timers: List[list] = []  # [间隔秒数, 回调, 上次执行时间]
+        self._missing_callback: Optional[Callable] = None
+        self._running = False
+
+    def on_tick(self, callback: Callable):
+        """注册价格变化回调 callback(tick)"""
+        self._tick_callbacks.append(callback)
+
+    def every(self, interval: float, callback: Callable):
+        """注册定时回调 callback(tick)，每interval秒最多执行一次（首个tick即执行）"""
+        self._timers.append([interval, callback, time.monotonic() - interval])
+
+    def on_missing(self, callback: Callable[[], float]):
+        """注册取价失败回调，返回下次轮询前需要等待的秒数"""
+        self._missing_callback = callback
+
+    def fire(self, tick):
+        """分发新tick到所有价格回调"""
+        self.last_bid = tick.bid
+        self.last_tick = tick
+        for callback in self._tick_callbacks:
+            callback(tick)
+
+    def stop(self):
+        """停止分发循环"""
+        self._running = False
+
+    def run_forever(self):
+        """轮询行情直到stop()被调用（或Ctrl+C）"""
+        self._running = True
+        while self._running:
+            tick = get_real_time_price(self.symbol)
+            if tick is None:
+                self.last_bid = None  # 恢复后的第一个tick总是分发
+                wait = self._missing_callback() if self._missing_callback else self.poll_interval
+                time.sleep(wait)
+                continue
+
+            if tick.bid != self.last_bid:
+                self.fire(tick)
+            else:
+                self.last_tick = tick
+
+            now = time.monotonic()
+            for timer in self._timers:
+                interval, callback, last_run = timer
+                if now - last_run >= interval:
+                    timer[2] = now
+                    callback(tick)
+
+            time.sleep(self.poll_interval)
@@ -2,17 +2,28 @@
 策略基类定义
 """
 import logging
+import math
 from abc import ABC, abstractmethod
 from typing import Dict, Any, Optional
+import numpy as np
 import pandas as pd
 
+def _parse_bool(text: str) -> bool:
+    """解析布尔参数输入"""
+    return text.lower() in ('1', 'true', 'y', 'yes')
+
 class BaseStrategy(ABC):
     """策略基类 - 所有策略必须继承此类"""
     
+    uses_sl_tp = True           # 下单时是否设置止盈止损
+    handles_own_close = False   # 是否由策略指标自行产生平仓信号
+    
     def __init__(self, name: str, params: Dict[str, Any] = None):
         self.name = name
         self.params = params or {}
         self.logger = logging.getLogger(f'Strategy_{name}')
+        # 各参数的类型转换函数（按默认值类型确定），用于解析用户输入
+        self._param_casters = {key: self._caster_for(value) for key, value in self.params.items()}
         
     @abstractmethod
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
@@ -40,4 +51,53 @@ class BaseStrategy(ABC):
     def set_params(self, params: Dict[str, Any]):
         """设置策略参数"""
         self.params.update(params)
-        self.logger.info(f"策略参数已更新: {params}")
\ No newline at end of file
+        for key, value in params.items():
+            self._param_casters.setdefault(key, self._caster_for(value))
+        self.logger.info(f"策略参数已更新: {params}")
+    
+    @staticmethod
+    def _caster_for(value):
+        """参数值对应的字符串转换函数，bool单独处理（bool('0')为True）"""
+        if isinstance(value, bool):
+            return _parse_bool
+        if isinstance(value, (int, float)):
+            return type(value)
+        return str
+    
+    def parse_param(self, name: str, text: str):
+        """把用户输入的字符串转换为参数的类型，格式错误时抛出ValueError"""
+        return self._param_casters.get(name, str)(text)
+    
+    def generate_signals(self, df: pd.DataFrame) -> np.ndarray:
+        """对已计算指标的每根K线给出信号（回测使用），1=BUY，-1=SELL，0=无信号
+        
+        第i个元素等于generate_signal(df.iloc[:i+1])的结果；默认逐根调用generate_signal，
+        子类可基于指标列提供一次完成的向量化实现
+        """
+        signals = np.zeros(len(df), dtype=np.int8)
+        for i in range(1, len(df)):
+            signal = self.generate_signal(df.iloc[:i+1])
+            if signal == 'BUY':
+                signals[i] = 1
+            elif signal == 'SELL':
+                signals[i] = -1
+        return signals
+    
+    def calculate_indicators_np(self, rates: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+        """直接从MT5结构化数组计算指标，返回{列名: 数组}
+        
+        未提供NumPy实现的策略返回None，调用方改用calculate_indicators
+        """
+        return None
+    
+    def format_row(self, row) -> str:
+        """格式化一根K线的指标信息（监控状态行使用）"""
+        return "计算中..."
+    
+    @staticmethod
+    def _row_value(row, column: str, default=0):
+        """读取K线行中的指标值，缺失或为NaN时返回默认值"""
+        value = row.get(column, default)
+        if isinstance(value, float) and math.isnan(value):
+            return default
+        return value
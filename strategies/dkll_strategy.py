@@ -1,14 +1,19 @@
 """
 DKLL策略实现
 """
+from math import isnan
 import pandas as pd
 import numpy as np
 from typing import Dict, Any, Optional
 from .base import BaseStrategy
+from .kernels import rolling_mean, rolling_mean_partial, rolling_avedev, rolling_wma
 
 class DKLLStrategy(BaseStrategy):
     """DKLL策略 - DK指标和LL指标组合"""
     
+    uses_sl_tp = False          # 不使用止盈止损
+    handles_own_close = True    # 依靠DL信号平仓
+    
     def __init__(self, params: Dict[str, Any] = None):
         default_params = {
             'n_str': 19,    # DK指标强弱计算周期
@@ -24,71 +29,77 @@ class DKLLStrategy(BaseStrategy):
     def calculate_indicators(self, df: pd.DataFrame) -> pd.DataFrame:
         """计算DKLL策略指标"""
         df = df.copy()
-        
+        indicators = self._indicator_arrays(
+            df['close'].to_numpy(dtype=np.float64),
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64)
+        )
+        for column, values in indicators.items():
+            df[column] = values
+        return df
+    
+    def calculate_indicators_np(self, rates: np.ndarray) -> Dict[str, np.ndarray]:
+        """从MT5结构化数组计算DKLL指标（列与calculate_indicators一致）"""
+        return self._indicator_arrays(
+            rates['close'].astype(np.float64),
+            rates['high'].astype(np.float64),
+            rates['low'].astype(np.float64)
+        )
+    
+    def _indicator_arrays(self, close, high, low) -> Dict[str, np.ndarray]:
+        """计算DKLL各指标列，滑动窗口部分由strategies.kernels完成"""
         # 获取参数
         n_str = self.params['n_str']
         n_A1 = self.params['n_A1']
         n_A2 = self.params['n_A2']
         n_LL = self.params['n_LL']
         
-        # ===== 计算典型价格TYP =====
-        df['TYP'] = (df['close'] + df['high'] + df['low']) / 3
-        
-        # ===== 计算DK指标 =====
-        # 1. 计算强弱指标的基础数据
-        df['MA_DK'] = df['TYP'].rolling(n_str, min_periods=1).mean()
-        
-        def calculate_avedev(series):
-            """计算平均绝对偏差"""
-            if len(series) == 0:
-                return np.nan
-            mean_val = series.mean()
-            return (series - mean_val).abs().mean()
-        
-        df['AVEDEV_DK'] = df['TYP'].rolling(n_str).apply(calculate_avedev, raw=False)
-        
-        # 2. 计算强弱值
-        df['strength'] = (df['TYP'] - df['MA_DK']) / (0.015 * df['AVEDEV_DK'])
-        
-        # 3. 计算A值
-        df['A'] = (df['close'] * 3 + df['low'] + df['high']) / 6
-        
-        # 4. 计算A1 - 加权移动平均
-        def calculate_weighted_ma(series, window):
-            """计算加权移动平均"""
-            if len(series) < window:
-                return np.nan
-            weights = np.arange(1, window + 1)
-            return np.sum(series.iloc[-window:] * weights) / np.sum(weights)
-        
-        df['A1'] = df['A'].rolling(n_A1).apply(lambda x: calculate_weighted_ma(x, n_A1), raw=False)
-        
-        # 5. 计算A2
-        df['A2'] = df['A1'].rolling(n_A2, min_periods=1).mean()
-        
-        # 6. 生成DK信号
-        df['DK'] = 0
-        long_condition = (df['strength'] > 0) & (df['A1'] > df['A2'])
-        short_condition = (df['strength'] < 0) & (df['A1'] < df['A2'])
-        
-        df.loc[long_condition, 'DK'] = 1
-        df.loc[short_condition, 'DK'] = -1
-        df['DK'] = df['DK'].replace(0, np.nan).ffill().fillna(0)
-        
-        # ===== 计算LL指标 =====
-        df['MA_LL'] = df['TYP'].rolling(n_LL, min_periods=1).mean()
-        df['AVEDEV_LL'] = df['TYP'].rolling(n_LL).apply(calculate_avedev, raw=False)
-        df['POWER'] = (df['TYP'] - df['MA_LL']) / (0.015 * df['AVEDEV_LL'])
-        df['LL'] = np.where(df['POWER'] >= 0, 1, -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # ===== 计算典型价格TYP =====
+            typ = (close + high + low) / 3
+            
+            # ===== 计算DK指标 =====
+            # 1. 强弱值：典型价格相对均值的偏离（以平均绝对偏差为单位）
+            ma_dk = rolling_mean_partial(typ, n_str)
+            avedev_dk = rolling_avedev(typ, n_str)
+            strength = (typ - ma_dk) / (0.015 * avedev_dk)
+            
+            # 2. A值及其加权移动平均A1、简单平均A2
+            a = (close * 3 + low + high) / 6
+            a1 = rolling_wma(a, n_A1)
+            a2 = rolling_mean_partial(a1, n_A2)
+            
+            # 3. 生成DK信号：多空条件成立时取±1，否则沿用上一个非零值
+            raw_dk = np.where((strength > 0) & (a1 > a2), 1.0,
+                              np.where((strength < 0) & (a1 < a2), -1.0, 0.0))
+            last_set = np.maximum.accumulate(np.where(raw_dk != 0, np.arange(len(raw_dk)), 0))
+            dk = raw_dk[last_set]
+            
+            # ===== 计算LL指标 =====
+            ma_ll = rolling_mean_partial(typ, n_LL)
+            avedev_ll = rolling_avedev(typ, n_LL)
+            power = (typ - ma_ll) / (0.015 * avedev_ll)
+            ll = np.where(power >= 0, 1, -1)
         
         # ===== 生成最终信号 =====
-        df['DL'] = df['DK'] + df['LL']
-        
-        # 兼容原代码，添加MA10和MA20列
-        df['MA10'] = df['TYP'].rolling(10).mean()
-        df['MA20'] = df['TYP'].rolling(20).mean()
-        
-        return df
+        return {
+            'TYP': typ,
+            'MA_DK': ma_dk,
+            'AVEDEV_DK': avedev_dk,
+            'strength': strength,
+            'A': a,
+            'A1': a1,
+            'A2': a2,
+            'DK': dk,
+            'MA_LL': ma_ll,
+            'AVEDEV_LL': avedev_ll,
+            'POWER': power,
+            'LL': ll,
+            'DL': dk + ll,
+            # 兼容原代码，添加MA10和MA20列
+            'MA10': rolling_mean(typ, 10),
+            'MA20': rolling_mean(typ, 20)
+        }
     
     def generate_signal(self, df: pd.DataFrame, verbose: bool = False) -> Optional[str]:
         """生成DKLL交易信号
@@ -109,7 +120,7 @@ class DKLLStrategy(BaseStrategy):
         latest = df.iloc[-1]
         
         # 检查DL值
-        if pd.isna(latest['DL']):
+        if isnan(latest['DL']):
             if verbose:
                 self.logger.warning("DL指标数据无效")
             return None
@@ -117,8 +128,8 @@ class DKLLStrategy(BaseStrategy):
         dl_value = latest['DL']
         
         if verbose:
-            dk_value = latest['DK'] if not pd.isna(latest['DK']) else 0
-            ll_value = latest['LL'] if not pd.isna(latest['LL']) else 0
+            dk_value = latest['DK'] if not isnan(latest['DK']) else 0
+            ll_value = latest['LL'] if not isnan(latest['LL']) else 0
             self.logger.info("=== DKLL信号检查详情 ===")
             self.logger.info(f"DK值: {dk_value}, LL值: {ll_value}, DL值: {dl_value}")
             self.logger.info(f"最新价格: {latest['close']:.2f}")
@@ -141,6 +152,18 @@ class DKLLStrategy(BaseStrategy):
         
         return None
     
+    def generate_signals(self, df: pd.DataFrame) -> np.ndarray:
+        """向量化的逐K线信号：DL=2为1，DL=-2为-1（与generate_signal逐根结果一致）"""
+        dl = df['DL'].to_numpy(dtype=np.float64)
+        signals = np.where(dl == 2, 1, np.where(dl == -2, -1, 0)).astype(np.int8)
+        # 数据不足的K线不产生信号
+        signals[:max(self.params.values()) + 4] = 0
+        return signals
+    
     def get_description(self) -> str:
         """获取策略描述"""
-        return f"DKLL策略: DK指标({self.params['n_str']},{self.params['n_A1']},{self.params['n_A2']})和LL指标({self.params['n_LL']})组合，不使用止盈止损，完全依靠信号平仓"
\ No newline at end of file
+        return f"DKLL策略: DK指标({self.params['n_str']},{self.params['n_A1']},{self.params['n_A2']})和LL指标({self.params['n_LL']})组合，不使用止盈止损，完全依靠信号平仓"
+    
+    def format_row(self, row) -> str:
+        """格式化DKLL指标信息"""
+        return f"DK: {self._row_value(row, 'DK')} | LL: {self._row_value(row, 'LL')} | DL: {self._row_value(row, 'DL')}"
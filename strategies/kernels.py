@@ -0,0 +1,165 @@
+"""
+指标计算内核 - 滑动窗口均值、平均绝对偏差、加权均值，以及回测的交易模拟循环
+
+安装numba时使用JIT编译的循环实现，否则退回NumPy滑动窗口实现，两者结果一致
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba为可选依赖
+    njit = None
+
+def _sliding(values, window):
+    return np.lib.stride_tricks.sliding_window_view(values, window)
+
+def _rolling_mean_np(values, window):
+    """滑动窗口均值，前window-1个位置为NaN（对应Series.rolling(window).mean()）"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        result[window - 1:] = _sliding(values, window).mean(axis=1)
+    return result
+
+def _rolling_mean_partial_np(values, window):
+    """窗口内有效值的均值（对应Series.rolling(window, min_periods=1).mean()）"""
+    padded = np.concatenate((np.full(window - 1, np.nan), values))
+    view = _sliding(padded, window)
+    valid = ~np.isnan(view)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, view, 0.0).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def _rolling_avedev_np(values, window):
+    """滑动窗口平均绝对偏差，前window-1个位置为NaN"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        view = _sliding(values, window)
+        result[window - 1:] = np.abs(view - view.mean(axis=1)[:, None]).mean(axis=1)
+    return result
+
+def _rolling_wma_np(values, window):
+    """滑动窗口线性加权均值（权重1..window），前window-1个位置为NaN"""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        weights = np.arange(1, window + 1, dtype=np.float64)
+        result[window - 1:] = _sliding(values, window) @ weights / weights.sum()
+    return result
+
+def _rolling_mean_loop(values, window):
+    """滑动窗口均值，前window-1个位置为NaN（对应Series.rolling(window).mean()）（numba版本）"""
+    n = len(values)
+    result = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        total = 0.0
+        for j in range(i - window + 1, i + 1):
+            total += values[j]
+        result[i] = total / window
+    return result
+
+def _rolling_mean_partial_loop(values, window):
+    """窗口内有效值的均值（对应Series.rolling(window, min_periods=1).mean()）（numba版本）"""
+    n = len(values)
+    result = np.full(n, np.nan)
+    for i in range(n):
+        total = 0.0
+        count = 0
+        for j in range(max(0, i - window + 1), i + 1):
+            if not np.isnan(values[j]):
+                total += values[j]
+                count += 1
+        if count > 0:
+            result[i] = total / count
+    return result
+
+def _rolling_avedev_loop(values, window):
+    """滑动窗口平均绝对偏差，前window-1个位置为NaN（numba版本）"""
+    n = len(values)
+    result = np.full(n, np.nan)
+    for i in range(window - 1, n):
+        mean = 0.0
+        for j in range(i - window + 1, i + 1):
+            mean += values[j]
+        mean /= window
+        deviation = 0.0
+        for j in range(i - window + 1, i + 1):
+            deviation += abs(values[j] - mean)
+        result[i] = deviation / window
+    return result
+
+def _rolling_wma_loop(values, window):
+    """滑动窗口线性加权均值（权重1..window），前window-1个位置为NaN（numba版本）"""
+    n = len(values)
+    result = np.full(n, np.nan)
+    weight_sum = window * (window + 1) / 2.0
+    for i in range(window - 1, n):
+        total = 0.0
+        for k in range(window):
+            total += values[i - window + 1 + k] * (k + 1)
+        result[i] = total / weight_sum
+    return result
+
+def _simulate_trades_loop(signals, close):
+    """按逐K线信号（1=BUY，-1=SELL，0=无）模拟交易：空仓时开仓，出现反向信号时平仓并反手
+    
+    Returns:
+        (entry_idx, exit_idx, types, profits) 四个等长数组，types中1表示多单、-1表示空单
+    """
+    n = len(signals)
+    # 按K线数量预分配（交易数不可能超过K线数），用游标k追加
+    entry_idx = np.empty(n, dtype=np.int32)
+    exit_idx = np.empty(n, dtype=np.int32)
+    types = np.empty(n, dtype=np.int8)
+    profits = np.empty(n, dtype=np.float64)
+    k = 0
+    
+    position = 0  # 0: 无持仓, 1: 多单, -1: 空单
+    entry_price = 0.0
+    entry_i = 0
+    for i in range(1, n):
+        signal = int(signals[i])
+        if signal != 0 and position == 0:
+            position = signal
+            entry_price = close[i]
+            entry_i = i
+        elif signal != 0 and signal != position:
+            if position == 1:
+                profits[k] = close[i] - entry_price
+            else:
+                profits[k] = entry_price - close[i]
+            types[k] = position
+            entry_idx[k] = entry_i
+            exit_idx[k] = i
+            k += 1
+            
+            # 开新仓
+            position = signal
+            entry_price = close[i]
+            entry_i = i
+    return entry_idx[:k], exit_idx[:k], types[:k], profits[:k]
+
+def _simulate_trades_py(signals, close):
+    """交易模拟（纯Python版本，先转换为列表以加快逐元素访问）"""
+    return _simulate_trades_loop(signals.tolist(), close.tolist())
+
+if njit is not None:
+    rolling_mean = njit(cache=True)(_rolling_mean_loop)
+    rolling_mean_partial = njit(cache=True)(_rolling_mean_partial_loop)
+    rolling_avedev = njit(cache=True)(_rolling_avedev_loop)
+    rolling_wma = njit(cache=True)(_rolling_wma_loop)
+    simulate_trades = njit(cache=True)(_simulate_trades_loop)
+else:
+    rolling_mean = _rolling_mean_np
+    rolling_mean_partial = _rolling_mean_partial_np
+    rolling_avedev = _rolling_avedev_np
+    rolling_wma = _rolling_wma_np
+    simulate_trades = _simulate_trades_py
+
+def warmup():
+    """启动时调用一次各内核，使numba的编译（或读取缓存）不发生在交易循环中"""
+    values = np.zeros(8, dtype=np.float64)
+    rolling_mean(values, 2)
+    rolling_mean_partial(values, 2)
+    rolling_avedev(values, 2)
+    rolling_wma(values, 2)
+    simulate_trades(np.zeros(8, dtype=np.int8), values)
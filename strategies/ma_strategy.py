@@ -1,9 +1,12 @@
 """
 双均线策略实现
 """
+from math import isnan
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, Optional
 from .base import BaseStrategy
+from .kernels import rolling_mean
 
 class MAStrategy(BaseStrategy):
     """双均线策略 - MA10和MA20金叉死叉"""
@@ -34,6 +37,21 @@ class MAStrategy(BaseStrategy):
         
         return df
     
+    def calculate_indicators_np(self, rates: np.ndarray) -> Dict[str, np.ndarray]:
+        """从MT5结构化数组计算双均线指标（列与calculate_indicators一致）"""
+        ma_short = self.params['ma_short']
+        ma_long = self.params['ma_long']
+        close = rates['close']
+        
+        short_values = rolling_mean(close, ma_short)
+        long_values = rolling_mean(close, ma_long)
+        return {
+            f'MA{ma_short}': short_values,
+            f'MA{ma_long}': long_values,
+            'MA10': short_values,
+            'MA20': long_values
+        }
+    
     def generate_signal(self, df: pd.DataFrame, verbose: bool = False) -> Optional[str]:
         """生成双均线交易信号"""
         if len(df) < 2:
@@ -51,8 +69,8 @@ class MAStrategy(BaseStrategy):
         ma_long_col = f'MA{ma_long}'
         
         # 确保MA数据有效
-        if (pd.isna(latest[ma_short_col]) or pd.isna(latest[ma_long_col]) or 
-            pd.isna(prev[ma_short_col]) or pd.isna(prev[ma_long_col])):
+        if (isnan(latest[ma_short_col]) or isnan(latest[ma_long_col]) or 
+            isnan(prev[ma_short_col]) or isnan(prev[ma_long_col])):
             if verbose:
                 self.logger.warning("MA数据无效")
             return None
@@ -80,8 +98,28 @@ class MAStrategy(BaseStrategy):
         
         return None
     
+    def generate_signals(self, df: pd.DataFrame) -> np.ndarray:
+        """向量化的逐K线信号：金叉为1，死叉为-1（与generate_signal逐根结果一致）"""
+        short = df[f"MA{self.params['ma_short']}"].to_numpy(dtype=np.float64)
+        long = df[f"MA{self.params['ma_long']}"].to_numpy(dtype=np.float64)
+        signals = np.zeros(len(df), dtype=np.int8)
+        if len(df) < 2:
+            return signals
+        
+        # 含NaN的比较结果为False，无需单独检查数据有效性
+        prev_short, prev_long = short[:-1], long[:-1]
+        cur_short, cur_long = short[1:], long[1:]
+        buy = (prev_short < prev_long) & (cur_short > cur_long)
+        sell = (prev_short > prev_long) & (cur_short < cur_long)
+        signals[1:] = np.where(buy, 1, np.where(sell, -1, 0))
+        return signals
+    
     def get_description(self) -> str:
         """获取策略描述"""
         ma_short = self.params['ma_short']
         ma_long = self.params['ma_long']
-        return f"双均线策略: MA{ma_short}和MA{ma_long}金叉死叉信号"
\ No newline at end of file
+        return f"双均线策略: MA{ma_short}和MA{ma_long}金叉死叉信号"
+    
+    def format_row(self, row) -> str:
+        """格式化双均线指标信息"""
+        return f"MA10: {self._row_value(row, 'MA10'):.2f} | MA20: {self._row_value(row, 'MA20'):.2f}"
@@ -15,6 +15,7 @@ class StrategyManager:
     def __init__(self):
         self.strategies: Dict[str, BaseStrategy] = {}
         self.current_strategy: Optional[BaseStrategy] = None
+        self.generation = 0  # 每次切换策略递增，用于使信号缓存失效
         self.logger = logging.getLogger('StrategyManager')
         
         # 注册默认策略
@@ -54,6 +55,7 @@ class StrategyManager:
             return False
         
         self.current_strategy = self.strategies[key]
+        self.generation += 1
         self.logger.info(f"策略已切换: {self.current_strategy.get_name()}")
         return True
     
@@ -68,6 +70,13 @@ class StrategyManager:
         
         return self.current_strategy.calculate_indicators(df)
     
+    def calculate_indicators_np(self, rates):
+        """使用当前策略直接从MT5结构化数组计算指标，策略不支持时返回None"""
+        if self.current_strategy is None:
+            raise ValueError("没有选择策略")
+        
+        return self.current_strategy.calculate_indicators_np(rates)
+    
     def generate_signal(self, df: pd.DataFrame, verbose: bool = False) -> Optional[str]:
         """使用当前策略生成信号"""
         if self.current_strategy is None:
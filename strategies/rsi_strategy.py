@@ -1,9 +1,12 @@
 """
 RSI策略实现
 """
+from math import isnan
+import numpy as np
 import pandas as pd
 from typing import Dict, Any, Optional
 from .base import BaseStrategy
+from .kernels import rolling_mean
 
 class RSIStrategy(BaseStrategy):
     """RSI策略 - 相对强弱指标超买超卖"""
@@ -40,6 +43,25 @@ class RSIStrategy(BaseStrategy):
         
         return df
     
+    def calculate_indicators_np(self, rates: np.ndarray) -> Dict[str, np.ndarray]:
+        """从MT5结构化数组计算RSI指标（列与calculate_indicators一致）"""
+        rsi_period = self.params['rsi_period']
+        close = rates['close']
+        
+        # 第一根K线没有价格变化，按0计入（与where(..., 0)对NaN的处理一致）
+        delta = np.diff(close, prepend=close[0])
+        gain = rolling_mean(np.where(delta > 0, delta, 0.0), rsi_period)
+        loss = rolling_mean(np.where(delta < 0, -delta, 0.0), rsi_period)
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        
+        return {
+            'RSI': rsi,
+            'MA10': rolling_mean(close, 10),
+            'MA20': rolling_mean(close, 20)
+        }
+    
     def generate_signal(self, df: pd.DataFrame, verbose: bool = False) -> Optional[str]:
         """生成RSI交易信号"""
         if len(df) < self.params['rsi_period'] + 5:
@@ -50,7 +72,7 @@ class RSIStrategy(BaseStrategy):
         latest = df.iloc[-1]
         prev = df.iloc[-2]
         
-        if pd.isna(latest['RSI']) or pd.isna(prev['RSI']):
+        if isnan(latest['RSI']) or isnan(prev['RSI']):
             if verbose:
                 self.logger.warning("RSI数据无效")
             return None
@@ -82,6 +104,27 @@ class RSIStrategy(BaseStrategy):
         
         return None
     
+    def generate_signals(self, df: pd.DataFrame) -> np.ndarray:
+        """向量化的逐K线信号：超卖反弹为1，超买回落为-1（与generate_signal逐根结果一致）"""
+        rsi = df['RSI'].to_numpy(dtype=np.float64)
+        signals = np.zeros(len(df), dtype=np.int8)
+        if len(df) < 2:
+            return signals
+        
+        oversold = self.params['oversold']
+        overbought = self.params['overbought']
+        prev, cur = rsi[:-1], rsi[1:]
+        buy = (prev <= oversold) & (cur > oversold)
+        sell = (prev >= overbought) & (cur < overbought)
+        signals[1:] = np.where(buy, 1, np.where(sell, -1, 0))
+        # 数据不足的K线不产生信号
+        signals[:self.params['rsi_period'] + 4] = 0
+        return signals
+    
     def get_description(self) -> str:
         """获取策略描述"""
-        return f"RSI策略: RSI({self.params['rsi_period']})超买({self.params['overbought']})超卖({self.params['oversold']})信号"
\ No newline at end of file
+        return f"RSI策略: RSI({self.params['rsi_period']})超买({self.params['overbought']})超卖({self.params['oversold']})信号"
+    
+    def format_row(self, row) -> str:
+        """格式化RSI指标信息"""
+        return f"RSI: {self._row_value(row, 'RSI'):.2f}"
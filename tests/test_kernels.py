@@ -0,0 +1,102 @@
+"""
+指标计算内核测试 - numba循环版本、NumPy版本与pandas参考实现一致
+"""
+import unittest
+import numpy as np
+import pandas as pd
+from strategies import kernels
+
+def _wma_reference(values, window):
+    weights = np.arange(1, window + 1, dtype=np.float64)
+    return pd.Series(values).rolling(window).apply(lambda x: x @ weights / weights.sum(), raw=True).to_numpy()
+
+def _avedev_reference(values, window):
+    return pd.Series(values).rolling(window).apply(lambda x: np.abs(x - x.mean()).mean(), raw=True).to_numpy()
+
+def _simulate_trades_reference(signals, close):
+    """逐K线模拟交易的直接实现（空仓开仓，反向信号平仓并反手）"""
+    trades = []
+    position = 0
+    entry_price = 0.0
+    entry_i = 0
+    for i in range(1, len(signals)):
+        signal = int(signals[i])
+        if signal == 0 or signal == position:
+            continue
+        if position != 0:
+            profit = close[i] - entry_price if position == 1 else entry_price - close[i]
+            trades.append((entry_i, i, position, profit))
+        position, entry_price, entry_i = signal, close[i], i
+    return trades
+
+class RollingKernelTest(unittest.TestCase):
+    """滑动窗口内核：导出版本、NumPy版本和循环版本都与pandas结果一致"""
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.values = 100 + rng.standard_normal(300).cumsum()
+        # 带NaN的序列（对应DKLL中前几个位置为NaN的中间结果）
+        self.with_nan = self.values.copy()
+        self.with_nan[:5] = np.nan
+        self.with_nan[40] = np.nan
+
+    def _check(self, name, reference, values):
+        implementations = {
+            'exported': getattr(kernels, name),
+            'numpy': getattr(kernels, f'_{name}_np'),
+            'loop': getattr(kernels, f'_{name}_loop'),
+        }
+        for window in (1, 2, 10, 20, len(values), len(values) + 1):
+            expected = reference(values, window)
+            for label, func in implementations.items():
+                with self.subTest(kernel=name, implementation=label, window=window):
+                    np.testing.assert_allclose(func(values, window), expected, rtol=1e-10, atol=1e-10)
+
+    def test_rolling_mean(self):
+        self._check('rolling_mean', lambda v, w: pd.Series(v).rolling(w).mean().to_numpy(), self.values)
+
+    def test_rolling_mean_partial(self):
+        self._check('rolling_mean_partial',
+                    lambda v, w: pd.Series(v).rolling(w, min_periods=1).mean().to_numpy(), self.with_nan)
+
+    def test_rolling_avedev(self):
+        self._check('rolling_avedev', _avedev_reference, self.values)
+
+    def test_rolling_wma(self):
+        self._check('rolling_wma', _wma_reference, self.values)
+
+class SimulateTradesTest(unittest.TestCase):
+    """交易模拟内核与逐K线参考实现一致"""
+
+    def _check(self, signals, close):
+        expected = _simulate_trades_reference(signals, close)
+        for label, func in (('exported', kernels.simulate_trades), ('python', kernels._simulate_trades_py)):
+            with self.subTest(implementation=label):
+                entry_idx, exit_idx, types, profits = func(signals, close)
+                self.assertEqual(list(zip(entry_idx.tolist(), exit_idx.tolist(), types.tolist())),
+                                 [trade[:3] for trade in expected])
+                np.testing.assert_allclose(profits, [trade[3] for trade in expected])
+
+    def test_reversals(self):
+        close = np.array([10.0, 11.0, 12.0, 11.5, 13.0, 12.0, 12.5])
+        signals = np.array([1, 1, 0, -1, -1, 1, 0], dtype=np.int8)
+        # 第0根K线的信号不参与；1开多，3平多开空，5平空开多
+        self._check(signals, close)
+        entry_idx, exit_idx, types, profits = kernels.simulate_trades(signals, close)
+        self.assertEqual(entry_idx.tolist(), [1, 3])
+        self.assertEqual(exit_idx.tolist(), [3, 5])
+        self.assertEqual(types.tolist(), [1, -1])
+        np.testing.assert_allclose(profits, [0.5, -0.5])
+
+    def test_random_signals(self):
+        rng = np.random.default_rng(11)
+        close = 100 + rng.standard_normal(500).cumsum()
+        signals = rng.choice(np.array([-1, 0, 0, 0, 1], dtype=np.int8), size=500)
+        self._check(signals, close)
+
+    def test_no_trades(self):
+        self._check(np.zeros(10, dtype=np.int8), np.linspace(1.0, 2.0, 10))
+        self._check(np.zeros(0, dtype=np.int8), np.zeros(0))
+
+if __name__ == '__main__':
+    unittest.main()
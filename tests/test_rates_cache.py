@@ -0,0 +1,142 @@
+"""
+K线缓存测试 - 增量更新的结果与每次完整拉取一致
+"""
+import importlib.util
+import sys
+import types
+import unittest
+from unittest import mock
+import numpy as np
+
+# MetaTrader5只提供Windows版本，未安装时注册空模块，测试中由FakeTerminal提供所需函数
+if 'MetaTrader5' not in sys.modules and importlib.util.find_spec('MetaTrader5') is None:
+    sys.modules['MetaTrader5'] = types.ModuleType('MetaTrader5')
+
+from trading import rates_cache
+
+# MT5 copy_rates_*返回的结构化数组类型
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+class FakeTerminal:
+    """模拟MT5终端的M5 K线序列：可追加新K线、更新正在形成的最后一根K线"""
+
+    TIMEFRAME_M5 = 5
+
+    def __init__(self, count, start_time=1_700_000_000):
+        self.rng = np.random.default_rng(3)
+        self.bars = np.zeros(0, dtype=RATES_DTYPE)
+        self.next_time = start_time
+        self.add_bars(count)
+
+    def add_bars(self, count):
+        new = np.zeros(count, dtype=RATES_DTYPE)
+        new['time'] = self.next_time + 300 * np.arange(count)
+        new['close'] = 100 + self.rng.standard_normal(count).cumsum()
+        new['open'] = new['close'] - 0.5
+        new['high'] = new['close'] + 1.0
+        new['low'] = new['close'] - 1.0
+        new['tick_volume'] = np.arange(count)
+        self.bars = np.concatenate((self.bars, new))
+        self.next_time += 300 * count
+
+    def tick_last_bar(self):
+        """最后一根K线仍在形成：收盘价和成交量变化"""
+        self.bars['close'][-1] += 0.25
+        self.bars['tick_volume'][-1] += 1
+
+    def copy_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        return self.bars[len(self.bars) - start_pos - count:len(self.bars) - start_pos].copy()
+
+class RatesCacheTest(unittest.TestCase):
+    """RatesCache.get/times与完整拉取的结果比较"""
+
+    def setUp(self):
+        self.terminal = FakeTerminal(500)
+        self.clock = 1000.0
+        patches = [
+            mock.patch.object(rates_cache, 'mt5', self.terminal),
+            mock.patch.object(rates_cache, 'time', types.SimpleNamespace(monotonic=lambda: self.clock)),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.cache = rates_cache.RatesCache()
+
+    def advance(self, new_bars, seconds=None):
+        """终端新增K线，时钟前进对应的时间（seconds可单独指定，模拟估算偏差）"""
+        self.terminal.add_bars(new_bars)
+        self.clock += 300 * new_bars if seconds is None else seconds
+
+    def assert_matches_full_fetch(self, count):
+        result = self.cache.get('BTCUSD', count)
+        expected = self.terminal.bars[-count:]
+        np.testing.assert_array_equal(result, expected)
+        np.testing.assert_array_equal(
+            self.cache.times(count),
+            expected['time'].astype('datetime64[s]').astype('datetime64[ns]')
+        )
+
+    def test_first_fetch(self):
+        self.assert_matches_full_fetch(100)
+
+    def test_forming_bar_update(self):
+        self.assert_matches_full_fetch(100)
+        for _ in range(3):
+            self.terminal.tick_last_bar()
+            self.clock += 10
+            self.assert_matches_full_fetch(100)
+
+    def test_new_bars_shift_in_place(self):
+        self.assert_matches_full_fetch(100)
+        buffer = self.cache._bars
+        for new_bars in (1, 3, 1):
+            self.advance(new_bars)
+            self.terminal.tick_last_bar()
+            self.assert_matches_full_fetch(100)
+        # 稳态运行下在原缓冲区内左移，不重新分配
+        self.assertIs(self.cache._bars, buffer)
+
+    def test_smaller_count_uses_cache_tail(self):
+        self.assert_matches_full_fetch(300)
+        self.advance(2)
+        self.assert_matches_full_fetch(100)
+        self.assert_matches_full_fetch(300)
+
+    def test_larger_count_refetches(self):
+        self.assert_matches_full_fetch(100)
+        self.advance(1)
+        self.assert_matches_full_fetch(400)
+        self.advance(1)
+        self.assert_matches_full_fetch(400)
+
+    def test_underestimated_gap_falls_back_to_full_fetch(self):
+        self.assert_matches_full_fetch(100)
+        # 时钟几乎没走但终端已有5根新K线：增量拉取与缓存不重叠，退回完整拉取
+        self.advance(5, seconds=1)
+        self.assert_matches_full_fetch(100)
+
+    def test_long_disconnect(self):
+        self.assert_matches_full_fetch(100)
+        self.advance(250)
+        self.assert_matches_full_fetch(100)
+
+    def test_symbol_change_refetches(self):
+        self.assert_matches_full_fetch(100)
+        other = FakeTerminal(200, start_time=1_600_000_000)
+        with mock.patch.object(rates_cache, 'mt5', other):
+            result = self.cache.get('ETHUSD', 100)
+        np.testing.assert_array_equal(result, other.bars[-100:])
+
+    def test_fetch_failure_returns_none(self):
+        with mock.patch.object(self.terminal, 'copy_rates_from_pos', return_value=None):
+            self.assertIsNone(self.cache.get('BTCUSD', 100))
+        self.assert_matches_full_fetch(100)
+        with mock.patch.object(self.terminal, 'copy_rates_from_pos', return_value=None):
+            self.clock += 300
+            self.assertIsNone(self.cache.get('BTCUSD', 100))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+行情分发器测试 - 价格变化回调、定时回调调度和取价失败处理
+"""
+import importlib.util
+import sys
+import types
+import unittest
+from collections import namedtuple
+from unittest import mock
+
+# MetaTrader5只提供Windows版本，未安装时注册空模块，测试中替换掉取价函数
+if 'MetaTrader5' not in sys.modules and importlib.util.find_spec('MetaTrader5') is None:
+    sys.modules['MetaTrader5'] = types.ModuleType('MetaTrader5')
+
+from monitoring import tick_dispatcher
+from monitoring.tick_dispatcher import TickDispatcher
+
+Tick = namedtuple('Tick', 'bid ask')
+
+class FakeClock:
+    """time.monotonic/time.sleep的替代：sleep只推进时钟"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class TickDispatcherTest(unittest.TestCase):
+    """按预设的行情序列运行run_forever，序列耗尽后停止"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        patch = mock.patch.object(tick_dispatcher, 'time', self.clock)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def run_ticks(self, dispatcher, bids):
+        """依次返回bids中的价格（None表示取价失败），返回最后一个时停止分发器（该轮照常处理）"""
+        feed = iter(enumerate(bids, 1))
+
+        def fake_price(symbol):
+            index, bid = next(feed)
+            if index == len(bids):
+                dispatcher.stop()
+            return None if bid is None else Tick(bid, bid + 0.1)
+
+        with mock.patch.object(tick_dispatcher, 'get_real_time_price', fake_price):
+            dispatcher.run_forever()
+
+    def test_on_tick_only_when_bid_changes(self):
+        dispatcher = TickDispatcher('BTCUSD', poll_interval=1.0)
+        seen = []
+        dispatcher.on_tick(lambda tick: seen.append(tick.bid))
+        self.run_ticks(dispatcher, [1.0, 1.0, 1.5, 1.5, 1.0])
+        self.assertEqual(seen, [1.0, 1.5, 1.0])
+        self.assertEqual(dispatcher.last_tick.bid, 1.0)
+
+    def test_timer_runs_on_first_tick_then_every_interval(self):
+        dispatcher = TickDispatcher('BTCUSD', poll_interval=1.0)
+        runs = []
+        dispatcher.every(3.0, lambda tick: runs.append(self.clock.now))
+        # 价格不变时定时回调照常执行
+        self.run_ticks(dispatcher, [1.0] * 8)
+        self.assertEqual(runs, [100.0, 103.0, 106.0])
+
+    def test_timers_run_after_tick_callbacks_in_registration_order(self):
+        dispatcher = TickDispatcher('BTCUSD', poll_interval=1.0)
+        order = []
+        dispatcher.on_tick(lambda tick: order.append('tick'))
+        dispatcher.every(10.0, lambda tick: order.append('check'))
+        dispatcher.every(0, lambda tick: order.append('flush'))
+        self.run_ticks(dispatcher, [1.0, 2.0])
+        self.assertEqual(order, ['tick', 'check', 'flush', 'tick', 'flush'])
+
+    def test_missing_price_waits_and_redispatches(self):
+        dispatcher = TickDispatcher('BTCUSD', poll_interval=1.0)
+        seen = []
+        waits = []
+        dispatcher.on_tick(lambda tick: seen.append(tick.bid))
+
+        def on_missing():
+            waits.append(self.clock.now)
+            return 5.0
+
+        dispatcher.on_missing(on_missing)
+        self.run_ticks(dispatcher, [1.0, None, None, 1.0])
+        # 恢复后的第一个tick即使价格未变也会分发
+        self.assertEqual(seen, [1.0, 1.0])
+        self.assertEqual(waits, [101.0, 106.0])
+        self.assertEqual(self.clock.now, 112.0)
+
+    def test_missing_price_without_callback_uses_poll_interval(self):
+        dispatcher = TickDispatcher('BTCUSD', poll_interval=0.5)
+        self.run_ticks(dispatcher, [None, None, 2.0])
+        self.assertEqual(self.clock.now, 101.5)
+        self.assertEqual(dispatcher.last_bid, 2.0)
+
+if __name__ == '__main__':
+    unittest.main()
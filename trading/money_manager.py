@@ -2,12 +2,16 @@
 资金管理模块 - 处理多币种持仓和风险控制
 """
 import logging
+import time
 from typing import Dict, Optional, Tuple, List
 import MetaTrader5 as mt5
 from config.settings import TRADING_SYMBOLS, MONEY_MANAGEMENT
 
 logger = logging.getLogger('MoneyManager')
 
+# 资金分配状态的缓存时间（秒），菜单连续刷新时不重复查询账户和持仓
+ALLOCATION_CACHE_TTL = 1.0
+
 class MoneyManager:
     """资金管理器 - 管理多币种持仓和风险"""
     
@@ -15,6 +19,10 @@ class MoneyManager:
         self.symbols_config = TRADING_SYMBOLS
         self.money_config = MONEY_MANAGEMENT
         self.logger = logging.getLogger('MoneyManager')
+        self._allocation_cache = (0.0, None)  # (查询时间, 状态)
+        self._config_version = 0  # 品种配置每次修改后递增
+        self._enabled_cache = (-1, None)  # (配置版本, 启用品种列表)
+        self._mode_header_cache = (-1, None)  # (配置版本, 多币种模式标题)
         
         # 验证配置
         self._validate_config()
@@ -29,8 +37,29 @@ class MoneyManager:
         self.logger.info(f"总持仓比例: {total_ratio:.1%}")
     
     def get_enabled_symbols(self) -> List[str]:
-        """获取启用的交易品种列表"""
-        return [symbol for symbol, cfg in self.symbols_config.items() if cfg['enabled']]
+        """获取启用的交易品种列表（按配置版本缓存，调用方不应修改返回的列表）"""
+        version, symbols = self._enabled_cache
+        if symbols is None or version != self._config_version:
+            symbols = [symbol for symbol, cfg in self.symbols_config.items() if cfg['enabled']]
+            self._enabled_cache = (self._config_version, symbols)
+        return symbols
+    
+    def get_mode_header(self, strategy_name: str) -> str:
+        """主菜单顶部的模式行：多币种时列出启用品种（按配置版本缓存），否则显示当前策略"""
+        symbols = self.get_enabled_symbols()
+        if len(symbols) <= 1:
+            return f"\n当前策略: {strategy_name}"
+        
+        version, header = self._mode_header_cache
+        if header is None or version != self._config_version:
+            header = f"\n💼 多币种模式: {', '.join(symbols)}"
+            self._mode_header_cache = (self._config_version, header)
+        return header
+    
+    def mark_config_changed(self):
+        """品种配置被修改后调用：递增配置版本并清空依赖配置的缓存"""
+        self._config_version += 1
+        self.invalidate_allocation_cache()
     
     def get_symbol_config(self, symbol: str) -> Optional[Dict]:
         """获取指定品种的配置"""
@@ -123,8 +152,17 @@ class MoneyManager:
         
         return True, "可以开仓"
     
-    def get_account_allocation_status(self) -> Dict:
-        """获取账户资金分配状态"""
+    def invalidate_allocation_cache(self):
+        """清空资金分配状态缓存（品种配置修改后调用）"""
+        self._allocation_cache = (0.0, None)
+    
+    def get_account_allocation_status(self, ttl: float = ALLOCATION_CACHE_TTL) -> Dict:
+        """获取账户资金分配状态，ttl秒内的重复调用直接返回缓存结果"""
+        cached_at, cached = self._allocation_cache
+        now = time.monotonic()
+        if cached is not None and now - cached_at < ttl:
+            return cached
+        
         account_info = mt5.account_info()
         if not account_info:
             return {}
@@ -159,6 +197,7 @@ class MoneyManager:
             
             status['symbols'][symbol] = symbol_status
         
+        self._allocation_cache = (now, status)
         return status
     
     def should_close_position(self, position) -> Tuple[bool, str]:
@@ -267,4 +306,14 @@ class MoneyManager:
                     'change': round(normalized_weight - current_ratio, 2)
                 }
         
-        return suggestions
\ No newline at end of file
+        return suggestions
+
+# 进程内共享的资金管理器（配置本身就是全局的TRADING_SYMBOLS，各处修改都作用在同一份配置上）
+_money_manager = None
+
+def get_money_manager() -> MoneyManager:
+    """获取共享的资金管理器，首次调用时创建"""
+    global _money_manager
+    if _money_manager is None:
+        _money_manager = MoneyManager()
+    return _money_manager
@@ -2,7 +2,9 @@
 MT5连接和基础交易功能
 """
 import logging
+import random
 import time
+from collections import namedtuple
 from datetime import datetime
 import MetaTrader5 as mt5
 from config.settings import (
@@ -12,6 +14,75 @@ from config.settings import (
 
 logger = logging.getLogger('MT5_Trading')
 
+# 终端/账户信息短时缓存：(获取时间, 结果)，避免每个tick重复IPC调用
+_cache = {"terminal": (0.0, None), "account": (0.0, None)}
+INFO_CACHE_TTL = 2.0
+
+def _cached_terminal_info(ttl=INFO_CACHE_TTL):
+    """获取终端信息（带TTL缓存）"""
+    ts, info = _cache["terminal"]
+    now = time.monotonic()
+    if info is None or now - ts >= ttl:
+        info = mt5.terminal_info()
+        _cache["terminal"] = (now if info is not None else 0.0, info)
+    return info
+
+def _cached_account_info(ttl=INFO_CACHE_TTL):
+    """获取账户信息（带TTL缓存）"""
+    ts, info = _cache["account"]
+    now = time.monotonic()
+    if info is None or now - ts >= ttl:
+        info = mt5.account_info()
+        _cache["account"] = (now if info is not None else 0.0, info)
+    return info
+
+# 品种信息缓存：静态字段（精度、点值、交易量限制等）日内基本不变
+_symbol_info_cache = {}
+_symbol_names_cache = (0.0, None)
+SYMBOL_INFO_CACHE_TTL = 60.0
+
+# 每个品种下单用的派生参数，每次从MT5取到新的品种信息时重新计算
+SymbolParams = namedtuple(
+    'SymbolParams', 'digits point min_distance sl_distance tp_distance volume_min volume_max'
+)
+_symbol_params = {}
+
+def _build_symbol_params(symbol_info):
+    """根据品种信息计算精度、最小止损距离和止盈止损距离"""
+    point = symbol_info.point
+    min_distance = max(symbol_info.trade_stops_level, symbol_info.trade_freeze_level, 1000) * point
+    return SymbolParams(
+        digits=symbol_info.digits,
+        point=point,
+        min_distance=min_distance,
+        sl_distance=max(min_distance * 2, 5000 * point),
+        tp_distance=max(min_distance * 3, 10000 * point),
+        volume_min=symbol_info.volume_min,
+        volume_max=symbol_info.volume_max
+    )
+
+def get_symbol_params(symbol):
+    """获取品种的下单参数（SymbolParams），随品种信息缓存一起刷新，失败返回None"""
+    if get_symbol_info(symbol) is None:
+        return None
+    return _symbol_params.get(symbol)
+
+def _cached_symbol_names(ttl=SYMBOL_INFO_CACHE_TTL):
+    """获取服务器支持的品种名称列表（带TTL缓存，用于出错时查找相似品种）"""
+    global _symbol_names_cache
+    ts, names = _symbol_names_cache
+    now = time.monotonic()
+    if names is None or now - ts >= ttl:
+        symbols = mt5.symbols_get()
+        names = [s.name for s in symbols] if symbols else []
+        _symbol_names_cache = (now, names)
+    return names
+
+def invalidate_connection_cache():
+    """使终端/账户信息缓存失效（RPC出错时调用）"""
+    _cache["terminal"] = (0.0, None)
+    _cache["account"] = (0.0, None)
+
 def initialize_mt5():
     """初始化MT5连接"""
     logger.info("开始初始化MT5连接...")
@@ -34,12 +105,14 @@ def initialize_mt5():
 
 def check_connection_status():
     """检查MT5连接状态"""
-    if not mt5.initialize():
-        logger.error("MT5连接已断开")
-        return False
+    # 检查终端连接状态（已初始化时直接走缓存，取不到才重新初始化）
+    terminal_info = _cached_terminal_info()
+    if terminal_info is None:
+        if not mt5.initialize():
+            logger.error("MT5连接已断开")
+            return False
+        terminal_info = _cached_terminal_info()
     
-    # 检查终端连接状态
-    terminal_info = mt5.terminal_info()
     if terminal_info is None:
         logger.error("无法获取终端信息")
         return False
@@ -59,14 +132,14 @@ def check_auto_trading():
         logger.error("MT5连接异常")
         return False
     
-    terminal_info = mt5.terminal_info()
+    terminal_info = _cached_terminal_info()
     if terminal_info is None:
         logger.error("无法获取终端信息")
         return False
     
     logger.info(f"终端信息 - 连接状态: {terminal_info.connected}, 自动交易启用: {terminal_info.trade_allowed}, EA交易启用: {terminal_info.dlls_allowed}")
     
-    account_info = mt5.account_info()
+    account_info = _cached_account_info()
     if account_info is None:
         logger.error("无法获取账户信息")
         return False
@@ -87,8 +160,15 @@ def check_auto_trading():
     return is_trading_allowed
 
 def get_symbol_info(symbol):
-    """获取交易品种信息"""
-    logger.debug(f"获取{symbol}的交易品种信息...")
+    """获取交易品种信息（成功结果缓存SYMBOL_INFO_CACHE_TTL秒）
+    
+    缓存的结构只用于合约的静态字段和visible状态，点差等实时字段应从tick读取
+    """
+    cached = _symbol_info_cache.get(symbol)
+    if cached is not None and time.monotonic() - cached[0] < SYMBOL_INFO_CACHE_TTL:
+        return cached[1]
+    
+    logger.debug("获取%s的交易品种信息...", symbol)
     
     # 检查连接状态
     if not check_connection_status():
@@ -103,22 +183,24 @@ def get_symbol_info(symbol):
         logger.error("3. 网络连接问题")
         
         # 尝试获取所有可用品种
-        symbols = mt5.symbols_get()
-        if symbols:
-            logger.info(f"当前服务器支持的品种数量: {len(symbols)}")
+        symbol_names = _cached_symbol_names()
+        if symbol_names:
+            logger.info("当前服务器支持的品种数量: %d", len(symbol_names))
             # 查找相似的品种名称
-            similar_symbols = [s.name for s in symbols if symbol.lower() in s.name.lower()]
+            similar_symbols = [name for name in symbol_names if symbol.lower() in name.lower()]
             if similar_symbols:
-                logger.info(f"找到相似品种: {similar_symbols[:5]}")  # 只显示前5个
+                logger.info("找到相似品种: %s", similar_symbols[:5])  # 只显示前5个
         
         return None
     
     if not symbol_info.visible:
-        logger.info(f"尝试添加{symbol}到市场观察...")
+        logger.info("尝试添加%s到市场观察...", symbol)
         if not mt5.symbol_select(symbol, True):
             logger.error(f"无法添加{symbol}到市场观察")
             return None
-        logger.info(f"{symbol}已添加到市场观察")
+        logger.info("%s已添加到市场观察", symbol)
+        # 重新获取，避免缓存添加前visible为False的结构（否则每个tick都会重复添加）
+        symbol_info = mt5.symbol_info(symbol) or symbol_info
     
     # 检查品种是否可交易
     if not symbol_info.trade_mode == mt5.SYMBOL_TRADE_MODE_FULL:
@@ -127,73 +209,77 @@ def get_symbol_info(symbol):
     # 检查市场开放时间
     now = datetime.now()
     if hasattr(symbol_info, 'trade_time_flags'):
-        logger.debug(f"{symbol}交易时间标志: {symbol_info.trade_time_flags}")
+        logger.debug("%s交易时间标志: %s", symbol, symbol_info.trade_time_flags)
     
-    logger.debug(f"{symbol}信息 - 点差: {symbol_info.spread}, 最小交易量: {symbol_info.volume_min}, 交易模式: {symbol_info.trade_mode}")
+    logger.debug("%s信息 - 点差: %s, 最小交易量: %s, 交易模式: %s",
+                 symbol, symbol_info.spread, symbol_info.volume_min, symbol_info.trade_mode)
+    _symbol_info_cache[symbol] = (time.monotonic(), symbol_info)
+    # 每次取到新的品种信息都重建，使止损距离等跟随trade_stops_level/trade_freeze_level更新
+    _symbol_params[symbol] = _build_symbol_params(symbol_info)
     return symbol_info
 
 def get_real_time_price(symbol, max_retries=MAX_PRICE_RETRIES):
-    """获取实时价格，带重试机制"""
+    """获取实时价格，带重试机制
+    
+    连接和品种状态只在重试前检查一次（走缓存），循环内只重试获取tick。
+    取不到tick时按0.25、0.5、1秒指数退避并加随机抖动；
+    价格无效通常下一个tick即恢复，只等待0.1秒
+    """
+    try:
+        # 检查连接状态和品种状态
+        if not check_connection_status():
+            logger.warning(f"MT5连接异常，无法获取{symbol}的实时价格")
+            return None
+        
+        symbol_info = get_symbol_info(symbol)
+        if symbol_info is None:
+            logger.error(f"品种{symbol}不存在或不可用")
+            return None
+        
+        if not symbol_info.visible:
+            logger.warning(f"品种{symbol}不在市场观察中，尝试添加...")
+            mt5.symbol_select(symbol, True)
+    except Exception as e:
+        logger.error(f"检查{symbol}状态时发生异常: {e}")
+        invalidate_connection_cache()
+        return None
+    
+    tick_missing = False
     for attempt in range(max_retries):
         try:
-            # 检查连接状态
-            if not check_connection_status():
-                logger.warning(f"第{attempt+1}次尝试：MT5连接异常")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
-                    continue
-                return None
-            
             tick = mt5.symbol_info_tick(symbol)
-            if tick is None:
-                logger.warning(f"第{attempt+1}次尝试：无法获取{symbol}的实时价格")
-                
-                # 检查可能的原因
-                symbol_info = mt5.symbol_info(symbol)
-                if symbol_info is None:
-                    logger.error(f"品种{symbol}不存在或不可用")
-                    return None
-                
-                if not symbol_info.visible:
-                    logger.warning(f"品种{symbol}不在市场观察中，尝试添加...")
-                    mt5.symbol_select(symbol, True)
-                
-                # 检查市场是否开放
-                current_time = datetime.now()
-                logger.info(f"当前时间: {current_time}")
-                logger.info(f"品种状态 - 可见: {symbol_info.visible}, 交易模式: {symbol_info.trade_mode}")
-                
-                if attempt < max_retries - 1:
-                    logger.info(f"等待2秒后重试...")
-                    time.sleep(2)
-                    continue
-                else:
-                    logger.error("所有重试均失败，可能原因：")
-                    logger.error("1. 市场休市（周末或节假日）")
-                    logger.error("2. 网络连接不稳定")
-                    logger.error("3. 服务器维护")
-                    logger.error("4. 品种暂停交易")
-                    return None
-            
+        except Exception as e:
+            logger.error(f"第{attempt+1}次尝试获取价格时发生异常: {e}")
+            invalidate_connection_cache()
+            tick = None
+        
+        if tick is None:
+            logger.warning(f"第{attempt+1}次尝试：无法获取{symbol}的实时价格")
+            invalidate_connection_cache()
+            tick_missing = True
+            backoff = 0.25 * (2 ** attempt) + random.uniform(0, 0.1)
+        elif tick.bid <= 0 or tick.ask <= 0:
             # 验证价格数据的有效性
-            if tick.bid <= 0 or tick.ask <= 0:
-                logger.warning(f"第{attempt+1}次尝试：获取到无效价格数据 - bid: {tick.bid}, ask: {tick.ask}")
-                if attempt < max_retries - 1:
-                    time.sleep(1)
-                    continue
-                return None
-            
+            logger.warning(f"第{attempt+1}次尝试：获取到无效价格数据 - bid: {tick.bid}, ask: {tick.ask}")
+            tick_missing = False
+            backoff = 0.1
+        else:
             # 成功获取价格
-            logger.debug(f"成功获取{symbol}价格 - bid: {tick.bid}, ask: {tick.ask}, 时间: {datetime.fromtimestamp(tick.time)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("成功获取%s价格 - bid: %s, ask: %s, 时间: %s",
+                             symbol, tick.bid, tick.ask, datetime.fromtimestamp(tick.time))
             return tick
-            
-        except Exception as e:
-            logger.error(f"第{attempt+1}次尝试获取价格时发生异常: {e}")
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return None
+        
+        if attempt < max_retries - 1:
+            logger.info("等待%.2f秒后重试...", backoff)
+            time.sleep(backoff)
     
+    if tick_missing:
+        logger.error("所有重试均失败，可能原因：")
+        logger.error("1. 市场休市（周末或节假日）")
+        logger.error("2. 网络连接不稳定")
+        logger.error("3. 服务器维护")
+        logger.error("4. 品种暂停交易")
     return None
 
 def shutdown_mt5():
@@ -2,20 +2,59 @@
 订单管理模块
 """
 import logging
+from concurrent.futures import ThreadPoolExecutor
 import MetaTrader5 as mt5
 from config.settings import DEFAULT_MAGIC, DEFAULT_DEVIATION
-from .mt5_connector import get_symbol_info, get_real_time_price
+from .mt5_connector import get_symbol_info, get_symbol_params, get_real_time_price, invalidate_connection_cache
+from .position_manager import invalidate_positions_cache
 
 logger = logging.getLogger('MT5_Trading')
 trade_logger = logging.getLogger('MT5_Trades')
 
+# 批量平仓线程池：多笔平仓请求并发发送，重叠各自的IPC等待
+_order_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='OrderClose')
+
+# 订单请求模板缓存：按(品种, 策略)/品种预先构建不变字段，下单时复制后填入可变字段
+_order_template_cache = {}
+_close_template_cache = {}
+
+def _order_template(symbol, strategy_name):
+    """获取开仓请求模板"""
+    key = (symbol, strategy_name)
+    template = _order_template_cache.get(key)
+    if template is None:
+        template = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "deviation": DEFAULT_DEVIATION,
+            "magic": DEFAULT_MAGIC,
+            "comment": f"Python自动交易-{strategy_name}",
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC
+        }
+        _order_template_cache[key] = template
+    return template
+
+def _close_template(symbol):
+    """获取平仓请求模板"""
+    template = _close_template_cache.get(symbol)
+    if template is None:
+        template = {
+            "action": mt5.TRADE_ACTION_DEAL,
+            "symbol": symbol,
+            "deviation": DEFAULT_DEVIATION,
+            "magic": DEFAULT_MAGIC,
+            "type_time": mt5.ORDER_TIME_GTC,
+            "type_filling": mt5.ORDER_FILLING_IOC
+        }
+        _close_template_cache[symbol] = template
+    return template
+
 def place_order(symbol, direction, volume, strategy_manager, performance_tracker):
     """下单函数"""
-    logger.info(f"准备下{direction}单，交易量: {volume}")
-    trade_logger.info(f"订单准备 | {symbol} | {direction} | 数量: {volume}")
-    
     symbol_info = get_symbol_info(symbol)
-    if symbol_info is None:
+    sp = get_symbol_params(symbol)
+    if symbol_info is None or sp is None:
         logger.error("无法获取交易品种信息，下单失败")
         return False
     
@@ -25,19 +64,15 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         return False
     
     current_price = tick.ask if direction == 'BUY' else tick.bid
-    digits = symbol_info.digits
-    point = symbol_info.point
+    digits = sp.digits
     
     # 获取当前策略
     current_strategy = strategy_manager.get_current_strategy()
     strategy_name = current_strategy.get_name()
     
     # 检查策略是否需要止盈止损
-    use_stop_loss = strategy_name != "DKLL策略"  # DKLL策略不使用止盈止损
-    use_take_profit = strategy_name != "DKLL策略"
-    
-    logger.info(f"当前价格: {current_price}, 价格精度: {digits}位小数")
-    logger.info(f"当前策略: {strategy_name}, 使用止损: {use_stop_loss}, 使用止盈: {use_take_profit}")
+    use_stop_loss = current_strategy.uses_sl_tp  # DKLL策略不使用止盈止损
+    use_take_profit = current_strategy.uses_sl_tp
     
     if direction == 'BUY':
         order_type = mt5.ORDER_TYPE_BUY
@@ -46,8 +81,8 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         order_type = mt5.ORDER_TYPE_SELL
         price = tick.bid
     
-    min_volume = symbol_info.volume_min
-    max_volume = symbol_info.volume_max
+    min_volume = sp.volume_min
+    max_volume = sp.volume_max
     
     if volume < min_volume:
         volume = min_volume
@@ -57,83 +92,51 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         logger.warning(f"交易量调整至最大值: {volume}")
     
     # 创建基础订单请求
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
-        "volume": volume,
-        "type": order_type,
-        "price": price,
-        "deviation": DEFAULT_DEVIATION,
-        "magic": DEFAULT_MAGIC,
-        "comment": f"Python自动交易-{strategy_name}",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC
-    }
+    request = _order_template(symbol, strategy_name).copy()
+    request.update(volume=volume, type=order_type, price=price)
     
     # 如果需要止盈止损，才进行计算和设置
     if use_stop_loss or use_take_profit:
-        # 获取交易商的止损止盈限制
-        stops_level = symbol_info.trade_stops_level
-        freeze_level = symbol_info.trade_freeze_level
-        
-        logger.info(f"最小止损距离: {stops_level}点, 冻结距离: {freeze_level}点")
-        
-        # 计算安全的止损止盈距离
-        min_distance = max(stops_level, freeze_level, 1000) * point
-        sl_distance = max(min_distance * 2, 5000 * point)
-        tp_distance = max(min_distance * 3, 10000 * point)
-        
+        # 止损止盈距离按品种预先计算（至少为最小距离的2倍/3倍，无需再校验）
         if direction == 'BUY':
-            sl_price = round(current_price - sl_distance, digits)
-            tp_price = round(current_price + tp_distance, digits)
+            sl_price = round(current_price - sp.sl_distance, digits)
+            tp_price = round(current_price + sp.tp_distance, digits)
         else:
-            sl_price = round(current_price + sl_distance, digits)
-            tp_price = round(current_price - tp_distance, digits)
-        
-        # 验证距离
-        if direction == 'BUY':
-            actual_sl_distance = abs(price - sl_price)
-            actual_tp_distance = abs(tp_price - price)
-        else:
-            actual_sl_distance = abs(sl_price - price)
-            actual_tp_distance = abs(price - tp_price)
-        
-        logger.info(f"止损距离: {actual_sl_distance/point:.0f}点, 止盈距离: {actual_tp_distance/point:.0f}点")
-        
-        # 调整距离如果不够
-        if actual_sl_distance < min_distance:
-            logger.warning(f"止损距离不足，调整中...")
-            if direction == 'BUY':
-                sl_price = round(current_price - min_distance * 2, digits)
-            else:
-                sl_price = round(current_price + min_distance * 2, digits)
-            actual_sl_distance = min_distance * 2
-        
-        if actual_tp_distance < min_distance:
-            logger.warning(f"止盈距离不足，调整中...")
-            if direction == 'BUY':
-                tp_price = round(current_price + min_distance * 3, digits)
-            else:
-                tp_price = round(current_price - min_distance * 3, digits)
-            actual_tp_distance = min_distance * 3
+            sl_price = round(current_price + sp.sl_distance, digits)
+            tp_price = round(current_price - sp.tp_distance, digits)
         
         # 添加止损止盈到订单请求
-        if use_stop_loss and actual_sl_distance >= min_distance:
+        if use_stop_loss:
             request["sl"] = sl_price
-            logger.info(f"设置止损: {sl_price}")
         
-        if use_take_profit and actual_tp_distance >= min_distance:
+        if use_take_profit:
             request["tp"] = tp_price
-            logger.info(f"设置止盈: {tp_price}")
-        
-        logger.info(f"订单参数 - 价格: {price}, 止损: {request.get('sl', '未设置')}, 止盈: {request.get('tp', '未设置')}")
-    else:
-        logger.info(f"DKLL策略订单 - 价格: {price}, 不设置止盈止损，依靠信号平仓")
     
-    logger.info("发送订单请求...")
+    # 下单准备信息合并为一条日志
+    log_fields = {
+        "方向": direction,
+        "交易量": volume,
+        "价格": price,
+        "精度": digits,
+        "策略": strategy_name,
+        "止损": request.get('sl', '未设置'),
+        "止盈": request.get('tp', '未设置'),
+    }
+    if use_stop_loss or use_take_profit:
+        log_fields["最小止损距离"] = f"{symbol_info.trade_stops_level}点"
+        log_fields["冻结距离"] = f"{symbol_info.trade_freeze_level}点"
+        log_fields["止损距离"] = f"{sp.sl_distance/sp.point:.0f}点"
+        log_fields["止盈距离"] = f"{sp.tp_distance/sp.point:.0f}点"
+    else:
+        log_fields["说明"] = "不设置止盈止损，依靠信号平仓"
+    logger.info("发送订单请求 | %s", " | ".join(f"{k}: {v}" for k, v in log_fields.items()))
     trade_logger.info(f"订单发送 | {symbol} | {direction} | 价格: {price} | SL: {request.get('sl', '未设置')} | TP: {request.get('tp', '未设置')} | 策略: {strategy_name}")
     
     result = mt5.order_send(request)
+    if result is None:
+        logger.error(f"订单发送失败，错误代码: {mt5.last_error()}")
+        invalidate_connection_cache()
+        return False
     
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         error_msg = f"订单提交失败 - 错误代码: {result.retcode}, 错误信息: {result.comment}"
@@ -143,21 +146,15 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         # 如果因为止损止盈问题失败，尝试不设置止损止盈
         if result.retcode == 10016 and (use_stop_loss or use_take_profit):  # Invalid stops
             logger.info("尝试不设置止损止盈重新下单...")
-            simple_request = {
-                "action": mt5.TRADE_ACTION_DEAL,
-                "symbol": symbol,
-                "volume": volume,
-                "type": order_type,
-                "price": price,
-                "deviation": DEFAULT_DEVIATION,
-                "magic": DEFAULT_MAGIC,
-                "comment": f"Python自动交易-{strategy_name}-简单订单",
-                "type_time": mt5.ORDER_TIME_GTC,
-                "type_filling": mt5.ORDER_FILLING_IOC
-            }
+            simple_request = _order_template(symbol, strategy_name).copy()
+            simple_request.update(volume=volume, type=order_type, price=price,
+                                  comment=f"Python自动交易-{strategy_name}-简单订单")
             
             result = mt5.order_send(simple_request)
-            if result.retcode == mt5.TRADE_RETCODE_DONE:
+            if result is None:
+                invalidate_connection_cache()
+            elif result.retcode == mt5.TRADE_RETCODE_DONE:
+                invalidate_positions_cache()
                 logger.info("简单订单（无止损止盈）提交成功")
                 trade_logger.info(f"简单订单成功 | {symbol} | {direction} | 订单号: {result.order} | 成交价: {result.price}")
                 
@@ -174,6 +171,7 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         
         return False
     else:
+        invalidate_positions_cache()
         success_msg = f"订单提交成功 - 订单号: {result.order}, 成交价: {result.price}"
         logger.info(success_msg)
         trade_logger.info(f"订单成功 | {symbol} | {direction} | 订单号: {result.order} | 成交价: {result.price} | 数量: {volume} | 策略: {strategy_name}")
@@ -190,18 +188,22 @@ def place_order(symbol, direction, volume, strategy_manager, performance_tracker
         
         return True
 
-def close_position(ticket, symbol, reason, performance_tracker):
-    """平仓函数"""
+def close_position(ticket, symbol, reason, performance_tracker, positions_by_ticket=None):
+    """平仓函数
+    
+    positions_by_ticket: 调用方本轮已获取的持仓快照 {票据: 持仓}，
+    提供时直接查找，避免再次请求全部持仓
+    """
     logger.info(f"准备平仓 - 票据: {ticket}, 原因: {reason}")
     
     # 获取持仓信息
     position = None
-    positions = mt5.positions_get()
-    if positions:
-        for pos in positions:
-            if pos.ticket == ticket:
-                position = pos
-                break
+    if positions_by_ticket is not None:
+        position = positions_by_ticket.get(ticket)
+    else:
+        positions = mt5.positions_get(ticket=ticket)
+        if positions:
+            position = positions[0]
     
     if position is None:
         logger.error(f"未找到票据 {ticket} 的持仓")
@@ -228,24 +230,18 @@ def close_position(ticket, symbol, reason, performance_tracker):
         direction = "BUY"
     
     # 创建平仓请求
-    request = {
-        "action": mt5.TRADE_ACTION_DEAL,
-        "symbol": symbol,
-        "volume": volume,
-        "type": close_type,
-        "position": ticket,
-        "price": close_price,
-        "deviation": DEFAULT_DEVIATION,
-        "magic": DEFAULT_MAGIC,
-        "comment": f"Python平仓-{reason}",
-        "type_time": mt5.ORDER_TIME_GTC,
-        "type_filling": mt5.ORDER_FILLING_IOC
-    }
+    request = _close_template(symbol).copy()
+    request.update(volume=volume, type=close_type, position=ticket, price=close_price,
+                   comment=f"Python平仓-{reason}")
     
     logger.info(f"平仓参数 - 票据: {ticket}, 方向: {direction}, 数量: {volume}, 价格: {close_price}")
     trade_logger.info(f"平仓请求 | {symbol} | {direction} | 票据: {ticket} | 价格: {close_price} | 原因: {reason}")
     
     result = mt5.order_send(request)
+    if result is None:
+        logger.error(f"平仓请求发送失败，错误代码: {mt5.last_error()}")
+        invalidate_connection_cache()
+        return False
     
     if result.retcode != mt5.TRADE_RETCODE_DONE:
         error_msg = f"平仓失败 - 错误代码: {result.retcode}, 错误信息: {result.comment}"
@@ -253,6 +249,7 @@ def close_position(ticket, symbol, reason, performance_tracker):
         trade_logger.error(f"平仓失败 | {symbol} | 票据: {ticket} | 错误: {result.retcode} - {result.comment}")
         return False
     else:
+        invalidate_positions_cache()
         success_msg = f"平仓成功 - 票据: {ticket}, 平仓价: {result.price}"
         logger.info(success_msg)
         trade_logger.info(f"平仓成功 | {symbol} | 票据: {ticket} | 平仓价: {result.price} | 原因: {reason}")
@@ -265,4 +262,14 @@ def close_position(ticket, symbol, reason, performance_tracker):
             profit=profit
         )
         
-        return True
\ No newline at end of file
+        return True
+
+def close_positions_bulk(close_orders, performance_tracker, positions_by_ticket=None):
+    """批量平仓，多笔时并发提交，返回与close_orders顺序一致的结果列表"""
+    def _close(close_order):
+        return close_position(close_order['ticket'], close_order['symbol'], close_order['reason'],
+                              performance_tracker, positions_by_ticket)
+    
+    if len(close_orders) <= 1:
+        return [_close(close_order) for close_order in close_orders]
+    return list(_order_pool.map(_close, close_orders))
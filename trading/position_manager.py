@@ -2,28 +2,91 @@
 持仓管理模块
 """
 import logging
-import pandas as pd
-from datetime import datetime
+import math
+import time
+import numpy as np
 import MetaTrader5 as mt5
 from config.settings import SYMBOL
 
 logger = logging.getLogger('MT5_Trading')
 
-def get_positions(symbol=SYMBOL):
-    """获取当前持仓"""
+# 市场状态日志每根K线记录一次，记住上次记录时的最新K线时间
+_last_status_bar = None
+
+# 信号检查结果缓存：最新K线、持仓和策略均未变化时直接复用上次结果
+_last_sig_cache = {'key': None, 'result': None}
+
+def _last_value(df, column, default=0):
+    """读取指定列最后一行的标量值，列缺失或为NaN时返回默认值"""
+    if column not in df.columns:
+        return default
+    value = df[column].iat[-1]
+    # 标量判断用math.isnan，避免pd.isna的数组分派开销（np.float64是float子类）
+    if isinstance(value, float) and math.isnan(value):
+        return default
+    return value
+
+# 持仓短时缓存：{品种: (获取时间, 持仓)}，持仓只在成交/平仓时变化，下单或平仓成功后立即失效
+_positions_cache = {}
+POSITIONS_CACHE_TTL = 2.0
+
+def invalidate_positions_cache():
+    """清空持仓缓存，下次get_positions()重新向MT5请求"""
+    _positions_cache.clear()
+
+def get_positions(symbol=SYMBOL, ttl=POSITIONS_CACHE_TTL):
+    """获取当前持仓（带TTL缓存，直接返回MT5给出的元组，调用方只做遍历和索引）"""
+    now = time.monotonic()
+    cached = _positions_cache.get(symbol)
+    if cached is not None and now - cached[0] < ttl:
+        return cached[1]
+    
     positions = mt5.positions_get(symbol=symbol)
     if positions is None:
-        return []
+        return ()
+    _positions_cache[symbol] = (now, positions)
     
-    if positions:
-        logger.debug(f"当前持仓数量: {len(positions)}")
+    if positions and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("当前持仓数量: %d", len(positions))
         for pos in positions:
-            logger.debug(f"持仓 - 票据: {pos.ticket}, 类型: {'买入' if pos.type == 0 else '卖出'}, 盈亏: {pos.profit:.2f}")
+            logger.debug("持仓 - 票据: %s, 类型: %s, 盈亏: %.2f",
+                         pos.ticket, '买入' if pos.type == 0 else '卖出', pos.profit)
     
-    return list(positions)
+    return positions
+
+def _signal_cache_key(df, current_positions, strategy_manager):
+    """信号缓存键：最新K线（时间和OHLC）、持仓（票据, 方向）、策略及其参数"""
+    if len(df) == 0:
+        return None
+    strategy = strategy_manager.get_current_strategy()
+    last_bar = tuple(df[column].iat[-1] for column in ('time', 'open', 'high', 'low', 'close'))
+    return (
+        len(df), last_bar,
+        tuple((pos.ticket, pos.type) for pos in current_positions),
+        id(strategy), strategy_manager.generation,
+        tuple(sorted(strategy.get_params().items()))
+    )
 
 def check_signal_with_positions(df, current_positions, strategy_manager, verbose=False):
-    """检查交易信号 - 考虑当前持仓情况"""
+    """检查交易信号 - 考虑当前持仓情况
+    
+    输入未变化时（同一根K线且价格未动、持仓和策略不变）直接返回上次结果；
+    verbose=True时总是重新计算，以输出完整的诊断日志
+    """
+    key = _signal_cache_key(df, current_positions, strategy_manager)
+    if not verbose and key is not None and key == _last_sig_cache['key']:
+        signal, close_orders = _last_sig_cache['result']
+        return signal, list(close_orders)
+    
+    result = _check_signal_with_positions(df, current_positions, strategy_manager, verbose)
+    if result is not None:
+        _last_sig_cache['key'] = key
+        _last_sig_cache['result'] = result
+        return result[0], list(result[1])
+    return None, []
+
+def _check_signal_with_positions(df, current_positions, strategy_manager, verbose):
+    """计算信号和平仓订单，出错时返回None"""
     current_strategy = strategy_manager.get_current_strategy()
     strategy_name = current_strategy.get_name()
     
@@ -37,55 +100,47 @@ def check_signal_with_positions(df, current_positions, strategy_manager, verbose
         
         # 如果有持仓，检查是否需要平仓
         close_orders = []
+        types = np.fromiter((pos.type for pos in current_positions), dtype=np.int8,
+                            count=len(current_positions))
+        is_buy = types == mt5.POSITION_TYPE_BUY
+        is_sell = types == mt5.POSITION_TYPE_SELL
         
         # DKLL策略的特殊处理：检查平仓信号
-        if strategy_name == "DKLL策略":
-            latest = df_with_indicators.iloc[-1]
-            dl_value = latest.get('DL', 0) if not pd.isna(latest.get('DL', 0)) else 0
+        if current_strategy.handles_own_close:
+            dl_value = _last_value(df_with_indicators, 'DL')
             
-            for pos in current_positions:
-                should_close = False
-                close_reason = ""
-                
-                if pos.type == mt5.POSITION_TYPE_BUY:  # 多仓
-                    # DL从正值变为负值或0，平多仓
-                    if dl_value <= 0:
-                        should_close = True
-                        close_reason = f"DKLL平多信号 (DL={dl_value})"
-                elif pos.type == mt5.POSITION_TYPE_SELL:  # 空仓
-                    # DL从负值变为正值或0，平空仓
-                    if dl_value >= 0:
-                        should_close = True
-                        close_reason = f"DKLL平空信号 (DL={dl_value})"
+            # 多仓：DL从正值变为负值或0时平仓；空仓：DL从负值变为正值或0时平仓
+            close_mask = (is_buy & (dl_value <= 0)) | (is_sell & (dl_value >= 0))
+            
+            for i in np.flatnonzero(close_mask):
+                pos = current_positions[i]
+                if is_buy[i]:
+                    close_reason = f"DKLL平多信号 (DL={dl_value})"
+                else:
+                    close_reason = f"DKLL平空信号 (DL={dl_value})"
+                close_orders.append({
+                    'ticket': pos.ticket,
+                    'symbol': pos.symbol,
+                    'reason': close_reason
+                })
+                if verbose:
+                    logger.info(f"检测到平仓信号: 票据{pos.ticket}, {close_reason}")
+        
+        # 其他策略的平仓逻辑（如果需要）
+        else:
+            # 对于有止盈止损的策略，如果检测到反向信号，也可以平仓
+            if signal:
+                close_mask = (is_buy & (signal == 'SELL')) | (is_sell & (signal == 'BUY'))
                 
-                if should_close:
+                for i in np.flatnonzero(close_mask):
+                    pos = current_positions[i]
                     close_orders.append({
                         'ticket': pos.ticket,
                         'symbol': pos.symbol,
-                        'reason': close_reason
+                        'reason': f"{strategy_name}反向信号"
                     })
                     if verbose:
-                        logger.info(f"检测到平仓信号: 票据{pos.ticket}, {close_reason}")
-        
-        # 其他策略的平仓逻辑（如果需要）
-        else:
-            # 对于有止盈止损的策略，如果检测到反向信号，也可以平仓
-            if signal and len(current_positions) > 0:
-                for pos in current_positions:
-                    # 检查是否是反向信号
-                    is_reverse_signal = False
-                    if ((pos.type == mt5.POSITION_TYPE_BUY and signal == 'SELL') or
-                        (pos.type == mt5.POSITION_TYPE_SELL and signal == 'BUY')):
-                        is_reverse_signal = True
-                    
-                    if is_reverse_signal:
-                        close_orders.append({
-                            'ticket': pos.ticket,
-                            'symbol': pos.symbol,
-                            'reason': f"{strategy_name}反向信号"
-                        })
-                        if verbose:
-                            logger.info(f"检测到反向信号平仓: 票据{pos.ticket}, 当前持仓{'多' if pos.type == 0 else '空'}，信号{signal}")
+                        logger.info(f"检测到反向信号平仓: 票据{pos.ticket}, 当前持仓{'多' if pos.type == 0 else '空'}，信号{signal}")
         
         # 如果有平仓信号，则不产生新的开仓信号
         if close_orders:
@@ -95,15 +150,20 @@ def check_signal_with_positions(df, current_positions, strategy_manager, verbose
             
     except Exception as e:
         logger.error(f"信号检查失败: {e}")
-        return None, []
+        return None
 
 def log_market_status(df, strategy_manager):
-    """记录市场状态"""
+    """记录市场状态（每根K线记录一次，最新K线时间未变化时直接返回）"""
+    global _last_status_bar
+    
     if len(df) < 1:
         return
+    bar_time = df['time'].iat[-1]
+    if bar_time == _last_status_bar:
+        return
+    _last_status_bar = bar_time
     
-    latest = df.iloc[-1]
-    price = latest['close']
+    price = df['close'].iat[-1]
     
     # 获取当前策略信息
     current_strategy = strategy_manager.get_current_strategy()
@@ -111,21 +171,18 @@ def log_market_status(df, strategy_manager):
     
     # 根据不同策略显示不同指标
     if strategy_name == "双均线策略":
-        ma10 = latest['MA10'] if not pd.isna(latest['MA10']) else 0
-        ma20 = latest['MA20'] if not pd.isna(latest['MA20']) else 0
+        ma10 = _last_value(df, 'MA10')
+        ma20 = _last_value(df, 'MA20')
         indicator_info = f"MA10: {ma10:.2f} | MA20: {ma20:.2f} | MA差值: {ma10-ma20:.2f}"
     elif strategy_name == "DKLL策略":
-        dk = latest['DK'] if 'DK' in latest and not pd.isna(latest['DK']) else 0
-        ll = latest['LL'] if 'LL' in latest and not pd.isna(latest['LL']) else 0
-        dl = latest['DL'] if 'DL' in latest and not pd.isna(latest['DL']) else 0
+        dk = _last_value(df, 'DK')
+        ll = _last_value(df, 'LL')
+        dl = _last_value(df, 'DL')
         indicator_info = f"DK: {dk} | LL: {ll} | DL: {dl}"
     elif strategy_name == "RSI策略":
-        rsi = latest['RSI'] if 'RSI' in latest and not pd.isna(latest['RSI']) else 0
+        rsi = _last_value(df, 'RSI')
         indicator_info = f"RSI: {rsi:.2f}"
     else:
         indicator_info = "指标计算中..."
     
-    # 每5分钟记录一次详细市场状态
-    current_minute = datetime.now().minute
-    if current_minute % 5 == 0:
-        logger.info(f"市场状态 | 策略: {strategy_name} | 价格: {price:.2f} | {indicator_info}")
\ No newline at end of file
+    logger.info("市场状态 | 策略: %s | 价格: %.2f | %s", strategy_name, price, indicator_info)
\ No newline at end of file
@@ -0,0 +1,96 @@
+"""
+K线缓存模块 - 增量拉取M5 K线
+"""
+import time
+import numpy as np
+import MetaTrader5 as mt5
+
+def _to_datetime64(rates):
+    """把MT5的秒级时间戳转换为datetime64[ns]（与pd.to_datetime(unit='s')结果一致）"""
+    return rates['time'].astype('datetime64[s]').astype('datetime64[ns]')
+
+class RatesCache:
+    """单品种M5 K线本地缓存（MT5结构化数组），按需增量更新
+
+    同时维护已转换好的datetime64时间列，新K线只转换新增部分
+    """
+
+    def __init__(self):
+        self._bars = None
+        self._times = None
+        self._symbol = None
+        self._size = 0
+        self._updated = 0.0
+
+    def get(self, symbol: str, count: int):
+        """获取最近count根M5 K线
+
+        首次调用（或品种/长度变化）时完整拉取，之后只拉取上次更新以来的新K线，
+        覆盖正在形成的最后一根K线并追加新K线，缓存长度保持为历史最大请求量。
+        新K线到来时在已分配的缓冲区内左移数据，稳态运行下不再分配新数组。
+
+        Returns:
+            MT5结构化数组（缓存的视图，调用方不应修改或跨调用持有），获取失败返回None
+        """
+        bars = self._bars
+        now = time.monotonic()
+
+        if bars is not None and self._symbol == symbol and count <= self._size:
+            # 按经过的时间估算新增K线数量，多取2根以保证与缓存重叠
+            n_new = min(self._size, int((now - self._updated) // 300) + 2)
+            new_rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, n_new)
+            if new_rates is None or len(new_rates) == 0:
+                return None
+
+            pos = int(np.searchsorted(bars['time'], new_rates[0]['time']))
+            if pos < len(bars) and bars['time'][pos] == new_rates[0]['time']:
+                new_times = _to_datetime64(new_rates)
+                end = pos + len(new_rates)
+                shift = end - len(bars)
+                if shift > 0 and len(bars) == self._size and shift < len(bars):
+                    # 有新K线：在原缓冲区内整体左移，不重新分配
+                    bars[:-shift] = bars[shift:]
+                    self._times[:-shift] = self._times[shift:]
+                    pos -= shift
+                    end -= shift
+                elif shift > 0:
+                    bars = np.concatenate((bars[:pos], new_rates))[-self._size:]
+                    self._times = np.concatenate((self._times[:pos], new_times))[-self._size:]
+                    self._bars = bars
+                    self._updated = now
+                    return bars[-count:]
+                bars[pos:end] = new_rates
+                self._times[pos:end] = new_times
+                self._updated = now
+                return bars[-count:]
+            # 与缓存不连续（例如长时间断线），退回完整拉取
+
+        size = max(count, self._size if self._symbol == symbol else 0)
+        rates = mt5.copy_rates_from_pos(symbol, mt5.TIMEFRAME_M5, 0, size)
+        if rates is None or len(rates) == 0:
+            return None
+
+        self._bars = rates
+        self._times = _to_datetime64(rates)
+        self._symbol = symbol
+        self._size = size
+        self._updated = now
+        return rates[-count:]
+
+    def times(self, count: int):
+        """最近一次get()对应的最后count根K线的datetime64时间列（副本，可直接赋给DataFrame）"""
+        return self._times[-count:].copy()
+
+# 监控循环共用的各品种K线缓存
+_caches = {}
+
+def get_recent_rates(symbol: str, count: int):
+    """从品种对应的共享缓存获取最近count根M5 K线（见RatesCache.get）"""
+    cache = _caches.get(symbol)
+    if cache is None:
+        cache = _caches[symbol] = RatesCache()
+    return cache.get(symbol, count)
+
+def get_recent_times(symbol: str, count: int):
+    """品种共享缓存中最后count根K线的datetime64时间列，需紧接get_recent_rates调用"""
+    return _caches[symbol].times(count)
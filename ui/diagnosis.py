@@ -3,6 +3,7 @@
 """
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 import MetaTrader5 as mt5
@@ -11,14 +12,34 @@ from trading.mt5_connector import check_connection_status, get_symbol_info, get_
 
 logger = logging.getLogger('MT5_Trading')
 
+# 连接测试同时进行的价格请求数上限
+PROBE_CONCURRENCY = 4
+
+def _timed_probe(_):
+    """获取一次实时价格（不重试），返回(tick, 耗时秒数)"""
+    start = time.perf_counter()
+    tick = get_real_time_price(SYMBOL, max_retries=1)
+    return tick, time.perf_counter() - start
+
 def diagnose_system(strategy_manager):
     """系统诊断功能"""
     logger.info("开始系统诊断...")
     print("\n=== 系统诊断 ===")
     
+    # 1-5项检查的MT5请求互相独立，同时发出，再按顺序输出结果
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = (
+            pool.submit(check_connection_status),
+            pool.submit(get_symbol_info, SYMBOL),
+            pool.submit(get_real_time_price, SYMBOL),
+            pool.submit(mt5.copy_rates_from_pos, SYMBOL, mt5.TIMEFRAME_M5, 0, 10),
+            pool.submit(mt5.account_info),
+        )
+    connected, symbol_info, tick, rates, account_info = (future.result() for future in futures)
+    
     # 1. 检查MT5连接
     print("1. 检查MT5连接状态...")
-    if check_connection_status():
+    if connected:
         print("   ✅ MT5连接正常")
     else:
         print("   ❌ MT5连接异常")
@@ -26,7 +47,6 @@ def diagnose_system(strategy_manager):
     
     # 2. 检查交易品种
     print(f"2. 检查交易品种 {SYMBOL}...")
-    symbol_info = get_symbol_info(SYMBOL)
     if symbol_info:
         print(f"   ✅ 品种信息正常")
         print(f"   - 可见: {symbol_info.visible}")
@@ -39,7 +59,6 @@ def diagnose_system(strategy_manager):
     
     # 3. 检查实时价格
     print("3. 检查实时价格...")
-    tick = get_real_time_price(SYMBOL)
     if tick:
         print(f"   ✅ 价格获取正常")
         print(f"   - Bid: {tick.bid}")
@@ -57,7 +76,6 @@ def diagnose_system(strategy_manager):
     
     # 4. 检查历史数据
     print("4. 检查历史数据...")
-    rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 10)
     if rates is not None and len(rates) > 0:
         print(f"   ✅ 历史数据正常，获取到 {len(rates)} 根K线")
         latest_time = pd.to_datetime(rates[-1]['time'], unit='s')
@@ -68,7 +86,6 @@ def diagnose_system(strategy_manager):
     
     # 5. 检查账户信息
     print("5. 检查账户信息...")
-    account_info = mt5.account_info()
     if account_info:
         print("   ✅ 账户信息正常")
         print(f"   - 余额: {account_info.balance}")
@@ -118,16 +135,18 @@ def diagnose_system(strategy_manager):
     # 询问是否进行连接测试
     test_connection = input("\n是否进行实时连接测试? (y/N): ").strip().lower()
     if test_connection == 'y':
-        print("\n开始10次连续价格获取测试...")
+        print("\n开始10次并发价格获取测试...")
+        # 最多同时发出PROBE_CONCURRENCY个请求，每次请求单独计时
+        with ThreadPoolExecutor(max_workers=PROBE_CONCURRENCY) as pool:
+            results = list(pool.map(_timed_probe, range(10)))
+        
         success_count = 0
-        for i in range(10):
-            tick = get_real_time_price(SYMBOL, max_retries=1)
+        for i, (tick, elapsed) in enumerate(results):
             if tick:
                 success_count += 1
-                print(f"  测试 {i+1}/10: ✅ {tick.bid}")
+                print(f"  测试 {i+1}/10: ✅ {tick.bid} ({elapsed * 1000:.0f}ms)")
             else:
-                print(f"  测试 {i+1}/10: ❌ 失败")
-            time.sleep(1)
+                print(f"  测试 {i+1}/10: ❌ 失败 ({elapsed * 1000:.0f}ms)")
         
         print(f"\n连接测试结果: {success_count}/10 次成功")
         if success_count >= 8:
@@ -2,23 +2,105 @@
 主菜单界面
 """
 import logging
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import pandas as pd
-import MetaTrader5 as mt5
 from config.settings import SYMBOL, DEFAULT_VOLUME
 from trading.mt5_connector import get_real_time_price
+from trading.rates_cache import get_recent_rates, get_recent_times
 from trading.order_manager import place_order, close_position
 from trading.position_manager import get_positions, check_signal_with_positions
 from monitoring.monitor import run_continuous_monitoring, run_classic_monitoring, run_timed_monitoring
 from monitoring.auto_trader import run_automated_trading
 from monitoring.multi_symbol_monitor import MultiSymbolMonitor
-from trading.money_manager import MoneyManager
+from trading.money_manager import get_money_manager
 from notifications.dingtalk import DingTalkNotifier
 from config.settings import DINGTALK_WEBHOOK, DINGTALK_SECRET
+from ui.prompt import input_with_keepalive
+from ui.diagnosis import diagnose_system
 
 logger = logging.getLogger('MT5_Trading')
 trade_logger = logging.getLogger('MT5_Trades')
 
+# 主菜单的固定部分（每次显示只在前面拼接当前模式）
+_MAIN_MENU_TEXT = """
+
+=== 交易程序选项 ===
+【单币种模式】
+1. 运行高速监控 (每秒更新，每10秒检查信号)
+2. 运行限时高速监控 (指定时间)
+3. 运行经典监控 (每5秒更新)
+4. 🤖 全自动化交易 (含定时参数优化)
+
+【多币种模式】
+5. 🌐 多币种监控交易
+6. 🤖 多币种全自动化交易
+
+【功能选项】
+7. 检查当前信号状态
+8. 手动下单测试
+9. 查看当前持仓
+10. 策略选择和配置
+11. 查看策略信息
+12. 系统诊断
+13. 查看交易统计
+14. 🔧 手动参数优化
+15. 💰 资金管理设置
+16. 🔔 测试钉钉通知
+0. 退出
+"""
+
+# 资金管理菜单的选项部分
+_MONEY_MENU_OPTIONS = """
+选项:
+1. 修改币种启用状态
+2. 调整持仓比例
+3. 修改交易量限制
+4. 更改币种策略
+5. 查看风险状态
+0. 返回主菜单
+"""
+
+_INT_RE = re.compile(r'[+-]?\d+')
+
+def _parse_int(text: str, default: int):
+    """解析菜单输入的整数：空输入返回default，不是整数时返回None"""
+    if not text:
+        return default
+    return int(text) if _INT_RE.fullmatch(text) else None
+
+def _run_timed_from_menu(strategy_manager, performance_tracker):
+    """询问监控时长后运行限时高速监控"""
+    minutes = input("监控多少分钟? (默认10): ").strip()
+    minutes = _parse_int(minutes, 10)
+    if minutes is None or minutes < 0:
+        minutes = 10
+    logger.info(f"用户选择限时高速监控: {minutes}分钟")
+    run_timed_monitoring(strategy_manager, performance_tracker, minutes)
+
+# 主菜单选项 -> 处理函数，统一以 (strategy_manager, performance_tracker, parameter_optimizer, money_manager, notifier) 调用
+_MENU_HANDLERS = {
+    "1": lambda sm, pt, po, mm, n: run_continuous_monitoring(sm, pt),
+    "2": lambda sm, pt, po, mm, n: _run_timed_from_menu(sm, pt),
+    "3": lambda sm, pt, po, mm, n: run_classic_monitoring(sm, pt),
+    "4": lambda sm, pt, po, mm, n: setup_automated_trading(sm, pt, po),
+    "5": lambda sm, pt, po, mm, n: MultiSymbolMonitor(sm, pt, n).run_multi_symbol_monitoring(),
+    "6": lambda sm, pt, po, mm, n: setup_multi_symbol_automated_trading(sm, pt, po, n),
+    "7": lambda sm, pt, po, mm, n: check_current_signal(sm, pt),
+    "8": lambda sm, pt, po, mm, n: test_manual_order(sm, pt),
+    "9": lambda sm, pt, po, mm, n: show_positions(sm, pt),
+    "10": lambda sm, pt, po, mm, n: strategy_selection_menu(sm),
+    "11": lambda sm, pt, po, mm, n: print("\n" + sm.get_strategy_info()),
+    "12": lambda sm, pt, po, mm, n: diagnose_system(sm),
+    "13": lambda sm, pt, po, mm, n: view_trading_statistics(pt),
+    "14": lambda sm, pt, po, mm, n: manual_parameter_optimization(sm, po),
+    "15": lambda sm, pt, po, mm, n: money_management_menu(mm),
+    "16": lambda sm, pt, po, mm, n: test_dingtalk_notification(n),
+}
+
 def main_menu(strategy_manager, performance_tracker, parameter_optimizer):
     """主程序菜单"""
     logger.info("显示程序菜单")
@@ -30,84 +112,24 @@ def main_menu(strategy_manager, performance_tracker, parameter_optimizer):
         print("🔔 钉钉通知已启用")
     
     # 显示当前模式
-    money_manager = MoneyManager()
-    enabled_symbols = money_manager.get_enabled_symbols()
-    
-    if len(enabled_symbols) > 1:
-        print(f"\n💼 多币种模式: {', '.join(enabled_symbols)}")
-    else:
-        print(f"\n当前策略: {strategy_manager.get_current_strategy().get_name()}")
-    
-    print("\n=== 交易程序选项 ===")
-    print("【单币种模式】")
-    print("1. 运行高速监控 (每秒更新，每10秒检查信号)")
-    print("2. 运行限时高速监控 (指定时间)")
-    print("3. 运行经典监控 (每5秒更新)")
-    print("4. 🤖 全自动化交易 (含定时参数优化)")
-    print("\n【多币种模式】")
-    print("5. 🌐 多币种监控交易")
-    print("6. 🤖 多币种全自动化交易")
-    print("\n【功能选项】")
-    print("7. 检查当前信号状态")
-    print("8. 手动下单测试")
-    print("9. 查看当前持仓")
-    print("10. 策略选择和配置")  
-    print("11. 查看策略信息")   
-    print("12. 系统诊断")        
-    print("13. 查看交易统计")
-    print("14. 🔧 手动参数优化")
-    print("15. 💰 资金管理设置")
-    print("16. 🔔 测试钉钉通知")
-    print("0. 退出")
+    money_manager = get_money_manager()
+    header = money_manager.get_mode_header(strategy_manager.get_current_strategy().get_name())
+    sys.stdout.write(header + _MAIN_MENU_TEXT)
+    sys.stdout.flush()
     
     try:
-        choice = input("\n请选择操作 (0-16): ").strip()
+        choice = input_with_keepalive("\n请选择操作 (0-16): ", performance_tracker).strip()
         logger.info(f"用户选择: {choice}")
         
-        if choice == "1":
-            run_continuous_monitoring(strategy_manager, performance_tracker)
-        elif choice == "2":
-            minutes = input("监控多少分钟? (默认10): ").strip()
-            minutes = int(minutes) if minutes.isdigit() else 10
-            logger.info(f"用户选择限时高速监控: {minutes}分钟")
-            run_timed_monitoring(strategy_manager, performance_tracker, minutes)
-        elif choice == "3":
-            run_classic_monitoring(strategy_manager, performance_tracker)
-        elif choice == "4":
-            setup_automated_trading(strategy_manager, performance_tracker, parameter_optimizer)
-        elif choice == "5":
-            # 多币种监控
-            multi_monitor = MultiSymbolMonitor(strategy_manager, performance_tracker, notifier)
-            multi_monitor.run_multi_symbol_monitoring()
-        elif choice == "6":
-            # 多币种全自动化交易
-            setup_multi_symbol_automated_trading(strategy_manager, performance_tracker, parameter_optimizer, notifier)
-        elif choice == "7":
-            check_current_signal(strategy_manager, performance_tracker)
-        elif choice == "8":
-            test_manual_order(strategy_manager, performance_tracker)
-        elif choice == "9":
-            show_positions(strategy_manager, performance_tracker)
-        elif choice == "10":
-            strategy_selection_menu(strategy_manager)
-        elif choice == "11":
-            print("\n" + strategy_manager.get_strategy_info())
-        elif choice == "12":
-            from ui.diagnosis import diagnose_system
-            diagnose_system(strategy_manager)
-        elif choice == "13":
-            view_trading_statistics(performance_tracker)
-        elif choice == "14":
-            manual_parameter_optimization(strategy_manager, parameter_optimizer)
-        elif choice == "15":
-            money_management_menu(money_manager)
-        elif choice == "16":
-            test_dingtalk_notification(notifier)
-        elif choice == "0":
+        if choice == "0":
             logger.info("用户选择退出程序")
             return False
-        else:
+        
+        handler = _MENU_HANDLERS.get(choice)
+        if handler is None:
             logger.warning(f"无效选择: {choice}")
+        else:
+            handler(strategy_manager, performance_tracker, parameter_optimizer, money_manager, notifier)
             
     except KeyboardInterrupt:
         logger.info("程序被用户中断 (Ctrl+C)")
@@ -121,48 +143,47 @@ def setup_automated_trading(strategy_manager, performance_tracker, parameter_opt
     logger.info("用户配置全自动化交易参数")
     
     current_strategy = strategy_manager.get_current_strategy()
+    strategy_name = current_strategy.get_name()
     print(f"\n🤖 全自动化交易设置")
-    print(f"当前策略: {current_strategy.get_name()}")
+    print(f"当前策略: {strategy_name}")
     print(f"交易品种: {SYMBOL}")
     
     # 设置优化间隔
     print(f"\n⏰ 参数优化设置:")
     optimization_interval = input("参数优化间隔（小时，默认24）: ").strip()
-    try:
-        optimization_interval_hours = int(optimization_interval) if optimization_interval else 24
-        if optimization_interval_hours < 1:
-            print("⚠️ 优化间隔至少1小时，已设置为1小时")
-            optimization_interval_hours = 1
-        elif optimization_interval_hours > 168:  # 7天
-            print("⚠️ 优化间隔最多168小时，已设置为168小时")
-            optimization_interval_hours = 168
-    except ValueError:
+    optimization_interval_hours = _parse_int(optimization_interval, 24)
+    if optimization_interval_hours is None:
         print("⚠️ 输入无效，使用默认24小时")
         optimization_interval_hours = 24
+    elif optimization_interval_hours < 1:
+        print("⚠️ 优化间隔至少1小时，已设置为1小时")
+        optimization_interval_hours = 1
+    elif optimization_interval_hours > 168:  # 7天
+        print("⚠️ 优化间隔最多168小时，已设置为168小时")
+        optimization_interval_hours = 168
     
     # 设置优化回望期
     optimization_lookback = input("优化数据回望期（小时，默认168=7天）: ").strip()
-    try:
-        optimization_lookback_hours = int(optimization_lookback) if optimization_lookback else 168
-        if optimization_lookback_hours < 24:
-            print("⚠️ 回望期至少24小时，已设置为24小时")
-            optimization_lookback_hours = 24
-        elif optimization_lookback_hours > 720:  # 30天
-            print("⚠️ 回望期最多720小时，已设置为720小时")
-            optimization_lookback_hours = 720
-    except ValueError:
+    optimization_lookback_hours = _parse_int(optimization_lookback, 168)
+    if optimization_lookback_hours is None:
         print("⚠️ 输入无效，使用默认168小时")
         optimization_lookback_hours = 168
+    elif optimization_lookback_hours < 24:
+        print("⚠️ 回望期至少24小时，已设置为24小时")
+        optimization_lookback_hours = 24
+    elif optimization_lookback_hours > 720:  # 30天
+        print("⚠️ 回望期最多720小时，已设置为720小时")
+        optimization_lookback_hours = 720
     
     # 显示设置总结
     print(f"\n📋 自动化交易配置:")
-    print(f"  策略: {current_strategy.get_name()}")
+    print(f"  策略: {strategy_name}")
     print(f"  品种: {SYMBOL}")
     print(f"  优化间隔: {optimization_interval_hours} 小时")
     print(f"  回望期: {optimization_lookback_hours} 小时 ({optimization_lookback_hours//24} 天)")
     print(f"  首次优化: {(datetime.now() + timedelta(hours=optimization_interval_hours)).strftime('%Y-%m-%d %H:%M:%S')}")
     
-    if current_strategy.get_name() == "DKLL策略":
+    if strategy_name == "DKLL策略":
         print(f"  策略特点: 不使用止盈止损，依靠信号平仓")
     
     # 确认启动
@@ -178,15 +199,17 @@ def setup_automated_trading(strategy_manager, performance_tracker, parameter_opt
 def check_current_signal(strategy_manager, performance_tracker):
     """检查当前信号状态"""
     current_strategy = strategy_manager.get_current_strategy()
-    logger.info(f"用户请求检查当前信号状态，当前策略: {current_strategy.get_name()}")
+    strategy_name = current_strategy.get_name()
+    logger.info("用户请求检查当前信号状态，当前策略: %s", strategy_name)
     
-    rates = mt5.copy_rates_from_pos(SYMBOL, mt5.TIMEFRAME_M5, 0, 1000)
+    # 共享K线缓存只增量拉取新K线，时间列也只转换新增部分
+    rates = get_recent_rates(SYMBOL, 1000)
     if rates is None:
         logger.error("无法获取数据")
         return
     
     df = pd.DataFrame(rates)
-    df['time'] = pd.to_datetime(df['time'], unit='s')
+    df['time'] = get_recent_times(SYMBOL, len(rates))
     
     # 获取当前持仓
     current_positions = get_positions()
@@ -194,7 +217,7 @@ def check_current_signal(strategy_manager, performance_tracker):
     # 使用新的信号检查函数
     signal, close_orders = check_signal_with_positions(df, current_positions, strategy_manager, verbose=True)
     
-    print(f"\n当前策略: {current_strategy.get_name()}")
+    print(f"\n当前策略: {strategy_name}")
     print(f"策略描述: {current_strategy.get_description()}")
     print(f"当前持仓: {len(current_positions)} 笔")
     
@@ -207,38 +230,24 @@ def check_current_signal(strategy_manager, performance_tracker):
     else:
         print(f"\n⚪ 当前无交易信号")
     
-    # 根据策略显示相关数据
-    recent_data = df.tail(5)
-    logger.info("最近5根K线的数据:")
-    
-    for _, row in recent_data.iterrows():
-        time_str = row['time'].strftime('%Y-%m-%d %H:%M')
-        price_str = f"收盘: {row['close']:.2f}"
-        
-        if current_strategy.get_name() == "双均线策略":
-            ma10 = row['MA10'] if not pd.isna(row['MA10']) else 0
-            ma20 = row['MA20'] if not pd.isna(row['MA20']) else 0
-            ma_diff = ma10 - ma20
-            indicator_str = f"MA10: {ma10:.2f} | MA20: {ma20:.2f} | 差值: {ma_diff:.2f}"
-        elif current_strategy.get_name() == "DKLL策略":
-            dk = row.get('DK', 0)
-            ll = row.get('LL', 0)
-            dl = row.get('DL', 0)
-            indicator_str = f"DK: {dk} | LL: {ll} | DL: {dl}"
-        elif current_strategy.get_name() == "RSI策略":
-            rsi = row.get('RSI', 0)
-            indicator_str = f"RSI: {rsi:.2f}"
-        else:
-            indicator_str = "指标计算中..."
+    # 根据策略显示相关数据：时间和收盘价按列取出，指标由策略自身格式化
+    # （只写入日志，INFO级别关闭时跳过全部格式化）
+    if logger.isEnabledFor(logging.INFO):
+        recent = df.tail(5)
+        time_strs = recent['time'].dt.strftime('%Y-%m-%d %H:%M').tolist()
+        closes = recent['close'].to_numpy()
+        logger.info("最近5根K线的数据:")
         
-        logger.info(f"{time_str} | {price_str} | {indicator_str}")
+        for time_str, close, row in zip(time_strs, closes, recent.to_dict('records')):
+            logger.info("%s | 收盘: %.2f | %s", time_str, close, current_strategy.format_row(row))
     
     # 如果有持仓，显示持仓详情
     if current_positions:
         print(f"\n📋 当前持仓详情:")
+        tick_map = _fetch_ticks(current_positions)
         for pos in current_positions:
             position_type = "多仓" if pos.type == 0 else "空仓"
-            current_price = get_real_time_price(pos.symbol)
+            current_price = tick_map[pos.symbol]
             if current_price:
                 price_str = f"当前价: {current_price.bid:.2f}"
             else:
@@ -250,9 +259,10 @@ def test_manual_order(strategy_manager, performance_tracker):
     logger.info("用户进入手动下单测试")
     
     current_strategy = strategy_manager.get_current_strategy()
-    print(f"\n当前策略: {current_strategy.get_name()}")
+    strategy_name = current_strategy.get_name()
+    print(f"\n当前策略: {strategy_name}")
     
-    if current_strategy.get_name() == "DKLL策略":
+    if strategy_name == "DKLL策略":
         print("🔔 DKLL策略特点：不设置止盈止损，完全依靠信号平仓")
     
     direction = input("输入方向 (BUY/SELL 或 B/S): ").strip().upper()
@@ -270,32 +280,87 @@ def test_manual_order(strategy_manager, performance_tracker):
     volume = input("输入交易量 (默认0.01): ").strip()
     volume = float(volume) if volume else DEFAULT_VOLUME
     
-    logger.info(f"用户设置手动订单: {direction}, 数量: {volume}, 当前策略: {current_strategy.get_name()}")
+    logger.info(f"用户设置手动订单: {direction}, 数量: {volume}, 当前策略: {strategy_name}")
     
     # 显示当前策略的止盈止损设置
-    use_sl_tp = current_strategy.get_name() != "DKLL策略"
+    use_sl_tp = current_strategy.uses_sl_tp
     if use_sl_tp:
-        print(f"📊 {current_strategy.get_name()}将自动设置止盈止损")
+        print(f"📊 {strategy_name}将自动设置止盈止损")
     else:
-        print(f"🚫 {current_strategy.get_name()}不设置止盈止损，依靠信号平仓")
+        print(f"🚫 {strategy_name}不设置止盈止损，依靠信号平仓")
     
     confirm = input(f"确认下{direction}单，交易量{volume}? (y/N): ").strip().lower()
     if confirm == 'y':
         logger.info("用户确认手动下单")
         if place_order(SYMBOL, direction, volume, strategy_manager, performance_tracker):
             print("✅ 订单提交成功！")
-            trade_logger.info(f"手动下单成功 | 策略: {current_strategy.get_name()} | 方向: {direction} | 数量: {volume}")
+            trade_logger.info(f"手动下单成功 | 策略: {strategy_name} | 方向: {direction} | 数量: {volume}")
         else:
             print("❌ 订单提交失败！")
     else:
         logger.info("用户取消手动下单")
 
+def _fetch_ticks(positions):
+    """获取持仓涉及的各品种实时价格，多个品种时并发请求
+    
+    Returns:
+        {品种: tick或None}
+    """
+    symbols = list(dict.fromkeys(pos.symbol for pos in positions))
+    if len(symbols) <= 1:
+        return {symbol: get_real_time_price(symbol) for symbol in symbols}
+    with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as pool:
+        return dict(zip(symbols, pool.map(get_real_time_price, symbols)))
+
+# 各品种最新一根K线（含指标）的缓存：{(品种, 最新K线时间和OHLC, 策略及其参数): 最新行}
+_latest_cache = {}
+_LATEST_CACHE_SIZE = 8
+
+def _latest_indicators(symbol, strategy_manager):
+    """获取品种最新一根K线（含策略指标，字典或Series），获取失败返回None
+    
+    最新K线和策略参数都未变化时直接返回缓存的结果，不重新计算指标
+    """
+    rates = get_recent_rates(symbol, 100)
+    if rates is None:
+        return None
+    
+    strategy = strategy_manager.get_current_strategy()
+    last_bar = rates[-1]
+    key = (
+        symbol,
+        tuple(last_bar[field].item() for field in ('time', 'open', 'high', 'low', 'close')),
+        id(strategy), strategy_manager.generation,
+        tuple(sorted(strategy.get_params().items()))
+    )
+    latest = _latest_cache.get(key)
+    if latest is not None:
+        return latest
+    
+    indicators = strategy_manager.calculate_indicators_np(rates)
+    if indicators is not None:
+        # 策略提供NumPy实现：只取最后一个元素，不构造DataFrame
+        latest = {name: last_bar[name].item() for name in rates.dtype.names}
+        latest.update((name, values[-1]) for name, values in indicators.items())
+    else:
+        df = pd.DataFrame(rates)
+        df['time'] = get_recent_times(symbol, len(rates))
+        latest = strategy_manager.calculate_indicators(df).iloc[-1]
+    
+    # 超出容量时淘汰最早加入的条目
+    if len(_latest_cache) >= _LATEST_CACHE_SIZE:
+        del _latest_cache[next(iter(_latest_cache))]
+    _latest_cache[key] = latest
+    return latest
+
 def show_positions(strategy_manager, performance_tracker):
     """显示当前持仓"""
     logger.info("用户查看当前持仓")
     
     positions = get_positions()
     current_strategy = strategy_manager.get_current_strategy()
+    strategy_name = current_strategy.get_name()
+    is_dkll = strategy_name == "DKLL策略"
     
     if not positions:
         logger.info("当前无持仓")
@@ -303,19 +368,25 @@ def show_positions(strategy_manager, performance_tracker):
         return
     
     print(f"\n当前持仓数量: {len(positions)}")
-    print(f"当前策略: {current_strategy.get_name()}")
+    print(f"当前策略: {strategy_name}")
     
-    if current_strategy.get_name() == "DKLL策略":
+    if is_dkll:
         print("🔔 DKLL策略特点：无止盈止损，依靠信号平仓")
     
-    logger.info(f"当前持仓数量: {len(positions)}")
+    logger.info("当前持仓数量: %d", len(positions))
     
-    total_profit = 0
+    # 同一品种的多笔持仓共用一次价格和K线获取
+    tick_cache = _fetch_ticks(positions)
+    latest_cache = {}
+    
+    out = []  # 所有持仓信息收集后一次写出
+    log_positions = logger.isEnabledFor(logging.INFO)
+    total_profit = sum(pos.profit for pos in positions)
     for i, pos in enumerate(positions, 1):
         position_type = "买入(多)" if pos.type == 0 else "卖出(空)"
         
         # 获取当前价格计算浮动盈亏
-        current_tick = get_real_time_price(pos.symbol)
+        current_tick = tick_cache[pos.symbol]
         if current_tick:
             current_price = current_tick.bid if pos.type == 0 else current_tick.ask
             price_info = f"当前价: {current_price:.2f}"
@@ -331,54 +402,56 @@ def show_positions(strategy_manager, performance_tracker):
             price_info = "当前价: 获取失败"
             price_change_info = ""
         
-        # 显示持仓信息
-        position_info = f"\n持仓 {i}:"
-        position_info += f"\n  票据: {pos.ticket}"
-        position_info += f"\n  品种: {pos.symbol}"
-        position_info += f"\n  类型: {position_type}"
-        position_info += f"\n  数量: {pos.volume}"
-        position_info += f"\n  开仓价: {pos.price_open:.2f}"
-        position_info += f"\n  {price_info}"
+        # 显示持仓信息（逐行收集，最后一次拼接）
+        lines = [
+            f"持仓 {i}:",
+            f"  票据: {pos.ticket}",
+            f"  品种: {pos.symbol}",
+            f"  类型: {position_type}",
+            f"  数量: {pos.volume}",
+            f"  开仓价: {pos.price_open:.2f}",
+            f"  {price_info}",
+        ]
         if price_change_info:
-            position_info += f"\n  {price_change_info}"
-        position_info += f"\n  浮动盈亏: {pos.profit:+.2f}"
-        position_info += f"\n  开仓时间: {datetime.fromtimestamp(pos.time).strftime('%Y-%m-%d %H:%M:%S')}"
+            lines.append(f"  {price_change_info}")
+        lines.append(f"  浮动盈亏: {pos.profit:+.2f}")
+        lines.append(f"  开仓时间: {datetime.fromtimestamp(pos.time):%Y-%m-%d %H:%M:%S}")
         
         # 如果是DKLL策略，显示当前DL值
-        if current_strategy.get_name() == "DKLL策略":
+        if is_dkll:
             try:
-                # 获取最新K线数据
-                rates = mt5.copy_rates_from_pos(pos.symbol, mt5.TIMEFRAME_M5, 0, 100)
-                if rates is not None:
-                    df = pd.DataFrame(rates)
-                    df['time'] = pd.to_datetime(df['time'], unit='s')
-                    df_with_indicators = strategy_manager.calculate_indicators(df)
-                    latest = df_with_indicators.iloc[-1]
+                # 获取最新K线数据（每个品种只获取和计算一次）
+                if pos.symbol not in latest_cache:
+                    latest_cache[pos.symbol] = _latest_indicators(pos.symbol, strategy_manager)
+                latest = latest_cache[pos.symbol]
+                if latest is not None:
                     dl_value = latest.get('DL', 0)
                     
                     if pos.type == 0:  # 多仓
                         if dl_value <= 0:
-                            position_info += f"\n  ⚠️ 当前DL值: {dl_value} (建议平仓)"
+                            lines.append(f"  ⚠️ 当前DL值: {dl_value} (建议平仓)")
                         else:
-                            position_info += f"\n  ✅ 当前DL值: {dl_value} (持仓有效)"
+                            lines.append(f"  ✅ 当前DL值: {dl_value} (持仓有效)")
                     else:  # 空仓
                         if dl_value >= 0:
-                            position_info += f"\n  ⚠️ 当前DL值: {dl_value} (建议平仓)"
+                            lines.append(f"  ⚠️ 当前DL值: {dl_value} (建议平仓)")
                         else:
-                            position_info += f"\n  ✅ 当前DL值: {dl_value} (持仓有效)"
+                            lines.append(f"  ✅ 当前DL值: {dl_value} (持仓有效)")
             except:
-                position_info += f"\n  DL值: 计算失败"
+                lines.append(f"  DL值: 计算失败")
         
-        print(position_info)
-        logger.info(position_info.replace('\n', ' | '))
-        total_profit += pos.profit
+        out.append("\n" + "\n".join(lines))
+        if log_positions:
+            logger.info(" | ".join(lines))
     
     # 显示总计
-    print(f"\n📊 持仓总计:")
-    print(f"  总浮动盈亏: {total_profit:+.2f}")
+    out.append(f"\n📊 持仓总计:")
+    out.append(f"  总浮动盈亏: {total_profit:+.2f}")
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
     
     # 如果是DKLL策略，提示手动平仓选项
-    if current_strategy.get_name() == "DKLL策略":
+    if is_dkll:
         manual_close = input("\n是否手动平仓某个持仓? (输入票据号码，直接回车跳过): ").strip()
         if manual_close.isdigit():
             ticket = int(manual_close)
@@ -394,7 +467,7 @@ def show_positions(strategy_manager, performance_tracker):
                 if confirm == 'y':
                     if close_position(ticket, target_position.symbol, "手动平仓", performance_tracker):
                         print("✅ 手动平仓成功！")
-                        trade_logger.info(f"手动平仓成功 | 票据: {ticket}")
+                        trade_logger.info("手动平仓成功 | 票据: %s", ticket)
                     else:
                         print("❌ 手动平仓失败！")
             else:
@@ -406,9 +479,10 @@ def strategy_selection_menu(strategy_manager):
     
     print("\n=== 策略选择菜单 ===")
     strategies = strategy_manager.get_available_strategies()
+    current_name = strategy_manager.get_current_strategy().get_name()
     
     for i, (key, name) in enumerate(strategies.items(), 1):
-        current_mark = " (当前)" if strategy_manager.get_current_strategy().get_name() == name else ""
+        current_mark = " (当前)" if current_name == name else ""
         print(f"{i}. {name}{current_mark}")
     
     print("0. 返回主菜单")
@@ -461,13 +535,8 @@ def modify_strategy_params(strategy_manager):
         try:
             new_value = input(f"修改 {param_name} (当前: {current_value}, 直接回车保持不变): ").strip()
             if new_value:
-                # 尝试转换为适当的类型
-                if isinstance(current_value, int):
-                    new_params[param_name] = int(new_value)
-                elif isinstance(current_value, float):
-                    new_params[param_name] = float(new_value)
-                else:
-                    new_params[param_name] = new_value
+                # 按参数原有类型转换
+                new_params[param_name] = current_strategy.parse_param(param_name, new_value)
         except ValueError:
             print(f"❌ 参数 {param_name} 格式错误，保持原值")
     
@@ -478,6 +547,117 @@ def modify_strategy_params(strategy_manager):
     else:
         print("参数未修改")
 
+def manual_parameter_optimization(strategy_manager, parameter_optimizer):
+    """手动参数优化菜单"""
+    logger.info("用户进入手动参数优化")
+    
+    current_strategy = strategy_manager.get_current_strategy()
+    strategy_name = current_strategy.get_name()
+    print(f"\n🔧 参数优化")
+    print(f"当前策略: {strategy_name}")
+    print(f"当前参数: {current_strategy.get_params()}")
+    
+    # 设置优化参数
+    print(f"\n⚙️ 优化设置:")
+    lookback_hours = input("历史数据回望期（小时，默认168=7天）: ").strip()
+    lookback_hours = _parse_int(lookback_hours, 168)
+    if lookback_hours is None:
+        print("⚠️ 输入无效，使用默认168小时")
+        lookback_hours = 168
+    elif lookback_hours < 24:
+        print("⚠️ 回望期至少24小时，已设置为24小时")
+        lookback_hours = 24
+    elif lookback_hours > 720:  # 30天
+        print("⚠️ 回望期最多720小时，已设置为720小时")
+        lookback_hours = 720
+    
+    test_combinations = input("测试参数组合数量（默认30）: ").strip()
+    test_combinations = _parse_int(test_combinations, 30)
+    if test_combinations is None:
+        print("⚠️ 输入无效，使用默认30")
+        test_combinations = 30
+    elif test_combinations < 10:
+        print("⚠️ 至少测试10个组合，已设置为10")
+        test_combinations = 10
+    elif test_combinations > 100:
+        print("⚠️ 最多测试100个组合，已设置为100")
+        test_combinations = 100
+    
+    # 各参数组合的回测互相独立，可以分配到多个进程并行执行
+    cpu_count = os.cpu_count() or 1
+    n_jobs = input(f"并行进程数（默认{cpu_count}，1为不并行）: ").strip()
+    n_jobs = _parse_int(n_jobs, cpu_count)
+    if n_jobs is None:
+        print(f"⚠️ 输入无效，使用默认{cpu_count}")
+        n_jobs = cpu_count
+    elif n_jobs < 1:
+        print("⚠️ 进程数至少为1，已设置为1")
+        n_jobs = 1
+    
+    print(f"\n📊 优化配置:")
+    print(f"  策略: {strategy_name}")
+    print(f"  回望期: {lookback_hours} 小时 ({lookback_hours//24} 天)")
+    print(f"  测试组合: {test_combinations} 个")
+    print(f"  并行进程: {n_jobs} 个")
+    print(f"  品种: {SYMBOL}")
+    
+    confirm = input(f"\n确认开始参数优化? (y/N): ").strip().lower()
+    if confirm == 'y':
+        logger.info(f"用户确认手动参数优化 - 回望期: {lookback_hours}h, 测试组合: {test_combinations}, 并行进程: {n_jobs}")
+        
+        # 记录当前参数
+        original_params = current_strategy.get_params().copy()
+        print(f"\n🔄 开始优化，这可能需要几分钟...")
+        
+        try:
+            # 执行参数优化
+            optimized_params = parameter_optimizer.optimize_strategy(
+                strategy_name=strategy_name,
+                symbol=SYMBOL,
+                optimization_hours=lookback_hours,
+                test_combinations=test_combinations,
+                n_jobs=n_jobs
+            )
+            
+            if optimized_params:
+                print(f"\n✅ 参数优化完成！")
+                print(f"原始参数: {original_params}")
+                print(f"优化参数: {optimized_params}")
+                
+                # 显示参数对比
+                print(f"\n📊 参数变化:")
+                for param_name in original_params.keys():
+                    old_val = original_params[param_name]
+                    new_val = optimized_params[param_name]
+                    if new_val > old_val:
+                        change = "📈 增大"
+                    elif new_val < old_val:
+                        change = "📉 减小"
+                    else:
+                        change = "➡️ 不变"
+                    print(f"  {param_name}: {old_val} → {new_val} {change}")
+                
+                # 询问是否应用新参数
+                apply = input(f"\n是否应用优化后的参数? (y/N): ").strip().lower()
+                if apply == 'y':
+                    current_strategy.set_params(optimized_params)
+                    print(f"✅ 新参数已应用！")
+                    logger.info(f"手动参数优化完成并应用: {optimized_params}")
+                    trade_logger.info(f"手动参数优化 | 策略: {strategy_name} | 原参数: {original_params} | 新参数: {optimized_params}")
+                else:
+                    print(f"参数未应用，保持原始设置")
+                    logger.info("用户选择不应用优化参数")
+            else:
+                print(f"❌ 参数优化失败，保持原始参数")
+                logger.warning("参数优化失败")
+                
+        except Exception as e:
+            logger.error(f"参数优化过程中发生错误: {e}")
+            print(f"❌ 优化过程出错: {e}")
+    else:
+        logger.info("用户取消手动参数优化")
+        print("已取消参数优化")
+
 def view_trading_statistics(performance_tracker):
     """查看交易统计"""
     logger.info("用户查看交易统计")
@@ -485,68 +665,75 @@ def view_trading_statistics(performance_tracker):
     # 更新最新状态
     performance_tracker.update_positions_from_mt5()
     
-    print("\n" + "="*60)
-    print("📊 实时交易统计")
-    print("="*60)
+    # 整个统计面板先收集为行列表，最后一次写出
+    out = ["\n" + "="*60]
+    out.append("📊 实时交易统计")
+    out.append("="*60)
     
     stats = performance_tracker.get_statistics()
     
     # 基础统计
-    print(f"📈 基础数据:")
-    print(f"   总交易次数: {stats['total_trades']}")
-    print(f"   盈利交易: {stats['winning_trades']} ({stats['win_rate']:.2f}%)")
-    print(f"   亏损交易: {stats['losing_trades']}")
-    print(f"   平手交易: {stats['breakeven_trades']}")
+    out.append(f"📈 基础数据:")
+    out.append(f"   总交易次数: {stats['total_trades']}")
+    out.append(f"   盈利交易: {stats['winning_trades']} ({stats['win_rate']:.2f}%)")
+    out.append(f"   亏损交易: {stats['losing_trades']}")
+    out.append(f"   平手交易: {stats['breakeven_trades']}")
     
     # 盈亏统计
-    print(f"\n💰 盈亏分析:")
-    print(f"   总盈亏: {stats['total_profit']:+.2f}")
-    print(f"   总盈利: +{stats['gross_profit']:.2f}")
-    print(f"   总亏损: -{stats['gross_loss']:.2f}")
-    print(f"   盈亏比: {stats['profit_factor']:.2f}")
-    print(f"   平均盈利: {stats['avg_profit']:.2f}")
-    print(f"   平均亏损: -{stats['avg_loss']:.2f}")
+    out.append(f"\n💰 盈亏分析:")
+    out.append(f"   总盈亏: {stats['total_profit']:+.2f}")
+    out.append(f"   总盈利: +{stats['gross_profit']:.2f}")
+    out.append(f"   总亏损: -{stats['gross_loss']:.2f}")
+    out.append(f"   盈亏比: {stats['profit_factor']:.2f}")
+    out.append(f"   平均盈利: {stats['avg_profit']:.2f}")
+    out.append(f"   平均亏损: -{stats['avg_loss']:.2f}")
     
     # 账户变化
-    print(f"\n🏦 账户变化:")
-    print(f"   初始余额: {stats['session_start_balance']:.2f}")
-    print(f"   当前余额: {stats['current_balance']:.2f}")
-    print(f"   余额变化: {stats['balance_change']:+.2f} ({stats['balance_change_percent']:+.2f}%)")
+    out.append(f"\n🏦 账户变化:")
+    out.append(f"   初始余额: {stats['session_start_balance']:.2f}")
+    out.append(f"   当前余额: {stats['current_balance']:.2f}")
+    out.append(f"   余额变化: {stats['balance_change']:+.2f} ({stats['balance_change_percent']:+.2f}%)")
     
     # 极值统计
     if stats['total_trades'] > 0:
-        print(f"\n📊 极值统计:")
-        print(f"   最大盈利: +{stats['max_profit']:.2f}")
-        print(f"   最大亏损: {stats['max_loss']:.2f}")
-        print(f"   最大连续盈利: {stats['max_consecutive_wins']} 次")
-        print(f"   最大连续亏损: {stats['max_consecutive_losses']} 次")
+        out.append(f"\n📊 极值统计:")
+        out.append(f"   最大盈利: +{stats['max_profit']:.2f}")
+        out.append(f"   最大亏损: {stats['max_loss']:.2f}")
+        out.append(f"   最大连续盈利: {stats['max_consecutive_wins']} 次")
+        out.append(f"   最大连续亏损: {stats['max_consecutive_losses']} 次")
         
         avg_duration_str = str(stats['avg_duration']).split('.')[0] if stats['avg_duration'] else "0:00:00"
-        print(f"   平均持仓时间: {avg_duration_str}")
+        out.append(f"   平均持仓时间: {avg_duration_str}")
     
     # 策略统计
     strategy_stats = performance_tracker.get_strategy_statistics()
     if strategy_stats:
-        print(f"\n🎯 策略表现:")
+        out.append(f"\n🎯 策略表现:")
         for strategy, data in strategy_stats.items():
-            print(f"   {strategy}: {data['total_trades']}笔 | 胜率{data['win_rate']:.1f}% | 盈亏{data['total_profit']:+.2f}")
+            out.append(f"   {strategy}: {data['total_trades']}笔 | 胜率{data['win_rate']:.1f}% | 盈亏{data['total_profit']:+.2f}")
     
     # 当前持仓
     if performance_tracker.open_positions:
-        print(f"\n📋 当前持仓 ({len(performance_tracker.open_positions)}笔):")
+        out.append(f"\n📋 当前持仓 ({len(performance_tracker.open_positions)}笔):")
+        # 每个品种只查询一次价格
+        prices = {symbol: performance_tracker._get_current_price(symbol)
+                  for symbol in {pos['symbol'] for pos in performance_tracker.open_positions.values()}}
         for ticket, pos in performance_tracker.open_positions.items():
             open_time = pos['open_time'].strftime('%m-%d %H:%M') if isinstance(pos['open_time'], datetime) else str(pos['open_time'])
-            current_price = performance_tracker._get_current_price(pos['symbol'])
+            current_price = prices[pos['symbol']]
             if current_price:
                 if pos['type'] == 'BUY':
                     unrealized_pnl = (current_price - pos['open_price']) * pos['volume']
                 else:
                     unrealized_pnl = (pos['open_price'] - current_price) * pos['volume']
-                print(f"   票据{ticket}: {pos['type']} {pos['symbol']} | {open_time} | 开仓价{pos['open_price']:.2f} | 浮动{unrealized_pnl:+.2f}")
+                out.append(f"   票据{ticket}: {pos['type']} {pos['symbol']} | {open_time} | 开仓价{pos['open_price']:.2f} | 浮动{unrealized_pnl:+.2f}")
             else:
-                print(f"   票据{ticket}: {pos['type']} {pos['symbol']} | {open_time} | 开仓价{pos['open_price']:.2f}")
+                out.append(f"   票据{ticket}: {pos['type']} {pos['symbol']} | {open_time} | 开仓价{pos['open_price']:.2f}")
     
-    print("="*60)
+    out.append("="*60)
+    
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
     
     # 询问是否生成详细报告
     generate_report = input("\n是否生成详细报告并保存到文件? (y/N): ").strip().lower()
@@ -561,37 +748,30 @@ def money_management_menu(money_manager):
     """资金管理设置菜单"""
     logger.info("用户进入资金管理菜单")
     
-    print("\n💰 资金管理设置")
-    print("="*60)
-    
-    # 显示当前配置
+    # 显示当前配置（收集为行列表，连同选项一次写出）
     allocation = money_manager.get_account_allocation_status()
-    print(f"\n账户信息:")
-    print(f"  余额: {allocation.get('total_balance', 0):.2f}")
-    print(f"  净值: {allocation.get('total_equity', 0):.2f}")
-    print(f"  可用保证金: {allocation.get('free_margin', 0):.2f}")
+    out = ["\n💰 资金管理设置", "="*60]
+    out.append(f"\n账户信息:")
+    out.append(f"  余额: {allocation.get('total_balance', 0):.2f}")
+    out.append(f"  净值: {allocation.get('total_equity', 0):.2f}")
+    out.append(f"  可用保证金: {allocation.get('free_margin', 0):.2f}")
     
-    print(f"\n当前币种配置:")
+    out.append(f"\n当前币种配置:")
     for symbol, config in money_manager.symbols_config.items():
         status = allocation['symbols'].get(symbol, {})
-        print(f"\n{symbol}:")
-        print(f"  启用: {'✅' if config['enabled'] else '❌'}")
-        print(f"  持仓比例: {config['position_ratio']:.0%}")
-        print(f"  分配资金: {status.get('allocated_balance', 0):.2f}")
-        print(f"  最大持仓数: {config['max_positions']}")
-        print(f"  当前持仓: {status.get('current_positions', 0)}")
-        print(f"  单笔交易量: {config['volume_per_trade']}")
-        print(f"  最大总量: {config['max_volume']}")
-        print(f"  使用策略: {config['strategy']}")
-        print(f"  利用率: {status.get('utilization', 0):.1f}%")
-    
-    print("\n选项:")
-    print("1. 修改币种启用状态")
-    print("2. 调整持仓比例")
-    print("3. 修改交易量限制")
-    print("4. 更改币种策略")
-    print("5. 查看风险状态")
-    print("0. 返回主菜单")
+        out.append(f"\n{symbol}:")
+        out.append(f"  启用: {'✅' if config['enabled'] else '❌'}")
+        out.append(f"  持仓比例: {config['position_ratio']:.0%}")
+        out.append(f"  分配资金: {status.get('allocated_balance', 0):.2f}")
+        out.append(f"  最大持仓数: {config['max_positions']}")
+        out.append(f"  当前持仓: {status.get('current_positions', 0)}")
+        out.append(f"  单笔交易量: {config['volume_per_trade']}")
+        out.append(f"  最大总量: {config['max_volume']}")
+        out.append(f"  使用策略: {config['strategy']}")
+        out.append(f"  利用率: {status.get('utilization', 0):.1f}%")
+    
+    sys.stdout.write("\n".join(out) + "\n" + _MONEY_MENU_OPTIONS)
+    sys.stdout.flush()
     
     choice = input("\n请选择 (0-5): ").strip()
     
@@ -622,6 +802,7 @@ def modify_symbol_status(money_manager):
             symbol = symbols[idx]
             current = money_manager.symbols_config[symbol]['enabled']
             money_manager.symbols_config[symbol]['enabled'] = not current
+            money_manager.mark_config_changed()
             new_status = "启用" if not current else "禁用"
             print(f"✅ {symbol} 已{new_status}")
             logger.info(f"用户修改 {symbol} 状态为: {new_status}")
@@ -652,6 +833,7 @@ def adjust_position_ratios(money_manager):
             ratio = float(new_ratio) / 100
             if 0 <= ratio <= 1:
                 money_manager.symbols_config[symbol]['position_ratio'] = ratio
+                money_manager.mark_config_changed()
                 print(f"✅ {symbol} 比例设置为 {ratio:.0%}")
         except:
             print(f"保持 {symbol} 原比例")
@@ -678,8 +860,9 @@ def modify_volume_limits(money_manager):
             
             # 修改最大持仓数
             new_max_pos = input("新的最大持仓数 (回车保持不变): ").strip()
-            if new_max_pos.isdigit():
-                config['max_positions'] = int(new_max_pos)
+            new_max_pos = _parse_int(new_max_pos, None)
+            if new_max_pos is not None and new_max_pos >= 0:
+                config['max_positions'] = new_max_pos
             
             # 修改单笔交易量
             new_volume = input("新的单笔交易量 (回车保持不变): ").strip()
@@ -695,6 +878,7 @@ def modify_volume_limits(money_manager):
             except:
                 pass
             
+            money_manager.mark_config_changed()
             print(f"✅ {symbol} 限制已更新")
     except:
         print("❌ 无效选择")
@@ -724,6 +908,7 @@ def change_symbol_strategy(money_manager):
             
             if strategy_choice in strategy_map:
                 money_manager.symbols_config[symbol]['strategy'] = strategy_map[strategy_choice]
+                money_manager.mark_config_changed()
                 print(f"✅ {symbol} 策略已更改为 {strategy_map[strategy_choice]}")
     except:
         print("❌ 无效选择")
@@ -747,6 +932,20 @@ def show_risk_status(money_manager):
     else:
         print("\n✅ 无风险警告")
 
+# 钉钉消息在后台线程发送，菜单不等待HTTP请求
+_notify_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='Notify')
+
+def _send_in_background(send, payload, success_message, failure_message):
+    """提交发送任务，完成后打印结果（send返回False或抛出异常视为失败）"""
+    def report(future):
+        if future.exception() is None and future.result() is not False:
+            print(f"\n{success_message}")
+        else:
+            print(f"\n{failure_message}")
+    
+    _notify_pool.submit(send, payload).add_done_callback(report)
+    print("⏳ 消息已提交，后台发送中...")
+
 def test_dingtalk_notification(notifier):
     """测试钉钉通知"""
     if not notifier:
@@ -761,13 +960,11 @@ def test_dingtalk_notification(notifier):
     choice = input("选择测试类型 (1-3): ").strip()
     
     if choice == "1":
-        if notifier.send_text("这是一条MT5自动交易系统的测试消息"):
-            print("✅ 文本消息发送成功")
-        else:
-            print("❌ 文本消息发送失败")
+        _send_in_background(notifier.send_text, "这是一条MT5自动交易系统的测试消息",
+                            "✅ 文本消息发送成功", "❌ 文本消息发送失败")
             
     elif choice == "2":
-        notifier.send_trade_notification({
+        _send_in_background(notifier.send_trade_notification, {
             'action': '测试交易',
             'symbol': 'BTCUSD',
             'direction': 'BUY',
@@ -777,11 +974,10 @@ def test_dingtalk_notification(notifier):
             'strategy': 'MA策略',
             'balance': 10000,
             'equity': 10100
-        })
-        print("✅ 交易通知已发送")
+        }, "✅ 交易通知已发送", "❌ 交易通知发送失败")
         
     elif choice == "3":
-        notifier.send_daily_report({
+        _send_in_background(notifier.send_daily_report, {
             'total_trades': 10,
             'winning_trades': 6,
             'losing_trades': 4,
@@ -797,14 +993,13 @@ def test_dingtalk_notification(notifier):
                 'ETHUSD': {'trades': 3, 'win_rate': 66.7, 'profit': 50},
                 'XAUUSD': {'trades': 2, 'win_rate': 50, 'profit': 20}
             }
-        })
-        print("✅ 每日报告已发送")
+        }, "✅ 每日报告已发送", "❌ 每日报告发送失败")
 
 def setup_multi_symbol_automated_trading(strategy_manager, performance_tracker, parameter_optimizer, notifier):
     """设置多币种全自动化交易"""
     logger.info("用户配置多币种全自动化交易")
     
-    money_manager = MoneyManager()
+    money_manager = get_money_manager()
     enabled_symbols = money_manager.get_enabled_symbols()
     
     print(f"\n🤖 多币种全自动化交易设置")
@@ -822,10 +1017,16 @@ def setup_multi_symbol_automated_trading(strategy_manager, performance_tracker,
     # 设置优化参数
     print(f"\n⏰ 参数优化设置:")
     optimization_interval = input("参数优化间隔（小时，默认24）: ").strip()
-    optimization_interval_hours = int(optimization_interval) if optimization_interval else 24
+    optimization_interval_hours = _parse_int(optimization_interval, 24)
+    if optimization_interval_hours is None:
+        print("⚠️ 输入无效，使用默认24小时")
+        optimization_interval_hours = 24
     
     optimization_lookback = input("优化数据回望期（小时，默认168=7天）: ").strip()
-    optimization_lookback_hours = int(optimization_lookback) if optimization_lookback else 168
+    optimization_lookback_hours = _parse_int(optimization_lookback, 168)
+    if optimization_lookback_hours is None:
+        print("⚠️ 输入无效，使用默认168小时")
+        optimization_lookback_hours = 168
     
     # 确认启动
     print(f"\n📋 配置总结:")
@@ -0,0 +1,46 @@
+"""
+菜单输入 - 等待用户输入时保持后台更新
+"""
+import queue
+import threading
+import time
+from config.settings import PERFORMANCE_UPDATE_INTERVAL
+
+# 读取线程把输入（或EOFError）放入队列；被Ctrl+C放弃的读取线程会在下次提示时复用
+_input_queue = queue.Queue()
+_input_thread = None
+
+# 等待输入时每次阻塞的最长秒数：Windows上较长的带超时锁等待会推迟Ctrl+C的响应
+POLL_INTERVAL = 0.2
+
+def _read_line(prompt):
+    try:
+        _input_queue.put(input(prompt))
+    except EOFError as e:
+        _input_queue.put(e)
+
+def input_with_keepalive(prompt: str, performance_tracker, interval: float = PERFORMANCE_UPDATE_INTERVAL) -> str:
+    """在后台线程读取一行输入，等待期间每interval秒在主线程更新一次交易统计"""
+    global _input_thread
+    if _input_thread is not None and _input_thread.is_alive():
+        # 上次被中断的读取仍在等待stdin，直接复用，避免两个线程争抢输入
+        print(prompt, end="", flush=True)
+    else:
+        # 丢弃被放弃的提示留下的旧输入
+        while not _input_queue.empty():
+            _input_queue.get_nowait()
+        _input_thread = threading.Thread(target=_read_line, args=(prompt,), name='MenuInput', daemon=True)
+        _input_thread.start()
+
+    next_update = time.monotonic() + interval
+    while True:
+        try:
+            result = _input_queue.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if time.monotonic() >= next_update:
+                performance_tracker.update_positions_from_mt5()
+                next_update = time.monotonic() + interval
+            continue
+        if isinstance(result, EOFError):
+            raise result
+        return result